@@ -60,6 +60,22 @@ class CoursesViewsTest(APITestCase):
         response = self.client.delete(reverse('course-detail', args=[self.course.id]))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
+    def test_course_list_conditional_get(self):
+        """Test 304 responses until a course is edited or deleted"""
+        response = self.client.get(reverse('course-list'))
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = self.client.get(reverse('course-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(reverse('course-list'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Course.objects.create(title='Old', instructor=self.user).delete()
+        Course.objects.filter(id=self.course.id).delete()
+        response = self.client.get(reverse('course-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
     def test_lesson_views(self):
         """Test Lesson endpoints"""
         # List
@@ -1,5 +1,6 @@
 import time
 from django.core.cache import cache
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
@@ -7,6 +8,7 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Course, Lesson, Enrollment
 from .serializers import CourseSerializer, LessonSerializer, EnrollmentSerializer, GenerateFlashcardsSerializer
+from studypal.conditional import ConditionalGetMixin
 from study_assistant.ai_service import TaeAI
 
 def generate_flashcards(study_text):
@@ -131,11 +133,16 @@ class CourseAIStatusView(generics.RetrieveAPIView):
             "insights": insights or "Processing...",
         })
 
-class CourseListCreateView(generics.ListCreateAPIView):
+class CourseListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_validators(self):
+        # Edits move the newest updated_at; deletions change the count
+        version = Course.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        return (version['count'], version['latest']), version['latest']
+
     def perform_create(self, serializer):
         course = serializer.save(instructor=self.request.user)
         rate_limited_ai_request(generate_course_insights, course.id, f'course_insights_{course.id}')
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+from django.utils import timezone
+from study_assistant.ai_service import TaeAI
+from .models import DashboardStats
+
+logger = logging.getLogger(__name__)
+
+LEARNING_TIME_BUCKET = 60  # Minutes; smaller changes don't warrant new insights
+
+INSIGHTS_PROMPT = (
+    "Analyze learning stats:\n"
+    "Total Learning Time: {total_learning_time} minutes\n"
+    "Completed Courses: {completed_courses}\n"
+    "Courses In Progress: {unfinished_courses}\n"
+    "Current Streak: {current_streak} days\n"
+    "Next Exam Date: {next_exam_date}"
+)
+
+
+def stats_fingerprint(stats):
+    """
+    Hash of the stats the insights depend on, with learning time rounded to
+    the hour so that every finished session doesn't trigger a new analysis.
+    """
+    parts = (
+        stats.total_learning_time // LEARNING_TIME_BUCKET,
+        stats.completed_courses,
+        stats.unfinished_courses,
+        stats.current_streak,
+        stats.next_exam_date,
+    )
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def request_insights_refresh(stats):
+    """
+    Queue a refresh if the stats changed meaningfully since the stored
+    insights were written. Never calls the model.
+
+    Returns:
+        bool: Whether a refresh is (now) pending
+    """
+    if stats.insights_fingerprint == stats_fingerprint(stats):
+        return False
+    if stats.insights_requested_at is None:
+        now = timezone.now()
+        DashboardStats.objects.filter(pk=stats.pk, insights_requested_at__isnull=True).update(
+            insights_requested_at=now
+        )
+        stats.insights_requested_at = now
+    return True
+
+
+def generate_dashboard_insights(stats):
+    """
+    Ask the model about one user's stats and store the answer with the
+    fingerprint it was written for. On a model error the previous insights
+    are kept and the request is dropped; the next dashboard view requeues it.
+    """
+    fingerprint = stats_fingerprint(stats)
+    insights = TaeAI().process_text(INSIGHTS_PROMPT.format(**{
+        field: getattr(stats, field) for field in (
+            'total_learning_time', 'completed_courses', 'unfinished_courses', 'current_streak', 'next_exam_date',
+        )
+    }))
+    if insights.startswith('Error:'):
+        logger.warning("Dashboard insights for user %s failed: %s", stats.user_id, insights)
+        DashboardStats.objects.filter(pk=stats.pk).update(insights_requested_at=None)
+        return None
+
+    now = timezone.now()
+    DashboardStats.objects.filter(pk=stats.pk).update(
+        ai_insights=insights,
+        insights_fingerprint=fingerprint,
+        insights_generated_at=now,
+        insights_requested_at=None,
+        updated_at=now,
+    )
+    return insights
+
+
+def process_insight_requests(limit=None):
+    """
+    Generate insights for queued users, oldest request first. Meant for a
+    single scheduled worker; model calls run outside any transaction so
+    stat updates to the same rows are never blocked.
+
+    Returns:
+        int: Number of users whose insights were refreshed
+    """
+    pending = DashboardStats.objects.filter(insights_requested_at__isnull=False).order_by('insights_requested_at')
+    if limit:
+        pending = pending[:limit]
+    refreshed = 0
+    for stats in pending.iterator(chunk_size=100):
+        if stats.insights_fingerprint == stats_fingerprint(stats):
+            DashboardStats.objects.filter(pk=stats.pk).update(insights_requested_at=None)
+            continue
+        if generate_dashboard_insights(stats) is not None:
+            refreshed += 1
+    return refreshed
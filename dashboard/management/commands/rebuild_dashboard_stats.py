@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from dashboard.stats import rebuild_all_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's dashboard stats from courses, sessions, streaks and exams"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_all_stats(batch_size=options['batch_size'])
+        self.stdout.write(f"Rebuilt dashboard stats for {rebuilt} user(s)")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from dashboard.insights import process_insight_requests
+
+
+class Command(BaseCommand):
+    help = "Generate AI insights for users whose dashboard stats changed since their last analysis (run on a schedule)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Refresh at most this many users per run")
+
+    def handle(self, *args, **options):
+        refreshed = process_insight_requests(limit=options['limit'])
+        self.stdout.write(f"Refreshed dashboard insights for {refreshed} user(s)")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from dashboard.summary import ACTIVE_DAYS, precompute_snapshots
+
+
+class Command(BaseCommand):
+    help = "Precompute dashboard summary snapshots for recently active users (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ACTIVE_DAYS, help="Users active in the last N days")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes")
+
+    def handle(self, *args, **options):
+        users, seconds = precompute_snapshots(
+            days=options['days'], batch_size=options['batch_size'], workers=options['workers']
+        )
+        rate = users / seconds if seconds else 0
+        self.stdout.write(f"Snapshotted {users} dashboard(s) in {seconds:.2f}s ({rate:.1f} users/s)")
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicate_stats(apps, schema_editor):
+    """
+    Keep only the newest stats row of each user so the constraint can be
+    added; the counters are rebuilt from source data by rebuild_dashboard_stats.
+    """
+    DashboardStats = apps.get_model('dashboard', 'DashboardStats')
+    duplicated = (
+        DashboardStats.objects.values('user_id').annotate(rows=Count('id'), newest=Max('id'))
+        .filter(rows__gt=1).order_by()
+    )
+    for row in list(duplicated):
+        DashboardStats.objects.filter(user_id=row['user_id']).exclude(id=row['newest']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_rename_user_id_dashboardstats_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_stats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dashboardstats',
+            constraint=models.UniqueConstraint(fields=('user',), name='unique_dashboard_stats_user'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_unique_stats_per_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='ai_insights',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='ai_recommendations',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='insights_fingerprint',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='insights_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='insights_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dashboardstats',
+            index=models.Index(condition=models.Q(('insights_requested_at__isnull', False)), fields=['insights_requested_at'], name='pending_dashboard_insights_idx'),
+        ),
+    ]
@@ -9,6 +9,38 @@ class DashboardStats(models.Model):
     longest_streak = models.PositiveIntegerField(default=0)
     unfinished_courses = models.PositiveIntegerField(default=0)
     next_exam_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Conditional GET validator; queryset updates set it explicitly
+    ai_insights = models.TextField(null=True, blank=True)
+    ai_recommendations = models.TextField(null=True, blank=True)
+    insights_fingerprint = models.CharField(max_length=40, blank=True)  # Stats the insights were written for
+    insights_generated_at = models.DateTimeField(null=True, blank=True)
+    insights_requested_at = models.DateTimeField(null=True, blank=True)  # Set while a refresh is queued
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user'], name='unique_dashboard_stats_user'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['insights_requested_at'],
+                condition=models.Q(insights_requested_at__isnull=False),
+                name='pending_dashboard_insights_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Dashboard Stats for User {self.user_id}"
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed dashboard summary sections, written nightly for active users
+    by the ``snapshot_dashboards`` command. Only served on the day it was
+    written and while newer than the user's stats.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dashboard_snapshot')
+    summary = models.JSONField(default=dict)
+    generated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Dashboard Snapshot for User {self.user_id}"
@@ -6,4 +6,4 @@ class DashboardStatsSerializer(serializers.ModelSerializer):
     user = UserSerializer()
     class Meta:
         model = DashboardStats
-        fields = "__all__"
+        exclude = ['insights_fingerprint', 'insights_requested_at']
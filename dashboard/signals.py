@@ -0,0 +1,104 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from courses.models import Enrollment
+from streaks.models import StudyStreak
+from streaks.signals import streaks_reset
+from timetable.models import Exam, StudySession
+from . import stats
+from .models import DashboardSnapshot
+
+# Each handler turns one domain change into an O(1) delta on the user's
+# DashboardStats row; pre_save remembers what the row looked like before.
+
+
+def _learning_minutes(is_completed, start_time, end_time):
+    return round((end_time - start_time).total_seconds() / 60) if is_completed else 0
+
+
+def _enrollment_counts(status):
+    return {'completed_courses': int(status == 'completed'), 'unfinished_courses': int(status == 'active')}
+
+
+@receiver(pre_save, sender=StudySession)
+@receiver(pre_save, sender=Enrollment)
+@receiver(pre_save, sender=Exam)
+def remember_previous(sender, instance, **kwargs):
+    fields = {
+        StudySession: ('user_id', 'is_completed', 'start_time', 'end_time'),
+        Enrollment: ('student_id', 'status'),
+        Exam: ('user_id', 'exam_date'),
+    }[sender]
+    instance._dashboard_previous = (
+        sender.objects.filter(pk=instance.pk).values_list(*fields).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=StudySession)
+def study_session_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_dashboard_previous', None)
+    if previous and previous[0] != instance.user_id:
+        stats.apply_delta(previous[0], total_learning_time=-_learning_minutes(*previous[1:]))
+        previous = None
+    before = _learning_minutes(*previous[1:]) if previous else 0
+    after = _learning_minutes(instance.is_completed, instance.start_time, instance.end_time)
+    stats.apply_delta(instance.user_id, total_learning_time=after - before)
+
+
+@receiver(post_delete, sender=StudySession)
+def study_session_deleted(sender, instance, **kwargs):
+    stats.apply_delta(
+        instance.user_id,
+        total_learning_time=-_learning_minutes(instance.is_completed, instance.start_time, instance.end_time),
+    )
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_dashboard_previous', None)
+    before = _enrollment_counts(previous[1] if previous else None)
+    after = _enrollment_counts(instance.status)
+    stats.apply_delta(instance.student_id, **{field: after[field] - before[field] for field in after})
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    stats.apply_delta(
+        instance.student_id, **{field: -count for field, count in _enrollment_counts(instance.status).items()}
+    )
+
+
+@receiver(post_save, sender=StudyStreak)
+def streak_saved(sender, instance, created, **kwargs):
+    if created and not (instance.current_streak or instance.longest_streak):
+        return  # Blank streak from signup: nothing to count yet
+    stats.set_streak(instance.user_id, instance.current_streak, instance.longest_streak)
+
+
+@receiver(streaks_reset)
+def streaks_were_reset(sender, user_ids, **kwargs):
+    stats.DashboardStats.objects.filter(user_id__in=user_ids).update(current_streak=0, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Exam)
+def exam_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_dashboard_previous', None)
+    if previous and previous[1] != instance.exam_date:
+        stats.exam_removed(previous[0], previous[1])
+    stats.exam_added(instance.user_id, instance.exam_date)
+
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    stats.exam_removed(instance.user_id, instance.exam_date)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def drop_snapshot(sender, instance, **kwargs):
+    # Snapshots list enrollments and exams, which don't all move the stats row
+    user_id = instance.student_id if sender is Enrollment else instance.user_id
+    DashboardSnapshot.objects.filter(user_id=user_id).delete()
@@ -0,0 +1,137 @@
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+from courses.models import Enrollment
+from streaks.models import StudyStreak
+from timetable.models import Exam, StudySession
+from .models import DashboardStats
+
+User = get_user_model()
+
+STAT_FIELDS = [
+    'total_learning_time', 'completed_courses', 'unfinished_courses',
+    'current_streak', 'longest_streak', 'next_exam_date',
+]
+
+
+def compute_stats(user_ids, today=None):
+    """
+    Recompute every counter for a batch of users with one grouped query per
+    source table.
+
+    Returns:
+        dict: user_id -> {field: value}
+    """
+    today = today or date.today()
+    stats = {
+        user_id: {
+            'total_learning_time': 0, 'completed_courses': 0, 'unfinished_courses': 0,
+            'current_streak': 0, 'longest_streak': 0, 'next_exam_date': None,
+        }
+        for user_id in user_ids
+    }
+
+    sessions = (
+        StudySession.objects.filter(user_id__in=user_ids, is_completed=True)
+        .values('user_id').annotate(time=Sum(F('end_time') - F('start_time'))).order_by()
+    )
+    for row in sessions:
+        stats[row['user_id']]['total_learning_time'] = round(row['time'].total_seconds() / 60) if row['time'] else 0
+
+    enrollments = (
+        Enrollment.objects.filter(student_id__in=user_ids)
+        .values('student_id')
+        .annotate(completed=Count('id', filter=Q(status='completed')), active=Count('id', filter=Q(status='active')))
+        .order_by()
+    )
+    for row in enrollments:
+        stats[row['student_id']].update(completed_courses=row['completed'], unfinished_courses=row['active'])
+
+    streaks = (
+        StudyStreak.objects.filter(user_id__in=user_ids)
+        .values('user_id').annotate(current=Max('current_streak'), longest=Max('longest_streak')).order_by()
+    )
+    for row in streaks:
+        stats[row['user_id']].update(current_streak=row['current'], longest_streak=row['longest'])
+
+    exams = (
+        Exam.objects.filter(user_id__in=user_ids, exam_date__gte=today)
+        .values('user_id').annotate(next_exam=Min('exam_date')).order_by()
+    )
+    for row in exams:
+        stats[row['user_id']]['next_exam_date'] = row['next_exam']
+    return stats
+
+
+def rebuild_stats(user_ids, today=None):
+    """Overwrite the stats rows of a batch of users with freshly aggregated values."""
+    computed = compute_stats(user_ids, today=today)
+    rows = {s.user_id: s for s in DashboardStats.objects.filter(user_id__in=user_ids)}
+    missing = [DashboardStats(user_id=u, **values) for u, values in computed.items() if u not in rows]
+    now = timezone.now()
+    for user_id, row in rows.items():
+        for field, value in computed[user_id].items():
+            setattr(row, field, value)
+        row.updated_at = now
+    DashboardStats.objects.bulk_update(rows.values(), STAT_FIELDS + ['updated_at'], batch_size=1000)
+    DashboardStats.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(computed)
+
+
+def rebuild_all_stats(batch_size=1000):
+    """Recompute the stats of every user a batch at a time; returns the number of users."""
+    rebuilt, last_id = 0, 0
+    while True:
+        user_ids = list(User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not user_ids:
+            return rebuilt
+        with transaction.atomic():
+            rebuilt += rebuild_stats(user_ids)
+        last_id = user_ids[-1]
+
+
+def _update_or_build(user_id, **values):
+    """Apply an UPDATE to the user's row; a missing row is built from aggregates instead."""
+    values['updated_at'] = timezone.now()
+    if DashboardStats.objects.filter(user_id=user_id).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            rebuild_stats([user_id])
+    except IntegrityError:
+        DashboardStats.objects.filter(user_id=user_id).update(**values)
+
+
+def apply_delta(user_id, **deltas):
+    """Add deltas to counters in one UPDATE, never going below zero."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        _update_or_build(user_id, **{
+            field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()
+        })
+
+
+def set_streak(user_id, current_streak, longest_streak):
+    _update_or_build(
+        user_id, current_streak=current_streak,
+        longest_streak=Greatest(F('longest_streak'), Value(longest_streak)),
+    )
+
+
+def exam_added(user_id, exam_date, today=None):
+    """An upcoming exam can only move the next exam date earlier."""
+    if exam_date >= (today or date.today()):
+        _update_or_build(
+            user_id, next_exam_date=Least(Coalesce(F('next_exam_date'), Value(exam_date)), Value(exam_date))
+        )
+
+
+def exam_removed(user_id, exam_date, today=None):
+    """Only removing the current next exam needs the next one looked up."""
+    today = today or date.today()
+    if DashboardStats.objects.filter(user_id=user_id, next_exam_date=exam_date).exists():
+        upcoming = Exam.objects.filter(user_id=user_id, exam_date__gte=today).aggregate(next=Min('exam_date'))['next']
+        DashboardStats.objects.filter(user_id=user_id).update(next_exam_date=upcoming, updated_at=timezone.now())
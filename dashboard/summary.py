@@ -0,0 +1,206 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+import django
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+from courses.models import Enrollment
+from notifications.models import Notification
+from streaks.activity import user_today
+from streaks.models import XPSystem
+from streaks.ranking import rank_index, table_standing
+from timetable.models import Exam
+from .models import DashboardSnapshot, DashboardStats
+from .stats import STAT_FIELDS, rebuild_stats
+
+User = get_user_model()
+
+SUMMARY_LIMIT = 5  # Enrollments and exams per summary
+ACTIVE_DAYS = 7
+ROW_FIELDS = STAT_FIELDS + ['ai_insights', 'ai_recommendations']
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _empty_row():
+    return {field: DashboardStats._meta.get_field(field).get_default() for field in ROW_FIELDS}
+
+
+def build_sections(user_ids, limit=SUMMARY_LIMIT, today=None, rows=None, rebuild=True):
+    """
+    The precomputable part of the dashboard summary for a batch of users:
+    stats and streak, stored insights and recommendations, active
+    enrollments and upcoming exams. One query per section for the whole
+    batch. Values are JSON-ready so the result can be stored as a snapshot
+    as is.
+
+    Args:
+        rows (dict): user_id -> already loaded DashboardStats values
+        rebuild (bool): Rebuild missing stats rows first; when False they
+            read as empty stats
+    Returns:
+        dict: user_id -> sections
+    """
+    today = today or timezone.localdate()
+    rows = dict(rows or {})
+    missing = [user_id for user_id in user_ids if user_id not in rows]
+    if missing and rebuild:
+        query = DashboardStats.objects.filter(user_id__in=missing).values('user_id', *ROW_FIELDS)
+        rows.update((row['user_id'], row) for row in query)
+        unbuilt = [user_id for user_id in missing if user_id not in rows]
+        if unbuilt:
+            rebuild_stats(unbuilt, today=today)
+            query = DashboardStats.objects.filter(user_id__in=unbuilt).values('user_id', *ROW_FIELDS)
+            rows.update((row['user_id'], row) for row in query)
+
+    enrollments, exams = {}, {}
+    for enrollment in (
+        Enrollment.objects.filter(student_id__in=user_ids, status='active')
+        .select_related('course').order_by('student_id', '-last_accessed')
+    ):
+        entries = enrollments.setdefault(enrollment.student_id, [])
+        if len(entries) < limit:
+            entries.append({
+                'id': enrollment.id,
+                'course': enrollment.course_id,
+                'course_title': enrollment.course.title,
+                'progress': enrollment.progress,
+                'last_accessed': _iso(enrollment.last_accessed),
+            })
+    for user_id, exam_id, course_name, exam_date in (
+        Exam.objects.filter(user_id__in=user_ids, exam_date__gte=today)
+        .order_by('user_id', 'exam_date', 'id').values_list('user_id', 'id', 'course_name', 'exam_date')
+    ):
+        entries = exams.setdefault(user_id, [])
+        if len(entries) < limit:
+            entries.append({'id': exam_id, 'course_name': course_name, 'exam_date': _iso(exam_date)})
+
+    sections = {}
+    for user_id in user_ids:
+        row = rows.get(user_id) or _empty_row()
+        stats = {field: row[field] for field in STAT_FIELDS}
+        stats['next_exam_date'] = _iso(stats['next_exam_date'])
+        sections[user_id] = {
+            'stats': stats,
+            'streak': {'current': stats['current_streak'], 'longest': stats['longest_streak']},
+            'insights': row['ai_insights'],
+            'recommendations': row['ai_recommendations'],
+            'enrollments': enrollments.get(user_id, []),
+            'upcoming_exams': exams.get(user_id, []),
+        }
+    return sections
+
+
+def dashboard_summary(user, limit=SUMMARY_LIMIT, today=None):
+    """
+    Everything the home screen needs for one user, with dates in the
+    user's own timezone. Uses the user's snapshot when it was written that
+    local day and after the last stats change; XP, rank and the unread
+    count are always read live.
+
+    Nothing is rebuilt on this path: a user without a stats row (one
+    ``rebuild_dashboard_stats`` has not reached yet) gets empty stats, and a
+    process without a leaderboard index counts the rank in the database.
+    """
+    row = (
+        DashboardStats.objects.filter(user_id=user.id)
+        .values(
+            'user_id', 'updated_at', *ROW_FIELDS,
+            zone=F('user__study_streaks__timezone'),
+            snapshot=F('user__dashboard_snapshot__summary'),
+            snapshot_at=F('user__dashboard_snapshot__generated_at'),
+        )
+        .first()
+    )
+    if today is None:
+        today = user_today(user.id) if row is None else timezone.localdate(timezone=ZoneInfo(row['zone'] or 'UTC'))
+    fresh = (
+        row is not None and row['snapshot_at'] is not None and limit == SUMMARY_LIMIT
+        and row['snapshot_at'] >= row['updated_at']
+        and timezone.localdate(row['snapshot_at'], ZoneInfo(row['zone'] or 'UTC')) == today
+    )
+    if fresh:
+        sections = row['snapshot']
+    else:
+        sections = build_sections(
+            [user.id], limit=limit, today=today, rows={user.id: row} if row else None, rebuild=False,
+        )[user.id]
+
+    for exam in sections['upcoming_exams']:
+        exam['days_until'] = (date.fromisoformat(exam['exam_date']) - today).days
+
+    xp = XPSystem.objects.filter(user_id=user.id).values('total_xp', 'level').first() or {'total_xp': 0, 'level': 1}
+    index = rank_index.peek()
+    if index is None:
+        rank = table_standing(user.id)
+    elif user.id in index:
+        standing = index.standing(user.id, neighbors=0)
+        rank = {key: standing[key] for key in ('rank', 'percentile', 'total_users')}
+    else:
+        rank = None
+
+    return {
+        'user': {'id': user.id, 'username': user.username},
+        **sections,
+        'xp': xp,
+        'rank': rank,
+        'unread_notifications': Notification.objects.filter(user_id=user.id, is_read=False).count(),
+        'snapshot': fresh,
+    }
+
+
+# ------------------------- Nightly snapshots -------------------------
+
+def active_user_ids(days=ACTIVE_DAYS, now=None):
+    """Ids of users who logged in or studied in the last ``days`` days."""
+    since = (now or timezone.now()) - timedelta(days=days)
+    return list(
+        User.objects.filter(Q(last_login__gte=since) | Q(study_streaks__last_study_date__gte=since.date()))
+        .order_by('id').values_list('id', flat=True).distinct()
+    )
+
+
+def snapshot_dashboards(user_ids, today=None):
+    """Write (or replace) the snapshots of a batch of users; returns the batch size."""
+    generated_at = timezone.now()
+    sections = build_sections(user_ids, today=today)
+    DashboardSnapshot.objects.bulk_create(
+        [DashboardSnapshot(user_id=user_id, summary=summary, generated_at=generated_at)
+         for user_id, summary in sections.items()],
+        update_conflicts=True, unique_fields=['user'], update_fields=['summary', 'generated_at'],
+    )
+    return len(sections)
+
+
+def _snapshot_chunk(user_ids):
+    # Runs in a pool worker: connections inherited from the parent must not be reused
+    connections.close_all()
+    try:
+        return snapshot_dashboards(user_ids)
+    finally:
+        connections.close_all()
+
+
+def precompute_snapshots(days=ACTIVE_DAYS, batch_size=500, workers=1):
+    """
+    Snapshot the dashboards of every recently active user, a batch per task,
+    across ``workers`` processes (inline when 1).
+
+    Returns:
+        tuple: (users snapshotted, seconds taken)
+    """
+    started = time.monotonic()
+    user_ids = active_user_ids(days)
+    chunks = [user_ids[i:i + batch_size] for i in range(0, len(user_ids), batch_size)]
+    if workers > 1 and len(chunks) > 1:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            done = sum(pool.map(_snapshot_chunk, chunks))
+    else:
+        done = sum(snapshot_dashboards(chunk) for chunk in chunks)
+    return done, time.monotonic() - started
@@ -3,7 +3,19 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+from io import StringIO
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management import call_command
+from courses.models import Course, Enrollment
+from notifications.models import Notification
+from streaks.models import StudyStreak, XPSystem
+from streaks.ranking import rank_index
+from streaks.signals import streaks_reset
+from timetable.models import Exam, StudySession
 from .models import DashboardStats
+from .stats import STAT_FIELDS, apply_delta, rebuild_all_stats, rebuild_stats
 from .serializers import DashboardStatsSerializer
 from unittest.mock import patch
 import json
@@ -131,3 +143,222 @@ class DashboardViewsTest(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['updated_stats']['longest_streak'], 10)  # Updated
+
+
+class DashboardStatsEventsTest(TestCase):
+    """Stats follow domain events without being recomputed."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='learner',
+            email='learner@example.com',
+            password='testpass123'
+        )
+        self.course = Course.objects.create(title='Physics', instructor=self.user)
+
+    def stats(self):
+        return DashboardStats.objects.get(user=self.user)
+
+    def test_counters_follow_events_and_match_rebuild(self):
+        start = timezone.now() + timedelta(days=1)
+        session = StudySession.objects.create(
+            user=self.user, subject='Optics', start_time=start, end_time=start + timedelta(minutes=45)
+        )
+        self.assertFalse(DashboardStats.objects.filter(user=self.user).exists())  # Nothing to count yet
+        session.is_completed = True
+        session.save()
+        self.assertEqual(self.stats().total_learning_time, 45)
+
+        enrollment = Enrollment.objects.create(student=self.user, course=self.course)
+        self.assertEqual((self.stats().completed_courses, self.stats().unfinished_courses), (0, 1))
+        enrollment.status = 'completed'
+        enrollment.save()
+        self.assertEqual((self.stats().completed_courses, self.stats().unfinished_courses), (1, 0))
+
+        StudyStreak.objects.update_or_create(user=self.user, defaults={'current_streak': 4, 'longest_streak': 9})
+        self.assertEqual((self.stats().current_streak, self.stats().longest_streak), (4, 9))
+
+        today = timezone.now().date()
+        later = Exam.objects.create(user=self.user, course_name='Physics', exam_date=today + timedelta(days=20))
+        sooner = Exam.objects.create(user=self.user, course_name='Maths', exam_date=today + timedelta(days=5))
+        self.assertEqual(self.stats().next_exam_date, sooner.exam_date)
+        sooner.delete()
+        self.assertEqual(self.stats().next_exam_date, later.exam_date)
+
+        session.delete()
+        self.assertEqual(self.stats().total_learning_time, 0)
+
+        incremental = {field: getattr(self.stats(), field) for field in STAT_FIELDS}
+        DashboardStats.objects.filter(user=self.user).update(completed_courses=99, next_exam_date=None)
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+        self.assertEqual({field: getattr(self.stats(), field) for field in STAT_FIELDS}, incremental)
+
+    def test_rebuild_query_count_is_per_batch(self):
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpass123')
+        # Users batch, savepoint, four aggregates, existing rows, bulk insert,
+        # release, final empty batch
+        with self.assertNumQueries(10):
+            rebuild_all_stats(batch_size=1000)
+        self.assertEqual(DashboardStats.objects.count(), User.objects.count())
+
+
+class DashboardSummaryViewTest(APITestCase):
+    """The home screen summary comes back in a fixed number of queries."""
+
+    def setUp(self):
+        rank_index.invalidate()
+        self.user = User.objects.create_user(
+            username='learner',
+            email='learner@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        XPSystem.grant_xp(self.user.id, 250)
+
+    def test_summary_sections(self):
+        today = timezone.now().date()
+        for i in range(3):
+            course = Course.objects.create(title=f'Course {i}', instructor=self.user)
+            Enrollment.objects.create(student=self.user, course=course, progress=10.0 * i)
+            Exam.objects.create(user=self.user, course_name=course.title, exam_date=today + timedelta(days=i + 1))
+        Exam.objects.create(user=self.user, course_name='Past', exam_date=today - timedelta(days=1))
+        Notification.objects.create(user=self.user, title='Hi', message='Unread')
+        Notification.objects.create(user=self.user, title='Old', message='Read', is_read=True)
+        rank_index.get()
+
+        with self.assertNumQueries(5):
+            response = self.client.get('/dashboard/me/summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['xp'], {'total_xp': 250, 'level': 3})
+        self.assertEqual(response.data['rank']['rank'], 1)
+        self.assertEqual(len(response.data['enrollments']), 3)
+        self.assertEqual(response.data['stats']['unfinished_courses'], 3)
+        self.assertEqual([e['days_until'] for e in response.data['upcoming_exams']], [1, 2, 3])
+        self.assertEqual(response.data['unread_notifications'], 1)
+
+        response = self.client.get('/dashboard/me/summary/?limit=2')
+        self.assertEqual(len(response.data['upcoming_exams']), 2)
+        self.assertEqual(self.client.get('/dashboard/me/summary/?limit=x').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cold_start_builds_nothing(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        XPSystem.grant_xp(other.id, 100)
+        DashboardStats.objects.all().delete()
+
+        # Stats row, local date, enrollments, exams, XP, leaderboard XP, rank counts, unread count
+        with self.assertNumQueries(8):
+            response = self.client.get('/dashboard/me/summary/')
+        self.assertEqual(response.data['stats']['completed_courses'], 0)
+        self.assertEqual(response.data['rank'], {'rank': 1, 'total_users': 2, 'percentile': 100.0})
+        self.assertFalse(DashboardStats.objects.exists())
+        self.assertIsNone(rank_index.peek())
+
+    def test_dates_are_local_to_the_user(self):
+        StudyStreak.objects.filter(user=self.user).update(timezone='Pacific/Kiritimati')
+        local_today = timezone.localdate(timezone=ZoneInfo('Pacific/Kiritimati'))
+        behind = timezone.localdate(timezone=ZoneInfo('Pacific/Pago_Pago'))
+        Exam.objects.create(user=self.user, course_name='Today locally', exam_date=local_today)
+        Exam.objects.create(user=self.user, course_name='Already over', exam_date=behind)
+        rebuild_stats([self.user.id])
+
+        exams = self.client.get('/dashboard/me/summary/').data['upcoming_exams']
+        self.assertEqual([(e['course_name'], e['days_until']) for e in exams], [('Today locally', 0)])
+
+    def test_nightly_snapshot(self):
+        today = timezone.now().date()
+        course = Course.objects.create(title='Optics', instructor=self.user)
+        Enrollment.objects.create(student=self.user, course=course, progress=40.0)
+        Exam.objects.create(user=self.user, course_name='Optics', exam_date=today + timedelta(days=3))
+        StudyStreak.objects.update_or_create(
+            user=self.user, defaults={'current_streak': 2, 'longest_streak': 2, 'last_study_date': today}
+        )
+        User.objects.create_user(username='idle', email='idle@example.com', password='testpass123')
+        rank_index.get()
+        live = self.client.get('/dashboard/me/summary/').data
+
+        out = StringIO()
+        call_command('snapshot_dashboards', stdout=out)
+        self.assertIn('Snapshotted 1 dashboard(s)', out.getvalue())
+        self.assertIn('users/s', out.getvalue())
+
+        with self.assertNumQueries(3):  # Snapshot with stats, XP, unread count
+            response = self.client.get('/dashboard/me/summary/')
+        snapshot = response.json()
+        self.assertTrue(snapshot.pop('snapshot'))
+        self.assertFalse(live.pop('snapshot'))
+        self.assertEqual(snapshot, json.loads(json.dumps(live, cls=DjangoJSONEncoder)))
+
+        # Stats changes and new exams make the snapshot stale
+        apply_delta(self.user.id, completed_courses=1)
+        self.assertFalse(self.client.get('/dashboard/me/summary/').data['snapshot'])
+        call_command('snapshot_dashboards', stdout=StringIO())
+        Exam.objects.create(user=self.user, course_name='Maths', exam_date=today + timedelta(days=1))
+        response = self.client.get('/dashboard/me/summary/')
+        self.assertFalse(response.data['snapshot'])
+        self.assertEqual(response.data['upcoming_exams'][0]['course_name'], 'Maths')
+
+
+class DashboardInsightsTest(APITestCase):
+    """Dashboard reads serve stored insights and only queue refreshes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='learner',
+            email='learner@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/dashboard/dashboard/{self.user.id}/stats/'
+        rebuild_stats([self.user.id])
+
+    @patch('dashboard.insights.TaeAI')
+    def test_stale_while_revalidate(self, mock_ai):
+        mock_ai.return_value.process_text.return_value = 'Keep going'
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['ai_insights'])
+        mock_ai.return_value.process_text.assert_not_called()
+        self.assertIsNotNone(DashboardStats.objects.get(user=self.user).insights_requested_at)
+
+        call_command('refresh_dashboard_insights', stdout=StringIO())
+        stats = DashboardStats.objects.get(user=self.user)
+        self.assertEqual(stats.ai_insights, 'Keep going')
+        self.assertIsNone(stats.insights_requested_at)
+
+        # A few extra minutes of study don't change the fingerprint
+        DashboardStats.objects.filter(user=self.user).update(total_learning_time=10)
+        self.assertEqual(self.client.get(self.url).data['ai_insights'], 'Keep going')
+        self.assertIsNone(DashboardStats.objects.get(user=self.user).insights_requested_at)
+
+        # A finished course does; the old insights are still served meanwhile
+        DashboardStats.objects.filter(user=self.user).update(completed_courses=1)
+        mock_ai.return_value.process_text.return_value = 'Well done'
+        self.assertEqual(self.client.get(self.url).data['ai_insights'], 'Keep going')
+        self.assertEqual(mock_ai.return_value.process_text.call_count, 1)
+        call_command('refresh_dashboard_insights', stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).data['ai_insights'], 'Well done')
+
+    def test_missing_row_is_not_built_on_get(self):
+        DashboardStats.objects.filter(user=self.user).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['completed_courses'], 0)
+        self.assertNotIn('ETag', response)
+        self.assertFalse(DashboardStats.objects.filter(user=self.user).exists())
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        apply_delta(self.user.id, completed_courses=1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['completed_courses'], 1)
+
+        # A streak reset by reconcile_streaks changes the ETag too
+        etag = response['ETag']
+        streaks_reset.send(sender=StudyStreak, user_ids=[self.user.id])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import DashboardStatsRetrieveView
+from .views import DashboardStatsRetrieveView, DashboardSummaryView
 
 urlpatterns = [
+    path('me/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
     path('dashboard/<int:user_id>/stats/', DashboardStatsRetrieveView.as_view(), name='dashboard-stats-retrieve'),
 ]
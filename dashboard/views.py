@@ -5,6 +5,10 @@ from django.shortcuts import get_object_or_404
 from django.core.cache import cache
 from .models import DashboardStats
 from .serializers import DashboardStatsSerializer
+from .insights import request_insights_refresh
+from .summary import SUMMARY_LIMIT, dashboard_summary
+from studypal.conditional import ConditionalGetMixin
+from rest_framework.views import APIView
 from accounts.models import CustomUser
 from study_assistant.ai_service import TaeAI
 from rest_framework.permissions import IsAuthenticated
@@ -13,37 +17,6 @@ from drf_yasg import openapi
 
 # ------------------------- Helper Functions -------------------------
 
-def generate_dashboard_insights(user_id):
-    """AI-generated learning progress analysis."""
-    user = CustomUser.objects.filter(id=user_id).first()
-    if not user:
-        return "User not found."
-
-    stats = DashboardStats.objects.filter(user=user).first()
-    if not stats:
-        return "Dashboard stats not found."
-
-    cache_key = f'dashboard_insights_{user_id}'
-    
-    # Check if cached insights exist
-    existing_insights = cache.get(cache_key)
-    if existing_insights and stats.ai_insights == existing_insights:
-        return "Insights already generated."
-
-    ai_assistant = TaeAI()
-    insights = ai_assistant.process_text(
-        f"Analyze learning stats:\n"
-        f"Total Learning Time: {stats.total_learning_time} minutes\n"
-        f"Completed Courses: {stats.completed_courses}\n"
-        f"Current Streak: {stats.current_streak} days\n"
-        f"Next Exam Date: {stats.next_exam_date}"
-    )
-
-    stats.ai_insights = insights
-    stats.save()
-    cache.set(cache_key, insights, timeout=3600)  # Cache for 1 hour
-    return insights
-
 def generate_dashboard_recommendations(user_id, learning_time, completed_courses, unfinished_courses, current_streak):
     """AI-generated learning recommendations based on latest stats."""
     user = CustomUser.objects.filter(id=user_id).first()
@@ -71,22 +44,58 @@ def generate_dashboard_recommendations(user_id, learning_time, completed_courses
 
 # ------------------------- API Views -------------------------
 
-class DashboardStatsRetrieveView(generics.RetrieveAPIView):
-    """Retrieve a user's dashboard stats with AI-powered insights."""
+class DashboardStatsRetrieveView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """
+    Retrieve a user's dashboard stats with AI-powered insights.
+
+    Insights are served from the last stored analysis; when the stats have
+    changed meaningfully since, a refresh is queued for the
+    ``refresh_dashboard_insights`` command instead of calling the model here.
+    A user whose row ``rebuild_dashboard_stats`` has not built yet gets empty
+    stats rather than a rebuild on the request. Supports conditional GET on
+    the row's ``updated_at``.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = DashboardStatsSerializer
     lookup_field = 'user_id'
     lookup_url_kwarg = 'user_id'
 
-    def get_object(self):
-        user = get_object_or_404(CustomUser, id=self.kwargs['user_id'])
-        stats, created = DashboardStats.objects.get_or_create(user=user)
-
-        cache_key = f'dashboard_insights_{self.kwargs["user_id"]}'
-        insights = cache.get(cache_key)
+    def get_validators(self):
+        user_id = self.kwargs['user_id']
+        updated_at = DashboardStats.objects.filter(user_id=user_id).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return (user_id, updated_at), updated_at
 
-        if not insights:
-            insights = generate_dashboard_insights(self.kwargs['user_id'])
+    def get_object(self):
+        user_id = self.kwargs['user_id']
+        stats = DashboardStats.objects.filter(user_id=user_id).first()
+        if stats is None:
+            user = get_object_or_404(CustomUser, id=user_id)
+            return DashboardStats(user=user)
+        request_insights_refresh(stats)
+        return stats
+
+class DashboardSummaryView(APIView):
+    """
+    Everything the home screen needs in one response, for the authenticated
+    user: stats and streak, stored insights and recommendations, XP and
+    level, leaderboard rank, active enrollments with progress, upcoming
+    exams and unread notifications.
+    
+    Uses a fixed number of queries however much data the user has, fewer
+    when the nightly snapshot is still fresh, and never rebuilds stats or
+    the leaderboard index on the request; the rank comes from the in-memory
+    index when this process has one and from two counting queries otherwise.
+    
+    Query Parameters:
+        limit (int): Enrollments and exams to include, default 5, at most 20
+    """
+    permission_classes = [IsAuthenticated]
 
-        stats.ai_insights = insights
-        return stats
\ No newline at end of file
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', SUMMARY_LIMIT)), 1), 20)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(dashboard_summary(request.user, limit=limit))
@@ -1,7 +1,7 @@
 import json
 import logging
 from django.utils.timezone import now
-from django.core.mail import send_mail
+from django.core.mail import send_mail, send_mass_mail
 from django.conf import settings
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
@@ -79,6 +79,79 @@ def send_notification(user_id, title, message, notification_type="system", sourc
 
     return f"✅ Notification sent to {user.username}"
 
+def send_bulk_notifications(notifications, notification_type="system", source_model=None, priority=0):
+    """
+    Creates and sends many notifications of one type with a fixed number of
+    queries: preferences and users are loaded in bulk, rows are bulk-inserted
+    and emails go out over a single connection.
+
+    Args:
+        notifications (iterable): Dicts with user_id, title, message and optional source_id
+    Returns:
+        list: The created Notification objects
+    """
+    notifications = list(notifications)
+    user_ids = {n['user_id'] for n in notifications}
+    users = User.objects.in_bulk(user_ids)
+    prefs = {p.user_id: p for p in NotificationPreference.objects.filter(user_id__in=user_ids)}
+    missing = [NotificationPreference(user_id=user_id) for user_id in users if user_id not in prefs]
+    NotificationPreference.objects.bulk_create(missing, ignore_conflicts=True)
+    prefs.update((p.user_id, p) for p in missing)
+
+    allowed = [
+        n for n in notifications
+        if n['user_id'] in users and prefs[n['user_id']].can_send_notification(notification_type)
+    ]
+    created = Notification.objects.bulk_create([
+        Notification(
+            user_id=n['user_id'],
+            title=n['title'],
+            message=n['message'],
+            notification_type=notification_type,
+            source_id=n.get('source_id'),
+            source_model=source_model,
+            priority=priority,
+        )
+        for n in allowed
+    ])
+
+    emails = [
+        (n['title'], n['message'], settings.EMAIL_HOST_USER, [users[n['user_id']].email])
+        for n in allowed if prefs[n['user_id']].email_notifications
+    ]
+    if emails:
+        try:
+            send_mass_mail(emails, fail_silently=False)
+            logger.info(f"📧 Sent {len(emails)} {notification_type} notification email(s)")
+        except Exception as e:
+            logger.error(f"❌ Failed to send {notification_type} notification emails: {str(e)}")
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning("⚠️ WebSocket channel layer is not available. Skipping real-time notifications.")
+        return created
+    for notification in created:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f"user_{notification.user_id}",
+                {
+                    "type": "send_notification",
+                    "notification_id": notification.id,
+                    "title": notification.title,
+                    "message": notification.message,
+                    "timestamp": now().isoformat(),
+                    "notification_type": notification_type,
+                    "source_id": notification.source_id,
+                    "source_model": source_model,
+                    "priority": priority,
+                    "is_ai_enhanced": False,
+                    "ai_insights": None
+                }
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to send real-time notification: {str(e)}")
+    return created
+
 def some_task_function():
     # Task logic here
     pass
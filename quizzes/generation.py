@@ -0,0 +1,145 @@
+import hashlib
+import logging
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from study_assistant.ai_service import TaeAI
+from .models import Quiz, QuizGenerationJob
+from .question_bank import import_records
+
+logger = logging.getLogger(__name__)
+
+# Drafts depend only on the lesson content, so they can be kept for a long time
+GENERATION_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# A running job whose worker hasn't finished within this is presumed dead
+# and handed to the next worker
+JOB_LEASE = timedelta(minutes=10)
+
+GENERATION_PROMPT = """Write {num_questions} quiz questions that test understanding of the lesson below.
+Respond with JSON only, shaped as:
+{{"questions": [{{"text": "...", "question_type": "multiple_choice" | "true_false" | "short_answer",
+"points": 1, "answers": [{{"text": "...", "is_correct": true, "explanation": "..."}}]}}]}}
+Multiple choice questions need four answers with exactly one correct.
+True/false questions need the answers "True" and "False".
+Short answer questions need one correct answer.
+
+Lesson: {title}
+{content}"""
+
+
+def lesson_content_hash(lesson):
+    """Fingerprint of everything the generated quiz depends on."""
+    return hashlib.sha256(f"{lesson.title}\n{lesson.content}".encode()).hexdigest()
+
+
+def request_quiz_generation(lesson, user=None, num_questions=10):
+    """
+    Queue a draft quiz for a lesson, reusing any job for the same content.
+    Returns:
+        tuple: (QuizGenerationJob, created)
+    """
+    content_hash = lesson_content_hash(lesson)
+    existing = (
+        QuizGenerationJob.objects
+        .filter(lesson=lesson, content_hash=content_hash, num_questions=num_questions)
+        .exclude(status='failed')
+        .exclude(status='completed', quiz__isnull=True)  # Draft was deleted
+        .first()
+    )
+    if existing:
+        return existing, False
+    job = QuizGenerationJob.objects.create(
+        lesson=lesson,
+        requested_by=user,
+        content_hash=content_hash,
+        num_questions=num_questions,
+    )
+    return job, True
+
+
+def _draft_questions(lesson, content_hash, num_questions):
+    """AI-drafted question records, cached by content hash."""
+    cache_key = f'quiz_generation_{content_hash}_{num_questions}'
+    questions = cache.get(cache_key)
+    if questions is not None:
+        return questions, cache_key
+
+    result = TaeAI().generate_json(GENERATION_PROMPT.format(
+        num_questions=num_questions, title=lesson.title, content=lesson.content
+    ))
+    questions = result.get('questions') if isinstance(result, dict) else result
+    if not isinstance(questions, list):
+        raise ValueError("AI response did not contain a list of questions")
+    cache.set(cache_key, questions, timeout=GENERATION_CACHE_TIMEOUT)
+    return questions, cache_key
+
+
+def run_generation_job(job):
+    """
+    Draft a quiz for a claimed job and bulk-write its questions. The result
+    is only recorded while the job's lease is still ours; otherwise the
+    draft is dropped, as another worker has taken the job over.
+    """
+    lesson = job.lesson
+    job.content_hash = lesson_content_hash(lesson)
+    cache_key = None
+    quiz = None
+    try:
+        questions, cache_key = _draft_questions(lesson, job.content_hash, job.num_questions)
+        with transaction.atomic():
+            quiz = Quiz.objects.create(
+                course_id=lesson.course_id,
+                title=f"{lesson.title} Quiz",
+                description=f"Draft generated from the lesson \"{lesson.title}\".",
+                is_published=False,
+            )
+            if not import_records(quiz, questions[:job.num_questions], skip_invalid=True):
+                raise ValueError("AI response contained no valid questions")
+        job.quiz = quiz
+        job.status = 'completed'
+        job.error = ''
+    except Exception as e:
+        logger.error(f"Quiz generation failed for lesson {lesson.id}: {e}")
+        if cache_key:
+            cache.delete(cache_key)  # Don't keep serving an unusable draft
+        job.status = 'failed'
+        job.error = str(e)
+    job.completed_at = timezone.now()
+    finished = QuizGenerationJob.objects.filter(id=job.id, status='running', started_at=job.started_at).update(
+        quiz=job.quiz, status=job.status, error=job.error, content_hash=job.content_hash, completed_at=job.completed_at
+    )
+    if not finished and quiz is not None and job.status == 'completed':
+        quiz.delete()
+    return job
+
+
+def process_pending_jobs(limit=None):
+    """
+    Run pending jobs oldest first. Each job is claimed with a conditional
+    UPDATE that starts a JOB_LEASE, so several workers can drain the queue
+    concurrently; running jobs whose lease expired (their worker died) are
+    claimed again.
+    Returns:
+        int: Number of jobs processed
+    """
+    def claimable():
+        expired = timezone.now() - JOB_LEASE
+        return Q(status='pending') | Q(status='running') & (Q(started_at__lt=expired) | Q(started_at__isnull=True))
+
+    pending = (
+        QuizGenerationJob.objects.filter(claimable())
+        .order_by('created_at')
+        .values_list('id', flat=True)
+    )
+    if limit:
+        pending = pending[:limit]
+
+    processed = 0
+    for job_id in list(pending):
+        if not QuizGenerationJob.objects.filter(claimable(), id=job_id).update(status='running', started_at=timezone.now()):
+            continue  # Claimed by another worker
+        run_generation_job(QuizGenerationJob.objects.select_related('lesson').get(id=job_id))
+        processed += 1
+    return processed
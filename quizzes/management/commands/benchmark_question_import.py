@@ -0,0 +1,57 @@
+import io
+import json
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from courses.models import Course
+from quizzes.models import Quiz
+from quizzes.question_bank import import_questions, export_questions
+
+
+class Command(BaseCommand):
+    help = "Measure bulk question import/export throughput; all rows are rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=20000)
+        parser.add_argument('--answers', type=int, default=4, help="Answers per question")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count, per_question = options['questions'], options['answers']
+        payload = json.dumps([
+            {
+                'text': f"Benchmark question {i}",
+                'question_type': 'multiple_choice',
+                'points': 1 + i % 3,
+                'answers': [
+                    {'text': f"Option {j}", 'is_correct': j == 0}
+                    for j in range(per_question)
+                ],
+            }
+            for i in range(count)
+        ]).encode()
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(email='benchmark@studypal.local', username='benchmark')
+            course = Course.objects.create(title="Benchmark", instructor=user)
+            quiz = Quiz.objects.create(course=course, title="Benchmark")
+
+            started = time.perf_counter()
+            created = import_questions(quiz, io.BytesIO(payload), batch_size=options['batch_size'])
+            import_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            exported = sum(1 for _ in export_questions(quiz))
+            export_seconds = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Database: {connection.vendor}")
+        self.stdout.write(
+            f"Import: {created} questions / {created * per_question} answers in {import_seconds:.2f}s "
+            f"({created / import_seconds:,.0f} questions/s)"
+        )
+        self.stdout.write(
+            f"Export: {exported} questions in {export_seconds:.2f}s ({exported / export_seconds:,.0f} questions/s)"
+        )
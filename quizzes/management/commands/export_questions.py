@@ -0,0 +1,25 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.question_bank import export_questions
+
+
+class Command(BaseCommand):
+    help = "Export a quiz's questions and answers as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('--output', help="Output file; defaults to stdout")
+
+    def handle(self, *args, **options):
+        quiz = Quiz.objects.filter(pk=options['quiz_id']).first()
+        if not quiz:
+            raise CommandError(f"Quiz {options['quiz_id']} not found")
+
+        out = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in export_questions(quiz):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.question_bank import IMPORT_FORMATS, QuestionImportError, detect_format, import_questions
+
+
+class Command(BaseCommand):
+    help = "Bulk import questions and answers into a quiz from a JSON, NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('path', help="File to import")
+        parser.add_argument('--type', choices=IMPORT_FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        quiz = Quiz.objects.filter(pk=options['quiz_id']).first()
+        if not quiz:
+            raise CommandError(f"Quiz {options['quiz_id']} not found")
+
+        fmt = options['type'] or detect_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                created = import_questions(quiz, stream, fmt=fmt, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except QuestionImportError as e:
+            for error in e.errors[:20]:
+                self.stderr.write(f"Row {error['row']}: {'; '.join(error['errors'])}")
+            raise CommandError(f"Import aborted: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} questions into '{quiz.title}'"))
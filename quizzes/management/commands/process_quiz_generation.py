@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from quizzes.generation import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Draft quizzes for pending lesson quiz generation jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help="Maximum jobs per pass")
+        parser.add_argument('--watch', action='store_true', help="Keep polling for new jobs")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls with --watch")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_jobs(limit=options['limit'])
+            if processed:
+                self.stdout.write(f"Processed {processed} quiz generation job(s)")
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
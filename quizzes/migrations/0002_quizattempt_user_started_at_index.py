@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-started_at', '-id'], name='quizzes_qui_user_id_a2752f_idx'),
+        ),
+    ]
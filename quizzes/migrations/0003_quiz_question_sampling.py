@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_quizattempt_user_started_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_bank',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='questions_per_attempt',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of questions drawn at random for each attempt; empty serves the whole bank', null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='sample_stratify_by',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('question_type', 'Question Type'), ('points', 'Points')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quizgenerationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('content', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='quizzes.quiz')),
+            ],
+            options={
+                'ordering': ['-number'],
+                'unique_together': {('quiz', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='attempts', to='quizzes.quizversion'),
+        ),
+    ]
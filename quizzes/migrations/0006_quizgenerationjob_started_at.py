@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_quizversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizgenerationjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker claimed the job; its lease runs from here', null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_quizgenerationjob_started_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='quiz',
+            name='question_bank',
+        ),
+    ]
@@ -1,8 +1,42 @@
+import random
+from functools import lru_cache
 from django.conf import settings
-from django.db import models
-from courses.models import Course
+from django.db import models, transaction
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from courses.models import Course, Lesson
+
+def sample_from_bank(bank, k):
+    """
+    Draw ``k`` question ids from a {stratum: [ids]} bank.
+    Strata are allocated proportionally (largest remainder) so the sample
+    keeps the bank's mix of question types or point values.
+    """
+    total = sum(len(ids) for ids in bank.values())
+    k = min(k, total)
+    if not k:
+        return []
+
+    quotas = {stratum: len(ids) * k / total for stratum, ids in bank.items()}
+    counts = {stratum: int(quota) for stratum, quota in quotas.items()}
+    remainder = k - sum(counts.values())
+    for stratum in sorted(quotas, key=lambda s: quotas[s] - counts[s], reverse=True)[:remainder]:
+        counts[stratum] += 1
+
+    sampled = []
+    for stratum, ids in bank.items():
+        sampled.extend(random.sample(ids, counts[stratum]))
+    random.shuffle(sampled)
+    return sampled
 
 class Quiz(models.Model):
+    STRATIFY_CHOICES = (
+        ('', 'None'),
+        ('question_type', 'Question Type'),
+        ('points', 'Points'),
+    )
+
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="quizzes")
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -14,6 +48,11 @@ class Quiz(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=False)
+    questions_per_attempt = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Number of questions drawn at random for each attempt; empty serves the whole bank"
+    )
+    sample_stratify_by = models.CharField(max_length=20, choices=STRATIFY_CHOICES, blank=True, default='')
 
     class Meta:
         ordering = ['-created_at']
@@ -21,6 +60,67 @@ class Quiz(models.Model):
     def __str__(self):
         return f"{self.title} - {self.course.title}"
 
+    def touch(self):
+        """
+        Bump ``updated_at`` after its questions or answers change, so the
+        quiz's conditional GET validators and draft snapshots see the new
+        content.
+        """
+        self.updated_at = timezone.now()
+        Quiz.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+
+    def build_content(self):
+        """Serialize the quiz, its questions and answer key into one JSON document."""
+        answers = {}
+        for question_id, pk, text, is_correct, explanation in (
+            Answer.objects.filter(question__quiz=self)
+            .order_by('id')
+            .values_list('question_id', 'id', 'text', 'is_correct', 'explanation')
+        ):
+            answers.setdefault(question_id, []).append(
+                {'id': pk, 'text': text, 'is_correct': is_correct, 'explanation': explanation}
+            )
+
+        questions, bank = [], {}
+        stratify_by = self.sample_stratify_by
+        for pk, text, question_type, points, order in (
+            self.questions.order_by('order', 'id').values_list('id', 'text', 'question_type', 'points', 'order')
+        ):
+            question = {
+                'id': pk, 'text': text, 'question_type': question_type,
+                'points': points, 'order': order, 'answers': answers.get(pk, []),
+            }
+            questions.append(question)
+            bank.setdefault(str(question[stratify_by]) if stratify_by else '', []).append(pk)
+
+        return {
+            'title': self.title,
+            'time_limit': self.time_limit,
+            'pass_percentage': self.pass_percentage,
+            'questions_per_attempt': self.questions_per_attempt,
+            'questions': questions,
+            'bank': bank,
+        }
+
+    def current_version(self):
+        """
+        The version new attempts are pinned to. A published quiz serves its
+        latest published version; a draft is snapshotted again only when its
+        content changed since the last snapshot, so edits reach new attempts.
+        """
+        version = self.versions.first()
+        if version is not None and (self.is_published or version.created_at >= self.updated_at):
+            return version
+        return QuizVersion.snapshot(self)
+
+    def publish(self):
+        """Freeze the current questions into a new version and mark the quiz published."""
+        version = QuizVersion.snapshot(self)
+        if not self.is_published:
+            self.is_published = True
+            self.save(update_fields=['is_published', 'updated_at'])
+        return version
+
 class Question(models.Model):
     QUESTION_TYPES = (
         ('multiple_choice', 'Multiple Choice'),
@@ -52,6 +152,88 @@ class Answer(models.Model):
     def __str__(self):
         return f"{self.text} ({'Correct' if self.is_correct else 'Incorrect'})"
 
+class QuizVersion(models.Model):
+    """
+    Immutable snapshot of a quiz, taken at publish time (or, for a draft,
+    at the first attempt after its content changed). Attempts pin a
+    version, so later edits to questions or answers never change what an
+    in-flight attempt is served or graded against.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="versions")
+    number = models.PositiveIntegerField()
+    content = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-number']
+        unique_together = ['quiz', 'number']
+
+    def __str__(self):
+        return f"{self.quiz.title} v{self.number}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Quiz versions are immutable; publish a new version instead")
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def snapshot(cls, quiz):
+        with transaction.atomic():
+            # Lock the quiz row (FOR UPDATE is dropped from aggregates) so
+            # concurrent snapshots take turns numbering their versions
+            Quiz.objects.select_for_update().only('id').get(pk=quiz.pk)
+            last = cls.objects.filter(quiz=quiz).aggregate(last=models.Max('number'))['last']
+            return cls.objects.create(quiz=quiz, number=(last or 0) + 1, content=quiz.build_content())
+
+    def sample_question_ids(self):
+        """Draw an attempt's questions from this version's bank."""
+        if not self.content['questions_per_attempt']:
+            return []
+        return sample_from_bank(self.content['bank'], self.content['questions_per_attempt'])
+
+@lru_cache(maxsize=512)
+def load_version_content(version_id):
+    """
+    Version content by id, cached for the life of the process. Safe because
+    versions never change; callers must treat the result as read-only.
+    """
+    return QuizVersion.objects.values_list('content', flat=True).get(pk=version_id)
+
+def public_question(question):
+    """A question as served to students, without the answer key."""
+    return {
+        'id': question['id'],
+        'text': question['text'],
+        'question_type': question['question_type'],
+        'points': question['points'],
+        'order': question['order'],
+        'answers': [
+            {'id': answer['id'], 'text': answer['text']}
+            for answer in question['answers']
+        ] if question['question_type'] != 'short_answer' else [],
+    }
+
+def pass_threshold():
+    """
+    An attempt's pass mark as a query expression: the one frozen in its
+    version, or the live quiz's for attempts from before versioning.
+    """
+    return Coalesce(
+        Cast(KeyTextTransform('pass_percentage', 'version__content'), models.FloatField()),
+        Cast('quiz__pass_percentage', models.FloatField()),
+    )
+
+class QuizAttemptQuerySet(models.QuerySet):
+    def with_passed(self):
+        """Annotate ``is_passed`` in SQL so listings don't load each attempt's quiz."""
+        return self.annotate(
+            is_passed=models.Case(
+                models.When(score__gte=pass_threshold(), then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            )
+        )
+
 class QuizAttempt(models.Model):
     STATUS_CHOICES = (
         ('in_progress', 'In Progress'),
@@ -66,10 +248,17 @@ class QuizAttempt(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     time_spent = models.DurationField(null=True, blank=True)
+    version = models.ForeignKey(QuizVersion, on_delete=models.PROTECT, null=True, blank=True, related_name='attempts')
+    question_ids = models.JSONField(default=list, blank=True)  # Sampled questions pinned to this attempt
+
+    objects = QuizAttemptQuerySet.as_manager()
 
     class Meta:
         ordering = ['-started_at']
         unique_together = ['quiz', 'user', 'started_at']
+        indexes = [
+            models.Index(fields=['user', '-started_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s attempt at {self.quiz.title} - Score: {self.score or 'In Progress'}"
@@ -78,4 +267,73 @@ class QuizAttempt(models.Model):
     def passed(self):
         if self.score is None:
             return False
+        if self.version_id:
+            return self.score >= load_version_content(self.version_id)['pass_percentage']
         return self.score >= self.quiz.pass_percentage
+
+    def get_questions(self):
+        """
+        Questions (with answer key) for this attempt, in the order they were
+        drawn. Pinned attempts read their cached version; older attempts
+        without one fall back to the live questions.
+        """
+        content = load_version_content(self.version_id) if self.version_id else self.quiz.build_content()
+        questions = content['questions']
+        if not self.question_ids:
+            return questions
+        by_id = {question['id']: question for question in questions}
+        return [by_id[pk] for pk in self.question_ids if pk in by_id]
+
+    def grade(self, responses):
+        """
+        Score the attempt against its pinned questions only.
+        Args:
+            responses (dict): question id -> chosen answer id, or free text for short answers
+        Returns:
+            float: Percentage of available points earned
+        """
+        earned = possible = 0
+        for question in self.get_questions():
+            possible += question['points']
+            response = responses.get(question['id'], responses.get(str(question['id'])))
+            if response is None:
+                continue
+            correct = [a for a in question['answers'] if a['is_correct']]
+            if question['question_type'] == 'short_answer':
+                text = str(response).strip().lower()
+                is_correct = any(a['text'].strip().lower() == text for a in correct)
+            else:
+                is_correct = any(str(a['id']) == str(response) for a in correct)
+            if is_correct:
+                earned += question['points']
+        return round(earned * 100 / possible, 2) if possible else 0.0
+
+class QuizGenerationJob(models.Model):
+    """A request to draft a quiz from a lesson's content, processed in the background."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='quiz_generation_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    quiz = models.ForeignKey(Quiz, on_delete=models.SET_NULL, null=True, blank=True, related_name='generation_jobs')
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the lesson content the quiz was drafted from")
+    num_questions = models.PositiveIntegerField(default=10)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the job; its lease runs from here")
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['lesson', 'content_hash', 'num_questions']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Quiz generation for {self.lesson.title} ({self.status})"
@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination
+
+
+class QuizCursorPagination(CursorPagination):
+    """Keyset pagination for quizzes, newest first."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class QuestionCursorPagination(QuizCursorPagination):
+    """
+    Keyset pagination for a quiz's questions in creation order. The cursor
+    only positions on the first ordering field and ``order`` is mostly 0,
+    so it can't lead; clients sort a page by ``order`` themselves.
+    """
+    ordering = ('id',)
+
+
+class AnswerCursorPagination(QuizCursorPagination):
+    """Keyset pagination for a question's answers."""
+    ordering = ('id',)
+
+
+class QuizAttemptCursorPagination(QuizCursorPagination):
+    """Keyset pagination for a user's attempts, most recent first."""
+    ordering = ('-started_at', '-id')
@@ -0,0 +1,298 @@
+import codecs
+import csv
+import json
+from django.db import transaction
+from django.db.models import Max
+from .models import Question, Answer
+
+IMPORT_FORMATS = ('json', 'ndjson', 'csv')
+QUESTION_TYPES = dict(Question.QUESTION_TYPES)
+ANSWER_TEXT_MAX_LENGTH = Answer._meta.get_field('text').max_length
+MAX_POSITIVE_INT = 2147483647  # PositiveIntegerField's range on every backend
+# A decode error further than this from the end of the buffered text can't
+# be fixed by reading more of the stream; shorter distances may just be a
+# literal or escape cut off at a chunk boundary.
+TRUNCATION_WINDOW = 32
+MAX_RECORD_CHARS = 1024 * 1024
+
+
+class QuestionImportError(Exception):
+    """Raised when an import batch fails validation; nothing from the import is kept."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid question(s)")
+        self.errors = errors
+
+
+# ------------------------- Streaming readers -------------------------
+
+def _iter_text(stream, chunk_size=64 * 1024):
+    """Yield decoded text chunks from a binary or text stream."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def _iter_lines(stream):
+    """Yield lines (with line endings) without reading the whole stream."""
+    pending = ''
+    for chunk in _iter_text(stream):
+        pending += chunk
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _iter_json_array(stream):
+    """Decode the objects of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, pos, started, row = '', 0, False, 0
+    for chunk in _iter_text(stream):
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise QuestionImportError([{'row': 0, 'errors': ['Expected a JSON array of questions']}])
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Fail on the first malformed element instead of buffering the rest of the stream
+                if e.pos + TRUNCATION_WINDOW < len(buffer) and not e.msg.startswith('Unterminated string'):
+                    raise QuestionImportError([{'row': row + 1, 'errors': [f"Invalid JSON: {e.msg}"]}])
+                if len(buffer) - pos > MAX_RECORD_CHARS:
+                    raise QuestionImportError([{'row': row + 1, 'errors': ['Question is too large or invalid JSON']}])
+                break  # Element continues in the next chunk
+            row += 1
+            yield record
+    if buffer[pos:].strip() or not started:
+        raise QuestionImportError([{'row': 0, 'errors': ['Truncated or invalid JSON']}])
+
+
+def _iter_ndjson(stream):
+    for line in _iter_lines(stream):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {'_error': f"Invalid JSON: {e.msg}"}
+
+
+def _iter_csv(stream):
+    """
+    CSV columns: text, question_type, points, order, answers, correct.
+    ``answers`` is pipe-separated; ``correct`` lists the 1-based positions
+    of the correct answers, also pipe-separated.
+    """
+    for row in csv.DictReader(_iter_lines(stream)):
+        answers = [a for a in (row.get('answers') or '').split('|') if a]
+        try:
+            correct = {int(p) for p in (row.get('correct') or '').split('|') if p.strip()}
+        except ValueError:
+            yield {'_error': "correct must list answer positions"}
+            continue
+        yield {
+            'text': row.get('text'),
+            'question_type': row.get('question_type') or 'multiple_choice',
+            'points': row.get('points') or 1,
+            'order': row.get('order') or None,
+            'answers': [
+                {'text': text, 'is_correct': i in correct}
+                for i, text in enumerate(answers, start=1)
+            ],
+        }
+
+
+READERS = {
+    'json': _iter_json_array,
+    'ndjson': _iter_ndjson,
+    'csv': _iter_csv,
+}
+
+
+def detect_format(filename, default='json'):
+    """Pick an import format from a file extension."""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension in IMPORT_FORMATS:
+        return extension
+    return default
+
+
+# ------------------------- Validation -------------------------
+
+def _positive_int(value, field, errors, allow_zero=False):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be an integer")
+        return None
+    if number < 0 or (number == 0 and not allow_zero):
+        errors.append(f"{field} must be positive")
+        return None
+    if number > MAX_POSITIVE_INT:
+        errors.append(f"{field} must be at most {MAX_POSITIVE_INT}")
+        return None
+    return number
+
+
+def _clean_record(record):
+    """Return (question fields, answer rows, errors) for one imported record."""
+    if not isinstance(record, dict):
+        return None, None, ["Each question must be an object"]
+    if '_error' in record:
+        return None, None, [record['_error']]
+
+    errors = []
+    text = record.get('text') or ''
+    if not isinstance(text, str):
+        errors.append("text must be a string")
+    elif not text.strip():
+        errors.append("text is required")
+    else:
+        text = text.strip()
+    question_type = record.get('question_type') or 'multiple_choice'
+    if not isinstance(question_type, str) or question_type not in QUESTION_TYPES:
+        errors.append(f"question_type must be one of {', '.join(QUESTION_TYPES)}")
+    points = _positive_int(record.get('points', 1), 'points', errors)
+    order = record.get('order')
+    if order is not None:
+        order = _positive_int(order, 'order', errors, allow_zero=True)
+
+    answers = record.get('answers') or []
+    if not isinstance(answers, list):
+        errors.append("answers must be a list")
+        answers = []
+    cleaned_answers = []
+    for answer in answers:
+        answer_text = str(answer.get('text') or '').strip() if isinstance(answer, dict) else ''
+        explanation = (answer.get('explanation') or '') if isinstance(answer, dict) else ''
+        if not answer_text:
+            errors.append("each answer needs text")
+        elif len(answer_text) > ANSWER_TEXT_MAX_LENGTH:
+            errors.append(f"answer text is longer than {ANSWER_TEXT_MAX_LENGTH} characters")
+        elif not isinstance(explanation, str):
+            errors.append("answer explanation must be a string")
+        else:
+            cleaned_answers.append({
+                'text': answer_text,
+                'is_correct': bool(answer.get('is_correct')),
+                'explanation': explanation,
+            })
+    if cleaned_answers and not any(a['is_correct'] for a in cleaned_answers):
+        errors.append("at least one answer must be correct")
+
+    question = {'text': text, 'question_type': question_type, 'points': points, 'order': order}
+    return question, cleaned_answers, errors
+
+
+# ------------------------- Import / Export -------------------------
+
+def _create_batch(quiz, batch, next_order, batch_size):
+    questions = []
+    for fields, _ in batch:
+        if fields['order'] is None:
+            fields['order'] = next_order
+        next_order = max(next_order, fields['order']) + 1
+        questions.append(Question(quiz_id=quiz.id, **fields))
+    Question.objects.bulk_create(questions, batch_size=batch_size)
+    Answer.objects.bulk_create(
+        [
+            Answer(question_id=question.id, **answer)
+            for question, (_, answers) in zip(questions, batch)
+            for answer in answers
+        ],
+        batch_size=batch_size,
+    )
+    return next_order
+
+
+def import_records(quiz, records, batch_size=1000, skip_invalid=False):
+    """
+    Validate question records a batch at a time and write them with bulk
+    inserts, all in one transaction.
+
+    Args:
+        records (iterable): Question dicts, e.g. from a streaming reader
+        skip_invalid (bool): Drop invalid records instead of aborting
+    Returns:
+        int: Number of questions created
+    Raises:
+        QuestionImportError: With the offending row numbers and messages
+    """
+    created = 0
+    with transaction.atomic():
+        next_order = (quiz.questions.aggregate(last=Max('order'))['last'] or 0) + 1
+        batch, errors = [], []
+        for row, record in enumerate(records, start=1):
+            fields, answers, row_errors = _clean_record(record)
+            if not row_errors:
+                batch.append((fields, answers))
+            elif not skip_invalid:
+                errors.append({'row': row, 'errors': row_errors})
+            if len(batch) + len(errors) >= batch_size:
+                if errors:
+                    raise QuestionImportError(errors)
+                next_order = _create_batch(quiz, batch, next_order, batch_size)
+                created += len(batch)
+                batch = []
+        if errors:
+            raise QuestionImportError(errors)
+        if batch:
+            _create_batch(quiz, batch, next_order, batch_size)
+            created += len(batch)
+        quiz.touch()
+    return created
+
+
+def import_questions(quiz, stream, fmt='json', batch_size=1000):
+    """
+    Stream questions and their answers into a quiz.
+
+    A bad record anywhere leaves the quiz untouched.
+    """
+    if fmt not in READERS:
+        raise QuestionImportError([{'row': 0, 'errors': [f"Unsupported format: {fmt}"]}])
+    return import_records(quiz, READERS[fmt](stream), batch_size=batch_size)
+
+
+def export_questions(quiz, chunk_size=1000):
+    """Yield a quiz's questions as NDJSON lines, in the format import_questions reads."""
+    question_ids = list(quiz.questions.order_by('order', 'id').values_list('id', flat=True))
+    for start in range(0, len(question_ids), chunk_size):
+        chunk = question_ids[start:start + chunk_size]
+        answers = {}
+        for question_id, text, is_correct, explanation in (
+            Answer.objects.filter(question_id__in=chunk)
+            .order_by('id')
+            .values_list('question_id', 'text', 'is_correct', 'explanation')
+        ):
+            answers.setdefault(question_id, []).append(
+                {'text': text, 'is_correct': is_correct, 'explanation': explanation}
+            )
+        questions = Question.objects.filter(id__in=chunk).values_list('id', 'text', 'question_type', 'points', 'order')
+        for question_id, text, question_type, points, order in sorted(questions, key=lambda q: (q[4], q[0])):
+            yield json.dumps({
+                'text': text,
+                'question_type': question_type,
+                'points': points,
+                'order': order,
+                'answers': answers.get(question_id, []),
+            }) + '\n'
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Quiz, Question, Answer, QuizAttempt
+from .models import Quiz, Question, Answer, QuizAttempt, QuizGenerationJob, QuizVersion
 
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,7 +21,21 @@ class QuizSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'course', 'title', 'description', 'time_limit',
             'pass_percentage', 'created_at', 'updated_at',
-            'is_published', 'questions'
+            'is_published', 'questions_per_attempt', 'sample_stratify_by',
+            'questions'
+        ]
+
+class QuizListSerializer(serializers.ModelSerializer):
+    """Listing variant of QuizSerializer without the nested question tree."""
+    question_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Quiz
+        fields = [
+            'id', 'course', 'title', 'description', 'time_limit',
+            'pass_percentage', 'created_at', 'updated_at',
+            'is_published', 'questions_per_attempt', 'sample_stratify_by',
+            'question_count'
         ]
 
 class QuizAttemptSerializer(serializers.ModelSerializer):
@@ -29,7 +43,29 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
         model = QuizAttempt
         fields = [
             'id', 'quiz', 'user', 'score', 'started_at',
-            'completed_at', 'status', 'time_spent', 'passed'
+            'completed_at', 'status', 'time_spent', 'passed', 'version', 'question_ids'
         ]
-        read_only_fields = ['user', 'score', 'started_at', 'completed_at', 'time_spent', 'passed']
+        read_only_fields = [
+            'user', 'score', 'started_at', 'completed_at', 'time_spent', 'passed', 'version', 'question_ids'
+        ]
+
+class QuizAttemptListSerializer(QuizAttemptSerializer):
+    """Reads ``passed`` from the ``with_passed()`` annotation instead of the quiz row."""
+    passed = serializers.BooleanField(source='is_passed', read_only=True)
+
+class QuizVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QuizVersion
+        fields = ['id', 'quiz', 'number', 'created_at']
 
+class QuizSubmissionSerializer(serializers.Serializer):
+    responses = serializers.DictField(child=serializers.CharField(), allow_empty=True)
+
+class QuizGenerationRequestSerializer(serializers.Serializer):
+    num_questions = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+class QuizGenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QuizGenerationJob
+        fields = ['id', 'lesson', 'quiz', 'num_questions', 'status', 'error', 'created_at', 'started_at', 'completed_at']
+        read_only_fields = fields
@@ -1,15 +1,26 @@
+import base64
+import io
+import json
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from datetime import timedelta
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from courses.models import Course
-from .models import Quiz, Question, Answer, QuizAttempt
+from courses.models import Course, Lesson
+from .models import Quiz, Question, Answer, QuizAttempt, QuizGenerationJob, QuizVersion, load_version_content
+from .generation import JOB_LEASE, process_pending_jobs
+from .question_bank import QuestionImportError, import_questions
 
 User = get_user_model()
 
 class QuizzesViewsTest(APITestCase):
     def setUp(self):
+        load_version_content.cache_clear()  # Rolled-back test rows reuse version ids
         self.client = APIClient()
         self.user = User.objects.create_user(
             username='testuser',
@@ -73,6 +84,23 @@ class QuizzesViewsTest(APITestCase):
         response = self.client.delete(reverse('quiz-detail', args=[self.quiz.id]))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
+    def test_quiz_detail_conditional_get(self):
+        """Test ETag revalidation of a quiz and its nested answers"""
+        url = reverse('quiz-detail', args=[self.quiz.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):  # Only the updated_at lookup
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(reverse('answer-detail', args=[self.answer.id]), {'text': 'Edited'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['questions'][0]['answers'][0]['text'], 'Edited')
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_question_views(self):
         """Test Question endpoints"""
         # List
@@ -147,3 +175,272 @@ class QuizzesViewsTest(APITestCase):
         data = {'status': 'COMPLETED', 'score': 100}
         response = self.client.patch(reverse('quiz-attempt-detail', args=[self.quiz_attempt.id]), data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_question_cursor_positions_on_id(self):
+        """Questions left at the default order still page by a unique key"""
+        Question.objects.bulk_create([Question(quiz=self.quiz, text=f'Q{i}') for i in range(12)])
+        url = reverse('question-list', args=[self.quiz.id])
+        response = self.client.get(url, {'page_size': 5})
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            # The cursor holds a position only, no offset to scan past
+            cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+            self.assertNotIn('o=', base64.b64decode(cursor).decode())
+            response = self.client.get(response.data['next'])
+            seen.extend(row['id'] for row in response.data['results'])
+        self.assertEqual(seen, sorted(self.quiz.questions.values_list('id', flat=True)))
+
+    def test_quiz_attempt_list_is_cursor_paginated(self):
+        """Attempt listing pages by cursor and annotates passed in SQL"""
+        QuizAttempt.objects.all().delete()
+        for score in range(0, 100, 4):
+            QuizAttempt.objects.create(quiz=self.quiz, user=self.user, score=score, status='completed')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('quiz-attempt-list'), {'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(row['id'] for row in response.data['results'])
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+        attempts = {a.id: a for a in QuizAttempt.objects.all()}
+        response = self.client.get(reverse('quiz-attempt-list'), {'page_size': 100})
+        for row in response.data['results']:
+            self.assertEqual(row['passed'], attempts[row['id']].passed)
+
+    def test_attempt_draws_pinned_question_sample(self):
+        """Attempts draw a stratified random sample and are graded on it alone"""
+        self.quiz.questions_per_attempt = 10
+        self.quiz.sample_stratify_by = 'question_type'
+        self.quiz.save()
+        Question.objects.all().delete()
+        for i in range(30):
+            question = Question.objects.create(
+                quiz=self.quiz,
+                text=f'Question {i}',
+                question_type='true_false' if i % 3 == 0 else 'multiple_choice',
+                order=i
+            )
+            Answer.objects.create(question=question, text='Right', is_correct=True)
+            Answer.objects.create(question=question, text='Wrong', is_correct=False)
+
+        response = self.client.post(reverse('quiz-attempt-list'), {'quiz': self.quiz.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        attempt_id = response.data['id']
+        question_ids = response.data['question_ids']
+        self.assertEqual(len(question_ids), 10)
+        self.assertEqual(len(set(question_ids)), 10)
+        sampled = Question.objects.filter(id__in=question_ids)
+        self.assertEqual(sampled.filter(question_type='true_false').count(), 3)
+
+        response = self.client.get(reverse('quiz-attempt-questions', args=[attempt_id]))
+        self.assertEqual([q['id'] for q in response.data], question_ids)
+
+        correct = {
+            a.question_id: a.id
+            for a in Answer.objects.filter(question_id__in=question_ids[:5], is_correct=True)
+        }
+        response = self.client.post(
+            reverse('quiz-attempt-submit', args=[attempt_id]),
+            {'responses': correct},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score'], 50.0)
+        self.assertEqual(response.data['status'], 'completed')
+
+    def test_bulk_question_import_and_export(self):
+        """Question banks import from JSON/CSV in one transaction and export as NDJSON"""
+        payload = json.dumps([
+            {
+                'text': f'Imported {i}',
+                'question_type': 'multiple_choice',
+                'points': 2,
+                'answers': [
+                    {'text': 'Yes', 'is_correct': True, 'explanation': 'Because'},
+                    {'text': 'No', 'is_correct': False},
+                ],
+            }
+            for i in range(50)
+        ]).encode()
+        upload = SimpleUploadedFile('bank.json', payload, content_type='application/json')
+        response = self.client.post(reverse('question-import', args=[self.quiz.id]), {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 50)
+        self.assertEqual(Answer.objects.filter(question__quiz=self.quiz).count(), 101)
+
+        csv_data = (
+            'text,question_type,points,answers,correct\n'
+            '"Two, plus two",multiple_choice,1,3|4|5,2\n'
+            'Sky is blue,true_false,1,True|False,1\n'
+        ).encode()
+        upload = SimpleUploadedFile('bank.csv', csv_data, content_type='text/csv')
+        response = self.client.post(reverse('question-import', args=[self.quiz.id]), {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        question = Question.objects.get(text='Two, plus two')
+        self.assertEqual(question.answers.get(is_correct=True).text, '4')
+
+        invalid = json.dumps([{'text': 'Fine', 'answers': []}, {'text': '', 'points': 0}]).encode()
+        upload = SimpleUploadedFile('bad.json', invalid, content_type='application/json')
+        response = self.client.post(reverse('question-import', args=[self.quiz.id]), {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertFalse(Question.objects.filter(text='Fine').exists())
+
+        # Wrong types and out-of-range numbers are row errors, not crashes
+        answers = [{'text': 'Yes', 'is_correct': True}]
+        mistyped = json.dumps([
+            {'text': 5, 'answers': answers},
+            {'text': 'Type', 'question_type': ['x'], 'answers': answers},
+            {'text': 'Why', 'answers': [{'text': 'Yes', 'is_correct': True, 'explanation': {'a': 1}}]},
+            {'text': 'Huge', 'points': 2 ** 40, 'order': 2 ** 40, 'answers': answers},
+        ]).encode()
+        upload = SimpleUploadedFile('types.json', mistyped, content_type='application/json')
+        response = self.client.post(reverse('question-import', args=[self.quiz.id]), {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2, 3, 4])
+
+        response = self.client.get(reverse('question-export', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 53)
+        exported = json.loads(lines[1])
+        self.assertEqual(exported['text'], 'Imported 0')
+        self.assertEqual(exported['answers'][0]['explanation'], 'Because')
+
+    def test_malformed_json_import_fails_fast(self):
+        """A broken element stops the import without reading the rest of the file"""
+        filler = json.dumps([{'text': f'Filler {i}', 'answers': []} for i in range(20000)])[1:]
+        stream = io.BytesIO(('[{"text": "Fine", "answers": []}, {"text": oops}, ' + filler).encode())
+        with self.assertRaises(QuestionImportError) as raised:
+            import_questions(self.quiz, stream)
+        self.assertEqual(raised.exception.errors[0]['row'], 2)
+        self.assertLess(stream.tell(), len(stream.getvalue()))
+        self.assertFalse(Question.objects.filter(text='Fine').exists())
+
+    @patch('quizzes.generation.TaeAI')
+    def test_quiz_generation_pipeline(self, mock_ai):
+        """Lesson quizzes are drafted in the background and cached by content hash"""
+        mock_ai.return_value.generate_json.return_value = {'questions': [
+            {
+                'text': 'What does a cell membrane do?',
+                'question_type': 'multiple_choice',
+                'answers': [
+                    {'text': 'Controls what enters the cell', 'is_correct': True},
+                    {'text': 'Stores DNA', 'is_correct': False},
+                ],
+            },
+            {'text': 'Cells have walls', 'question_type': 'true_false', 'answers': [{'text': 'Maybe'}]},
+        ]}
+        lesson = Lesson.objects.create(course=self.course, title='Cells', content='The membrane controls transport.')
+        url = reverse('lesson-quiz-generate', args=[lesson.id])
+
+        response = self.client.post(url, {'num_questions': 2})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+
+        self.assertEqual(process_pending_jobs(), 1)
+        job = QuizGenerationJob.objects.get(id=response.data['id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertFalse(job.quiz.is_published)
+        self.assertEqual(job.quiz.questions.count(), 1)  # Invalid draft question dropped
+
+        response = self.client.post(url, {'num_questions': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quiz'], job.quiz_id)
+
+        job.quiz.delete()
+        response = self.client.post(url, {'num_questions': 2})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        process_pending_jobs()
+        self.assertEqual(mock_ai.return_value.generate_json.call_count, 1)
+
+        response = self.client.get(reverse('quiz-generation-job-detail', args=[response.data['id']]))
+        self.assertEqual(response.data['status'], 'completed')
+
+    @patch('quizzes.generation.TaeAI')
+    def test_expired_generation_jobs_are_reclaimed(self, mock_ai):
+        """A job left running by a dead worker is picked up again once its lease expires"""
+        mock_ai.return_value.generate_json.return_value = {'questions': [
+            {'text': 'Cells have walls', 'question_type': 'true_false',
+             'answers': [{'text': 'True', 'is_correct': True}, {'text': 'False'}]},
+        ]}
+        lesson = Lesson.objects.create(course=self.course, title='Cells', content='Plant cells have walls.')
+        job = QuizGenerationJob.objects.create(
+            lesson=lesson, content_hash='x', num_questions=1, status='running', started_at=timezone.now()
+        )
+        self.assertEqual(process_pending_jobs(), 0)  # Lease still held
+
+        QuizGenerationJob.objects.filter(id=job.id).update(started_at=timezone.now() - JOB_LEASE - timedelta(seconds=1))
+        self.assertEqual(process_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.quiz.questions.count(), 1)
+
+    def test_draft_edits_reach_new_attempts(self):
+        """An unpublished quiz is snapshotted again for attempts once its questions change"""
+        first = self.client.post(reverse('quiz-attempt-list'), {'quiz': self.quiz.id}).data
+        again = self.client.post(reverse('quiz-attempt-list'), {'quiz': self.quiz.id}).data
+        self.assertEqual(again['version'], first['version'])
+
+        response = self.client.post(
+            reverse('question-list', args=[self.quiz.id]), {'text': 'Added to the draft', 'points': 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        latest = self.client.post(reverse('quiz-attempt-list'), {'quiz': self.quiz.id}).data
+        self.assertNotEqual(latest['version'], first['version'])
+        response = self.client.get(reverse('quiz-attempt-questions', args=[latest['id']]))
+        self.assertIn('Added to the draft', [question['text'] for question in response.data])
+
+    def test_attempts_are_pinned_to_published_version(self):
+        """Editing questions after publishing doesn't change what an attempt is graded on"""
+        wrong = Answer.objects.create(question=self.question, text='Wrong Answer')
+        response = self.client.post(reverse('quiz-publish', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['number'], 1)
+
+        response = self.client.post(reverse('quiz-attempt-list'), {'quiz': self.quiz.id})
+        attempt_id = response.data['id']
+        self.assertEqual(response.data['version'], QuizVersion.objects.get(quiz=self.quiz).id)
+
+        # Swap the answer key mid-attempt
+        Answer.objects.filter(id=self.answer.id).update(is_correct=False)
+        Answer.objects.filter(id=wrong.id).update(is_correct=True)
+        Question.objects.create(quiz=self.quiz, text='Added later')
+
+        response = self.client.get(reverse('quiz-attempt-questions', args=[attempt_id]))
+        self.assertEqual(len(response.data), 1)
+        self.assertNotIn('is_correct', response.data[0]['answers'][0])
+
+        response = self.client.post(
+            reverse('quiz-attempt-submit', args=[attempt_id]),
+            {'responses': {self.question.id: self.answer.id}},
+            format='json'
+        )
+        self.assertEqual(response.data['score'], 100.0)
+
+        version = QuizVersion.objects.get(quiz=self.quiz)
+        with self.assertRaises(ValueError):
+            version.save()
+        self.assertEqual(self.quiz.publish().number, 2)
+
+    def test_pass_mark_comes_from_the_attempts_version(self):
+        """Raising the pass mark later doesn't fail attempts already taken"""
+        Quiz.objects.filter(pk=self.quiz.pk).update(pass_percentage=50)
+        self.quiz.refresh_from_db()
+        version = self.quiz.publish()
+        pinned = QuizAttempt.objects.create(quiz=self.quiz, user=self.user, version=version, score=60, status='completed')
+        legacy = QuizAttempt.objects.create(quiz=self.quiz, user=self.user, score=60, status='completed')
+
+        Quiz.objects.filter(pk=self.quiz.pk).update(pass_percentage=80)
+        pinned, legacy = QuizAttempt.objects.get(pk=pinned.pk), QuizAttempt.objects.get(pk=legacy.pk)
+        self.assertTrue(pinned.passed)
+        self.assertFalse(legacy.passed)
+        annotated = dict(QuizAttempt.objects.filter(score=60).with_passed().values_list('id', 'is_passed'))
+        self.assertEqual(annotated, {pinned.id: True, legacy.id: False})
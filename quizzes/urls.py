@@ -1,18 +1,28 @@
 from django.urls import path
 from .views import (
-    QuizListCreateView, QuizDetailView,
-    QuestionListCreateView, QuestionDetailView, 
+    QuizListCreateView, QuizDetailView, QuizPublishView,
+    QuestionListCreateView, QuestionDetailView,
+    QuestionImportView, QuestionExportView,
     AnswerListCreateView, AnswerDetailView,
-    QuizAttemptListCreateView, QuizAttemptDetailView
+    QuizAttemptListCreateView, QuizAttemptDetailView,
+    QuizAttemptQuestionsView, QuizAttemptSubmitView,
+    LessonQuizGenerationView, QuizGenerationJobDetailView
 )
 
 urlpatterns = [
     path('quizzes/', QuizListCreateView.as_view(), name='quiz-list'),
     path('quizzes/<int:pk>/', QuizDetailView.as_view(), name='quiz-detail'),
+    path('quizzes/<int:pk>/publish/', QuizPublishView.as_view(), name='quiz-publish'),
     path('quizzes/<int:quiz_id>/questions/', QuestionListCreateView.as_view(), name='question-list'),
+    path('quizzes/<int:quiz_id>/questions/import/', QuestionImportView.as_view(), name='question-import'),
+    path('quizzes/<int:quiz_id>/questions/export/', QuestionExportView.as_view(), name='question-export'),
     path('questions/<int:pk>/', QuestionDetailView.as_view(), name='question-detail'),
     path('questions/<int:question_id>/answers/', AnswerListCreateView.as_view(), name='answer-list'), 
     path('answers/<int:pk>/', AnswerDetailView.as_view(), name='answer-detail'),
     path('attempts/', QuizAttemptListCreateView.as_view(), name='quiz-attempt-list'),
     path('attempts/<int:pk>/', QuizAttemptDetailView.as_view(), name='quiz-attempt-detail'),
+    path('attempts/<int:pk>/questions/', QuizAttemptQuestionsView.as_view(), name='quiz-attempt-questions'),
+    path('attempts/<int:pk>/submit/', QuizAttemptSubmitView.as_view(), name='quiz-attempt-submit'),
+    path('lessons/<int:lesson_id>/generate/', LessonQuizGenerationView.as_view(), name='lesson-quiz-generate'),
+    path('generation-jobs/<int:pk>/', QuizGenerationJobDetailView.as_view(), name='quiz-generation-job-detail'),
 ]
@@ -1,7 +1,25 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.core.cache import cache
-from .models import Quiz, Question, Answer, QuizAttempt
-from .serializers import QuizSerializer, QuestionSerializer, AnswerSerializer, QuizAttemptSerializer
+from django.db.models import Count
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from courses.models import Lesson
+from .models import Quiz, Question, Answer, QuizAttempt, QuizGenerationJob, public_question
+from .serializers import (
+    QuizSerializer, QuizListSerializer, QuestionSerializer, AnswerSerializer,
+    QuizAttemptSerializer, QuizAttemptListSerializer, QuizSubmissionSerializer,
+    QuizGenerationRequestSerializer, QuizGenerationJobSerializer, QuizVersionSerializer
+)
+from .generation import request_quiz_generation
+from .question_bank import QuestionImportError, detect_format, import_questions, export_questions
+from studypal.conditional import ConditionalGetMixin
+from .pagination import (
+    QuizCursorPagination, QuestionCursorPagination,
+    AnswerCursorPagination, QuizAttemptCursorPagination
+)
 from study_assistant.ai_service import TaeAI
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
@@ -12,8 +30,16 @@ from drf_yasg import openapi
 class QuizListCreateView(generics.ListCreateAPIView):
     """List and create quizzes with AI-generated insights."""
     permission_classes = [IsAuthenticated]
-    queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
+    pagination_class = QuizCursorPagination
+
+    def get_queryset(self):
+        return Quiz.objects.annotate(question_count=Count('questions'))
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return QuizListSerializer
+        return QuizSerializer
 
     # @swagger_auto_schema(
     #     operation_description="List all quizzes",
@@ -47,12 +73,23 @@ class QuizListCreateView(generics.ListCreateAPIView):
         quiz = serializer.save()
         some_task_function()
 
-class QuizDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """Retrieve, update, or delete a quiz with AI-powered insights."""
+class QuizDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    """
+    Retrieve, update, or delete a quiz with AI-powered insights.
+
+    GET supports ETag/Last-Modified on ``updated_at``, which question and
+    answer changes bump as well.
+    """
     permission_classes = [IsAuthenticated]
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
 
+    def get_validators(self):
+        updated_at = Quiz.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return (self.kwargs['pk'], updated_at), updated_at
+
     # @swagger_auto_schema(
     #     operation_description="Retrieve a quiz",
     #     responses={
@@ -102,6 +139,7 @@ class QuestionListCreateView(generics.ListCreateAPIView):
     """List and create questions with AI-assisted insights."""
     permission_classes = [IsAuthenticated]
     serializer_class = QuestionSerializer
+    pagination_class = QuestionCursorPagination
 
     # @swagger_auto_schema(
     #     operation_description="List all questions for a quiz",
@@ -134,10 +172,11 @@ class QuestionListCreateView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
     def get_queryset(self):
-        return Question.objects.filter(quiz_id=self.kwargs['quiz_id'])
+        return Question.objects.filter(quiz_id=self.kwargs['quiz_id']).prefetch_related('answers')
 
     def perform_create(self, serializer):
         question = serializer.save(quiz_id=self.kwargs['quiz_id'])
+        question.quiz.touch()
         some_task_function()
 
 class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -189,12 +228,19 @@ class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         question = serializer.save()
+        question.quiz.touch()
         some_task_function()
 
+    def perform_destroy(self, instance):
+        quiz = instance.quiz
+        instance.delete()
+        quiz.touch()
+
 class AnswerListCreateView(generics.ListCreateAPIView):
     """List and create answers with AI-generated explanations."""
     permission_classes = [IsAuthenticated]
     serializer_class = AnswerSerializer
+    pagination_class = AnswerCursorPagination
 
     # @swagger_auto_schema(
     #     operation_description="List all answers for a question",
@@ -231,6 +277,7 @@ class AnswerListCreateView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         answer = serializer.save(question_id=self.kwargs['question_id'])
+        answer.question.quiz.touch()
         some_task_function()
 
 class AnswerDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -282,12 +329,24 @@ class AnswerDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         answer = serializer.save()
+        answer.question.quiz.touch()
         some_task_function()
 
+    def perform_destroy(self, instance):
+        quiz = instance.question.quiz
+        instance.delete()
+        quiz.touch()
+
 class QuizAttemptListCreateView(generics.ListCreateAPIView):
     """List and create quiz attempts with AI-generated recommendations."""
     permission_classes = [IsAuthenticated]
     serializer_class = QuizAttemptSerializer
+    pagination_class = QuizAttemptCursorPagination
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return QuizAttemptListSerializer
+        return QuizAttemptSerializer
 
     # @swagger_auto_schema(
     #     operation_description="List all quiz attempts for the current user",
@@ -318,10 +377,16 @@ class QuizAttemptListCreateView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user)
+        return QuizAttempt.objects.filter(user=self.request.user).with_passed()
 
     def perform_create(self, serializer):
-        attempt = serializer.save(user=self.request.user)
+        quiz = serializer.validated_data['quiz']
+        version = quiz.current_version()
+        attempt = serializer.save(
+            user=self.request.user,
+            version=version,
+            question_ids=version.sample_question_ids()
+        )
         some_task_function()
 
 class QuizAttemptDetailView(generics.RetrieveUpdateAPIView):
@@ -364,6 +429,88 @@ class QuizAttemptDetailView(generics.RetrieveUpdateAPIView):
         attempt = serializer.save()
         some_task_function()
 
+class QuestionImportView(APIView):
+    """Bulk import questions and answers from an uploaded JSON, NDJSON or CSV file."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz, pk=quiz_id)
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"error": "A question file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('type') or detect_format(upload.name)
+        try:
+            created = import_questions(quiz, upload, fmt=fmt)
+        except QuestionImportError as e:
+            return Response({"errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"created": created}, status=status.HTTP_201_CREATED)
+
+class QuestionExportView(APIView):
+    """Stream a quiz's question bank as NDJSON."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz, pk=quiz_id)
+        response = StreamingHttpResponse(export_questions(quiz), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="quiz-{quiz.id}-questions.ndjson"'
+        return response
+
+class QuizPublishView(APIView):
+    """Freeze a quiz's current questions into a new immutable version."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        quiz = get_object_or_404(Quiz, pk=pk)
+        version = quiz.publish()
+        return Response(QuizVersionSerializer(version).data, status=status.HTTP_201_CREATED)
+
+class QuizAttemptQuestionsView(APIView):
+    """Serve the questions drawn for an attempt, without the answer key."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        attempt = get_object_or_404(QuizAttempt, pk=pk, user=request.user)
+        return Response([public_question(question) for question in attempt.get_questions()])
+
+class QuizAttemptSubmitView(APIView):
+    """Grade an in-progress attempt against its pinned questions and complete it."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        attempt = get_object_or_404(QuizAttempt.objects.select_related('quiz'), pk=pk, user=request.user)
+        if attempt.status != 'in_progress':
+            return Response({"error": "Attempt already submitted"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = QuizSubmissionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        attempt.score = attempt.grade(serializer.validated_data['responses'])
+        attempt.completed_at = timezone.now()
+        attempt.time_spent = attempt.completed_at - attempt.started_at
+        attempt.status = 'completed'
+        attempt.save()
+        return Response(QuizAttemptSerializer(attempt).data)
+
+class LessonQuizGenerationView(APIView):
+    """Queue an AI-drafted quiz for a lesson; unchanged lessons reuse their earlier draft."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, lesson_id):
+        lesson = get_object_or_404(Lesson, pk=lesson_id)
+        serializer = QuizGenerationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        job, _ = request_quiz_generation(lesson, request.user, serializer.validated_data['num_questions'])
+        response_status = status.HTTP_200_OK if job.status == 'completed' else status.HTTP_202_ACCEPTED
+        return Response(QuizGenerationJobSerializer(job).data, status=response_status)
+
+class QuizGenerationJobDetailView(generics.RetrieveAPIView):
+    """Poll the status of a quiz generation job."""
+    permission_classes = [IsAuthenticated]
+    queryset = QuizGenerationJob.objects.all()
+    serializer_class = QuizGenerationJobSerializer
+
 def some_task_function():
     # Task logic here
     pass
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+from django.db import transaction
+from django.utils import timezone
+from .models import ACTIVITY_BITMAP_BYTES, StudyActivityYear, StudyStreak
+
+# A user's years are concatenated into one integer, bit i being day i
+# counted from January 1st of the first year, so streak math is a handful
+# of big-integer operations instead of a walk over dates.
+
+
+def _to_int(days):
+    return int.from_bytes(bytes(days), 'little')
+
+
+def _days_in_year(year):
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def record_study_day(user_id, day):
+    """
+    Set the bit for ``day``.
+
+    Returns:
+        bool: False if the day was already recorded
+    """
+    index = day.timetuple().tm_yday - 1
+    with transaction.atomic():
+        row, _ = StudyActivityYear.objects.select_for_update().get_or_create(user_id=user_id, year=day.year)
+        bits = bytearray(row.days)
+        mask = 1 << (index % 8)
+        if bits[index // 8] & mask:
+            return False
+        bits[index // 8] |= mask
+        row.days = bytes(bits)
+        row.save(update_fields=['days'])
+    return True
+
+
+def longest_run(bits):
+    """Length of the longest run of set bits: each AND with a shifted copy shortens every run by one."""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def run_ending_at(bits, position):
+    """Length of the run of set bits ending at ``position`` (0 if that bit is clear)."""
+    if position < 0 or not bits >> position & 1:
+        return 0
+    gaps = ~bits & ((1 << (position + 1)) - 1)
+    return position - (gaps.bit_length() - 1)
+
+
+def user_today(user_id):
+    """Today's date in the time zone the user's study days are counted in."""
+    zone = StudyStreak.objects.filter(user_id=user_id).values_list('timezone', flat=True).first() or 'UTC'
+    return timezone.now().astimezone(ZoneInfo(zone)).date()
+
+
+def activity_stats(user_id, today=None):
+    """
+    Current and longest streak and total study days from the user's bitmaps.
+    The current streak still counts if the last study day was yesterday.
+    ``today`` defaults to the user's local date.
+    """
+    today = today or user_today(user_id)
+    rows = list(StudyActivityYear.objects.filter(user_id=user_id, year__lte=today.year).values_list('year', 'days'))
+    if not rows:
+        return {'current_streak': 0, 'longest_streak': 0, 'total_days': 0}
+
+    first_year = rows[0][0]
+    combined, offsets, offset = 0, {}, 0
+    by_year = dict(rows)
+    for year in range(first_year, today.year + 1):
+        offsets[year] = offset
+        if year in by_year:
+            combined |= _to_int(by_year[year]) << offset
+        offset += _days_in_year(year)
+
+    position = offsets[today.year] + today.timetuple().tm_yday - 1
+    combined &= (1 << (position + 1)) - 1  # Ignore days after today
+    return {
+        'current_streak': run_ending_at(combined, position) or run_ending_at(combined, position - 1),
+        'longest_streak': longest_run(combined),
+        'total_days': combined.bit_count(),
+    }
+
+
+def year_heatmap(user_id, year):
+    """
+    Calendar data for one year from a single row read: the studied dates,
+    their count and the longest streak within the year.
+    """
+    days = StudyActivityYear.objects.filter(user_id=user_id, year=year).values_list('days', flat=True).first()
+    bits = _to_int(days) if days is not None else 0
+    start = date(year, 1, 1)
+    studied, remaining = [], bits
+    while remaining:
+        lowest = remaining & -remaining
+        studied.append((start + timedelta(days=lowest.bit_length() - 1)).isoformat())
+        remaining ^= lowest
+    return {
+        'year': year,
+        'total_days': bits.bit_count(),
+        'longest_streak': longest_run(bits),
+        'days': studied,
+        'bitmap': (days and bytes(days) or bytes(ACTIVITY_BITMAP_BYTES)).hex(),
+    }
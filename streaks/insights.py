@@ -0,0 +1,114 @@
+import json
+import logging
+from django.core.cache import cache
+from django.db.models import Avg
+from django.utils import timezone
+from study_assistant.ai_service import TaeAI
+from .models import Leaderboard, LeaderboardSnapshot, XPPeriodTotal
+from .ranking import RankIndex
+
+logger = logging.getLogger(__name__)
+
+TOP_USERS = 10
+TRACKED_RANKS = 100
+KEEP_SNAPSHOTS = 50
+LATEST_SNAPSHOT_CACHE_KEY = 'leaderboard_latest_snapshot'
+
+INSIGHTS_PROMPT = (
+    "You are reviewing the XP leaderboard of a study platform. Using only the "
+    "summary below, write 3-5 short observations about trends in the "
+    "standings, the spread of XP and who is moving up, with one suggestion "
+    "for keeping learners motivated.\n\nSummary (JSON):\n{summary}"
+)
+
+
+def summarize_standings(previous=None):
+    """
+    Summarize the current standings: distribution, leaders, this week's top
+    earners and rank changes among the top users since ``previous``.
+    """
+    index = RankIndex(Leaderboard.objects.values_list('user_id', 'total_xp').iterator(chunk_size=10000))
+    total = len(index)
+    leaders = index.entries(0, TRACKED_RANKS)
+    usernames = dict(
+        Leaderboard.objects.filter(user_id__in=[u for _, u, _ in leaders])
+        .values_list('user_id', 'user__username')
+    )
+
+    def xp_at(fraction):
+        return index.entries(int(fraction * (total - 1)), int(fraction * (total - 1)) + 1)[0][2]
+
+    distribution = {'users': total}
+    if total:
+        distribution.update({
+            'mean_xp': round(Leaderboard.objects.aggregate(mean=Avg('total_xp'))['mean'] or 0, 1),
+            'max_xp': leaders[0][2],
+            'top_1_percent_xp': xp_at(0.01),
+            'top_10_percent_xp': xp_at(0.10),
+            'median_xp': xp_at(0.50),
+        })
+
+    previous_ranks = (previous.summary.get('ranks', {}) if previous else {})
+    movers = []
+    for rank, user_id, _ in leaders:
+        before = previous_ranks.get(str(user_id))
+        if before is None or before > rank:
+            movers.append({
+                'username': usernames.get(user_id),
+                'rank': rank,
+                'previous_rank': before,
+            })
+    movers.sort(key=lambda m: (m['previous_rank'] or TRACKED_RANKS + 1) - m['rank'], reverse=True)
+
+    week = XPPeriodTotal.start_of('week', timezone.localdate())
+    weekly = XPPeriodTotal.objects.filter(period='week', period_start=week, course__isnull=True)
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'distribution': distribution,
+        'leaders': [
+            {'rank': rank, 'username': usernames.get(user_id), 'total_xp': xp}
+            for rank, user_id, xp in leaders[:TOP_USERS]
+        ],
+        'top_movers': movers[:TOP_USERS],
+        'top_earners_this_week': [
+            {'username': username, 'xp': xp}
+            for username, xp in weekly.order_by('-total_xp', 'user_id')
+            .values_list('user__username', 'total_xp')[:TOP_USERS]
+        ],
+        'ranks': {str(user_id): rank for rank, user_id, _ in leaders},
+    }
+
+
+def generate_leaderboard_snapshot():
+    """
+    Summarize the standings, ask the model for insights on that summary and
+    store both as a new snapshot. Meant to run on a schedule; leaderboard
+    reads only ever load the latest stored snapshot.
+    """
+    previous = LeaderboardSnapshot.objects.first()
+    summary = summarize_standings(previous)
+    prompt_summary = {key: value for key, value in summary.items() if key != 'ranks'}
+    insights = TaeAI().process_text(INSIGHTS_PROMPT.format(summary=json.dumps(prompt_summary, indent=2)))
+    if insights.startswith('Error:'):
+        logger.warning("Leaderboard insights failed: %s", insights)
+        insights = ''
+
+    snapshot = LeaderboardSnapshot.objects.create(summary=summary, insights=insights)
+    stale = LeaderboardSnapshot.objects.values_list('id', flat=True)[KEEP_SNAPSHOTS:]
+    LeaderboardSnapshot.objects.filter(id__in=list(stale)).delete()
+    cache.delete(LATEST_SNAPSHOT_CACHE_KEY)
+    return snapshot
+
+
+def latest_insights():
+    """Insights from the newest snapshot that has them, without calling the model."""
+    latest = cache.get(LATEST_SNAPSHOT_CACHE_KEY)
+    if latest is None:
+        snapshot = LeaderboardSnapshot.objects.exclude(insights='').only('id', 'insights', 'created_at').first()
+        latest = {
+            'ai_insights': snapshot.insights if snapshot else None,
+            'insights_version': snapshot.id if snapshot else None,
+            'insights_generated_at': snapshot.created_at if snapshot else None,
+        }
+        cache.set(LATEST_SNAPSHOT_CACHE_KEY, latest, 300)
+    return latest
@@ -0,0 +1,101 @@
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import XPEvent, XPDailyAggregate
+
+COMPACT_AFTER_DAYS = 30
+
+
+def compaction_cutoff(older_than_days=COMPACT_AFTER_DAYS):
+    """Start of the first day whose events are kept raw."""
+    day = timezone.localdate() - timedelta(days=older_than_days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _compact_day(day_events):
+    """Fold one day's events into the daily aggregates and delete them."""
+    last_id = day_events.aggregate(last=Max('id'))['last']
+    if last_id is None:
+        return 0
+    # Bound by id so events inserted while we run are left for the next pass
+    events = day_events.filter(id__lte=last_id)
+    rows = list(
+        events.annotate(date=TruncDate('created_at'))
+        .values('user_id', 'date', 'reason')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    existing = {
+        (a.user_id, a.date, a.reason): a
+        for a in XPDailyAggregate.objects.filter(
+            date__in={row['date'] for row in rows},
+            user_id__in={row['user_id'] for row in rows},
+        )
+    }
+    created, updated = [], []
+    for row in rows:
+        key = (row['user_id'], row['date'], row['reason'])
+        aggregate = existing.get(key)
+        if aggregate is None:
+            created.append(XPDailyAggregate(
+                user_id=row['user_id'], date=row['date'], reason=row['reason'],
+                total_xp=row['total'], event_count=row['count'],
+            ))
+        else:
+            aggregate.total_xp += row['total']
+            aggregate.event_count += row['count']
+            updated.append(aggregate)
+    XPDailyAggregate.objects.bulk_create(created, batch_size=1000)
+    XPDailyAggregate.objects.bulk_update(updated, ['total_xp', 'event_count'], batch_size=1000)
+    deleted, _ = events.delete()
+    return deleted
+
+
+def compact_xp_events(older_than_days=COMPACT_AFTER_DAYS):
+    """
+    Roll XP events older than ``older_than_days`` into per-user daily
+    aggregates, one day per transaction, and delete the raw rows.
+
+    Totals are preserved: for every user, aggregate XP plus remaining event
+    XP always equals XPSystem.total_xp.
+
+    Returns:
+        int: Number of events compacted
+    """
+    cutoff = compaction_cutoff(older_than_days)
+    compacted = 0
+    while True:
+        oldest = XPEvent.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None:
+            return compacted
+        day_start = timezone.make_aware(datetime.combine(timezone.localtime(oldest).date(), time.min))
+        day_end = min(day_start + timedelta(days=1), cutoff)
+        with transaction.atomic():
+            compacted += _compact_day(
+                XPEvent.objects.filter(created_at__gte=day_start, created_at__lt=day_end)
+            )
+
+
+def xp_history(user_id, since):
+    """
+    Daily XP earned by a user from ``since`` (a date) onwards, combining
+    compacted aggregates with raw events.
+
+    Returns:
+        dict: date -> XP
+    """
+    history = {}
+    for day, total in (
+        XPDailyAggregate.objects.filter(user_id=user_id, date__gte=since)
+        .values('date').annotate(total=Sum('total_xp')).values_list('date', 'total')
+    ):
+        history[day] = history.get(day, 0) + total
+    for day, total in (
+        XPEvent.objects.filter(user_id=user_id, created_at__date__gte=since)
+        .annotate(date=TruncDate('created_at'))
+        .values('date').annotate(total=Sum('amount')).order_by().values_list('date', 'total')
+    ):
+        history[day] = history.get(day, 0) + total
+    return history
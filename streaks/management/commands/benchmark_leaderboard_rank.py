@@ -0,0 +1,44 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from streaks.ranking import RankIndex
+
+
+class Command(BaseCommand):
+    help = "Measure rank index build, lookup and update throughput on synthetic users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=100_000)
+        parser.add_argument('--updates', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def report(self, label, count, elapsed):
+        rate = f", {count / elapsed:,.0f}/s" if count > 1 else ""
+        self.stdout.write(f"{label}: {elapsed * 1000:,.1f} ms{rate}")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        users = options['users']
+        rows = [(user_id, int(rng.paretovariate(1.2) * 50)) for user_id in range(1, users + 1)]
+
+        started = time.perf_counter()
+        index = RankIndex(rows)
+        self.report(f"Build ({users:,} users)", 1, time.perf_counter() - started)
+
+        sample = [rng.randint(1, users) for _ in range(options['lookups'])]
+        started = time.perf_counter()
+        for user_id in sample:
+            index.standing(user_id, neighbors=2)
+        self.report("Standing with 2 neighbors", len(sample), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for offset in range(0, 100 * 100, 100):
+            index.entries(offset, offset + 100)
+        self.report("Top-N pages of 100", 100, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(options['updates']):
+            user_id = rng.randint(1, users)
+            index.set_xp(user_id, index.xp_by_user[user_id] + rng.randint(1, 100))
+        self.report("Incremental XP updates", options['updates'], time.perf_counter() - started)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from streaks.ledger import COMPACT_AFTER_DAYS, compact_xp_events
+
+
+class Command(BaseCommand):
+    help = "Roll old XP events into daily aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=COMPACT_AFTER_DAYS,
+            help="Keep events from the last N days as raw rows",
+        )
+
+    def handle(self, *args, **options):
+        compacted = compact_xp_events(older_than_days=options['days'])
+        self.stdout.write(f"Compacted {compacted} XP event(s)")
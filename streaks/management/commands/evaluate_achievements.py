@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from streaks.models import AchievementRule
+from streaks.rules import evaluate_all_users
+
+
+class Command(BaseCommand):
+    help = "Award achievements and badges for rules over all users (e.g. after adding a rule)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', action='append', dest='rules', help="Rule code to evaluate; repeatable, default all active rules")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--no-notify', action='store_true', help="Don't notify users of new awards")
+
+    def handle(self, *args, **options):
+        rules = None
+        if options['rules']:
+            rules = list(AchievementRule.objects.filter(code__in=options['rules']))
+            missing = set(options['rules']) - {rule.code for rule in rules}
+            if missing:
+                raise CommandError(f"Unknown rule(s): {', '.join(sorted(missing))}")
+        awarded = evaluate_all_users(rules=rules, batch_size=options['batch_size'], notify=not options['no_notify'])
+        self.stdout.write(f"Awarded {awarded} achievement(s) and badge(s)")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from streaks.insights import generate_leaderboard_snapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshot the leaderboard and generate AI insights from its summary (run on a schedule)"
+
+    def handle(self, *args, **options):
+        snapshot = generate_leaderboard_snapshot()
+        status = "with insights" if snapshot.insights else "without insights"
+        self.stdout.write(f"Created leaderboard snapshot {snapshot.id} {status}")
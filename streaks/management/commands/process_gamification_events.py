@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from streaks.outbox import drain_gamification_events, purge_processed_events
+
+
+class Command(BaseCommand):
+    help = "Apply pending XP, achievement and leaderboard events from the outbox in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--watch', action='store_true', help="Keep polling for new events")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls with --watch")
+        parser.add_argument('--purge-days', type=int, default=7, help="Delete events processed more than N days ago")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = drain_gamification_events(batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Processed {processed} gamification event(s)")
+            purge_processed_events(options['purge_days'])
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from streaks.reconcile import reconcile_streaks
+
+
+class Command(BaseCommand):
+    help = "Reset study streaks broken by a missed day (run hourly to cover every time zone)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-notify', action='store_true', help="Don't notify users whose streak ended")
+
+    def handle(self, *args, **options):
+        reset = reconcile_streaks(notify=not options['no_notify'])
+        self.stdout.write(f"Reset {reset} study streak(s)")
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0002_alter_achievement_icon_alter_badge_icon'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPDailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('reason', models.CharField(choices=[('quiz', 'Quiz Completion'), ('course', 'Course Completion'), ('streak', 'Streak Milestone'), ('manual', 'Manual Award')], max_length=20)),
+                ('total_xp', models.PositiveIntegerField(default=0)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='streaks_xpd_date_1119bb_idx')],
+                'unique_together': {('user', 'date', 'reason')},
+            },
+        ),
+        migrations.CreateModel(
+            name='XPEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField()),
+                ('reason', models.CharField(choices=[('quiz', 'Quiz Completion'), ('course', 'Course Completion'), ('streak', 'Streak Milestone'), ('manual', 'Manual Award')], default='manual', max_length=20)),
+                ('source_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='streaks_xpe_user_id_d0b4d5_idx'), models.Index(fields=['created_at'], name='streaks_xpe_created_1dd03a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_alter_course_thumbnail'),
+        ('streaks', '0004_leaderboard_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xpevent',
+            name='course',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='xp_events', to='courses.course'),
+        ),
+        migrations.CreateModel(
+            name='XPPeriodTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('total_xp', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='xp_periods', to='courses.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_periods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-total_xp', 'user_id'],
+                'indexes': [models.Index(fields=['period', 'period_start', 'course', '-total_xp', 'user'], name='streaks_xpp_period_0021bb_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('user', 'period', 'period_start'), name='unique_global_xp_period'), models.UniqueConstraint(condition=models.Q(('course__isnull', False)), fields=('user', 'course', 'period', 'period_start'), name='unique_course_xp_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0006_leaderboardsnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studystreak',
+            name='timezone',
+            field=models.CharField(default='UTC', help_text="IANA time zone the user's study days are counted in", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='studystreak',
+            index=models.Index(condition=models.Q(('current_streak__gt', 0)), fields=['timezone', 'last_study_date'], name='live_streak_last_study_idx'),
+        ),
+    ]
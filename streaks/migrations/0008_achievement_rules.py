@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0007_studystreak_timezone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AchievementRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(unique=True)),
+                ('kind', models.CharField(choices=[('achievement', 'Achievement'), ('badge', 'Badge')], default='achievement', max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('achievement_type', models.CharField(blank=True, choices=[('streak', 'Streak Milestone'), ('quiz', 'Quiz Performance'), ('course', 'Course Completion'), ('engagement', 'Platform Engagement')], max_length=20)),
+                ('counter', models.CharField(choices=[('quizzes_completed', 'Quizzes Completed'), ('quizzes_passed', 'Quizzes Passed'), ('courses_completed', 'Courses Completed'), ('current_streak', 'Current Study Streak'), ('longest_streak', 'Longest Study Streak'), ('total_xp', 'Total XP'), ('level', 'Level')], max_length=30)),
+                ('threshold', models.PositiveIntegerField()),
+                ('points', models.PositiveIntegerField(default=0, help_text='XP granted with the award')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['counter', 'threshold'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='xpdailyaggregate',
+            name='reason',
+            field=models.CharField(choices=[('quiz', 'Quiz Completion'), ('course', 'Course Completion'), ('streak', 'Streak Milestone'), ('achievement', 'Achievement'), ('manual', 'Manual Award')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='xpevent',
+            name='reason',
+            field=models.CharField(choices=[('quiz', 'Quiz Completion'), ('course', 'Course Completion'), ('streak', 'Streak Milestone'), ('achievement', 'Achievement'), ('manual', 'Manual Award')], default='manual', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='achievements', to='streaks.achievementrule'),
+        ),
+        migrations.AddField(
+            model_name='badge',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='badges', to='streaks.achievementrule'),
+        ),
+        migrations.AddConstraint(
+            model_name='achievement',
+            constraint=models.UniqueConstraint(condition=models.Q(('rule__isnull', False)), fields=('user', 'rule'), name='unique_achievement_per_rule'),
+        ),
+        migrations.AddConstraint(
+            model_name='badge',
+            constraint=models.UniqueConstraint(condition=models.Q(('rule__isnull', False)), fields=('user', 'rule'), name='unique_badge_per_rule'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# The achievements and badges previously hard-coded in signals.py and AddXPView
+RULES = [
+    ('quiz-master', 'achievement', 'Quiz Master', 'Passed a quiz', 'quiz', 'quizzes_passed', 1, 50),
+    ('course-champion', 'achievement', 'Course Champion', 'Completed a course', 'course', 'courses_completed', 1, 100),
+    ('week-warrior', 'achievement', 'Week Warrior', 'Maintained a 7-day study streak', 'streak', 'longest_streak', 7, 70),
+    ('monthly-master', 'achievement', 'Monthly Master', 'Maintained a 30-day study streak', 'streak', 'longest_streak', 30, 300),
+    ('centurion', 'achievement', 'Centurion', 'Maintained a 100-day study streak', 'streak', 'longest_streak', 100, 1000),
+    ('xp-master', 'badge', 'XP Master', 'Reached level 5', '', 'level', 5, 0),
+]
+
+
+def seed_rules(apps, schema_editor):
+    AchievementRule = apps.get_model('streaks', 'AchievementRule')
+    for code, kind, title, description, achievement_type, counter, threshold, points in RULES:
+        AchievementRule.objects.get_or_create(code=code, defaults={
+            'kind': kind,
+            'title': title,
+            'description': description,
+            'achievement_type': achievement_type,
+            'counter': counter,
+            'threshold': threshold,
+            'points': points,
+        })
+
+
+def remove_rules(apps, schema_editor):
+    AchievementRule = apps.get_model('streaks', 'AchievementRule')
+    AchievementRule.objects.filter(code__in=[rule[0] for rule in RULES]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0008_achievement_rules'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rules, remove_rules),
+    ]
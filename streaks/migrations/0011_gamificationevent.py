@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0010_studyactivityyear'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user_created', 'User Created'), ('quiz_completed', 'Quiz Completed'), ('course_completed', 'Course Completed'), ('streak_changed', 'Streak Changed')], max_length=20)),
+                ('source_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gamification_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='pending_gamification_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind__in', ['quiz_completed', 'course_completed'])), fields=('kind', 'source_id'), name='unique_completion_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0011_gamificationevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['user', '-awarded_on', '-id'], name='streaks_ach_user_id_5ba76b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='badge',
+            index=models.Index(fields=['user', '-awarded_on', '-id'], name='streaks_bad_user_id_50e459_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studystreak',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='streaks_stu_user_id_a9097f_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Min
+
+# Rules seeded in 0009 for awards that used to be created without one
+LEGACY_RULE_CODES = ['quiz-master', 'course-champion', 'week-warrior', 'monthly-master', 'centurion', 'xp-master']
+BATCH_SIZE = 1000
+
+
+def link_legacy_awards(apps, schema_editor):
+    """
+    Point awards created before rules existed at the rule with the same
+    title, so the rules engine sees them as held and doesn't award them (and
+    their XP) again. Only a user's earliest row is linked when there are
+    several, as (user, rule) is unique.
+    """
+    AchievementRule = apps.get_model('streaks', 'AchievementRule')
+    Achievement = apps.get_model('streaks', 'Achievement')
+    Badge = apps.get_model('streaks', 'Badge')
+    for rule in AchievementRule.objects.filter(code__in=LEGACY_RULE_CODES):
+        model = Badge if rule.kind == 'badge' else Achievement
+        ids = list(
+            model.objects.filter(rule__isnull=True, title=rule.title)
+            .exclude(user_id__in=model.objects.filter(rule=rule).values('user_id'))
+            .values('user_id').annotate(first=Min('id')).order_by().values_list('first', flat=True)
+        )
+        for start in range(0, len(ids), BATCH_SIZE):
+            model.objects.filter(id__in=ids[start:start + BATCH_SIZE]).update(rule=rule)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0012_user_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_legacy_awards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from datetime import timedelta
+from django.db import migrations
+
+ACTIVITY_BITMAP_BYTES = 46
+
+
+def seed_activity(apps, schema_editor):
+    """
+    Set the activity bits of every live streak from before the bitmap
+    existed: ``current_streak`` days ending on ``last_study_date``. Without
+    them the next study day would restart the streak at 1.
+    """
+    StudyStreak = apps.get_model('streaks', 'StudyStreak')
+    StudyActivityYear = apps.get_model('streaks', 'StudyActivityYear')
+    streaks = (
+        StudyStreak.objects.filter(current_streak__gt=0, last_study_date__isnull=False)
+        .order_by('id').values_list('user_id', 'current_streak', 'last_study_date')
+    )
+    for user_id, length, last_study_date in streaks.iterator(chunk_size=1000):
+        years = {}
+        for offset in range(length):
+            day = last_study_date - timedelta(days=offset)
+            index = day.timetuple().tm_yday - 1
+            years.setdefault(day.year, bytearray(ACTIVITY_BITMAP_BYTES))[index // 8] |= 1 << (index % 8)
+        for year, bits in years.items():
+            row, created = StudyActivityYear.objects.get_or_create(
+                user_id=user_id, year=year, defaults={'days': bytes(bits)}
+            )
+            if not created:
+                row.days = bytes(old | new for old, new in zip(bytes(row.days), bits))
+                row.save(update_fields=['days'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0013_link_legacy_awards'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_activity, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.conf import settings
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from cloudinary.models import CloudinaryField
@@ -10,42 +14,122 @@ class StudyStreak(models.Model):
     longest_streak = models.IntegerField(default=0, validators=[MinValueValidator(0)]) 
     last_study_date = models.DateField(null=True, blank=True)
     total_study_days = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    timezone = models.CharField(max_length=64, default='UTC', help_text="IANA time zone the user's study days are counted in")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-current_streak']
         verbose_name_plural = "Study Streaks"
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+            # Only live streaks can break, so reconciliation never scans reset rows
+            models.Index(
+                fields=['timezone', 'last_study_date'], condition=models.Q(current_streak__gt=0),
+                name='live_streak_last_study_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s Streak: {self.current_streak} days"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so saves that don't change the streak emit no events
+        instance._loaded_streak = (
+            instance.__dict__.get('current_streak'), instance.__dict__.get('longest_streak')
+        )
+        return instance
+
+    @property
+    def streak_changed(self):
+        return getattr(self, '_loaded_streak', (0, 0)) != (self.current_streak, self.longest_streak)
+
     def update_streak(self, study_date=None):
         """Update the user's study streak based on study date"""
+        from .activity import activity_stats, record_study_day
+
         if not study_date:
-            study_date = timezone.now().date()
-        
-        if not self.last_study_date:
-            self.current_streak = 1
-        elif (study_date - self.last_study_date).days == 1:
-            self.current_streak += 1
-        elif (study_date - self.last_study_date).days == 0:
-            return  # Already studied today
-        else:
-            self.current_streak = 1
+            study_date = timezone.now().astimezone(ZoneInfo(self.timezone)).date()
         
+        if not record_study_day(self.user_id, study_date):
+            return  # Already studied that day
+
+        # Recount from the activity bitmap so late or out-of-order days are
+        # handled; streaks from before the bitmap were seeded into it by
+        # migration 0014, and the longest streak never goes down
+        today = max(study_date, self.last_study_date or study_date)
+        stats = activity_stats(self.user_id, today=today)
+        self.current_streak = stats['current_streak']
         self.total_study_days += 1
-        self.longest_streak = max(self.longest_streak, self.current_streak)
-        self.last_study_date = study_date
+        self.longest_streak = max(self.longest_streak, stats['longest_streak'], self.current_streak)
+        self.last_study_date = today
         self.save()
 
-class Achievement(models.Model):
-    ACHIEVEMENT_TYPES = (
-        ('streak', 'Streak Milestone'),
-        ('quiz', 'Quiz Performance'),
-        ('course', 'Course Completion'),
-        ('engagement', 'Platform Engagement')
+ACHIEVEMENT_TYPES = (
+    ('streak', 'Streak Milestone'),
+    ('quiz', 'Quiz Performance'),
+    ('course', 'Course Completion'),
+    ('engagement', 'Platform Engagement')
+)
+
+class AchievementRule(models.Model):
+    """
+    A data-defined achievement or badge, awarded once to each user whose
+    counter (see streaks.rules) reaches the threshold.
+    """
+    KINDS = (
+        ('achievement', 'Achievement'),
+        ('badge', 'Badge'),
     )
+    COUNTERS = (
+        ('quizzes_completed', 'Quizzes Completed'),
+        ('quizzes_passed', 'Quizzes Passed'),
+        ('courses_completed', 'Courses Completed'),
+        ('current_streak', 'Current Study Streak'),
+        ('longest_streak', 'Longest Study Streak'),
+        ('total_xp', 'Total XP'),
+        ('level', 'Level'),
+    )
+
+    code = models.SlugField(unique=True)
+    kind = models.CharField(max_length=20, choices=KINDS, default='achievement')
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    achievement_type = models.CharField(max_length=20, choices=ACHIEVEMENT_TYPES, blank=True)
+    counter = models.CharField(max_length=30, choices=COUNTERS)
+    threshold = models.PositiveIntegerField()
+    points = models.PositiveIntegerField(default=0, help_text="XP granted with the award")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['counter', 'threshold']
+
+    def __str__(self):
+        return f"{self.title} ({self.counter} >= {self.threshold})"
+
+ACTIVITY_BITMAP_BYTES = 46  # 366 days, one bit each
+
+class StudyActivityYear(models.Model):
+    """
+    One bit per day of a calendar year (bit 0 is January 1st), set when
+    the user studied that day. See streaks.activity for the bit math.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='study_activity')
+    year = models.PositiveSmallIntegerField()
+    days = models.BinaryField(max_length=ACTIVITY_BITMAP_BYTES, default=bytes(ACTIVITY_BITMAP_BYTES))
+
+    class Meta:
+        ordering = ['year']
+        unique_together = ('user', 'year')
+
+    def __str__(self):
+        return f"{self.user_id}'s study activity in {self.year}"
+
+class Achievement(models.Model):
+    ACHIEVEMENT_TYPES = ACHIEVEMENT_TYPES
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='achievements')
     title = models.CharField(max_length=255)
@@ -55,14 +139,26 @@ class Achievement(models.Model):
     awarded_on = models.DateTimeField(auto_now_add=True)
     points = models.PositiveIntegerField(default=0)
     is_public = models.BooleanField(default=True)
+    rule = models.ForeignKey(AchievementRule, on_delete=models.SET_NULL, null=True, blank=True, related_name='achievements')
 
     class Meta:
         ordering = ['-awarded_on']
         verbose_name_plural = "Achievements"
+        indexes = [
+            models.Index(fields=['user', '-awarded_on', '-id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rule'], condition=models.Q(rule__isnull=False),
+                name='unique_achievement_per_rule',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - Awarded to {self.user.username}"
 
+XP_PER_LEVEL = 100
+
 class XPSystem(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="xp")
     total_xp = models.PositiveIntegerField(default=0)
@@ -75,22 +171,236 @@ class XPSystem(models.Model):
     def __str__(self):
         return f"{self.user.username} - Level {self.level} ({self.total_xp} XP)"
 
-    def add_xp(self, amount):
+    def add_xp(self, amount, reason='manual', source_id=None):
         """
         Increase XP and level up if needed
         Args:
             amount (int): Amount of XP to add
+            reason (str): One of XPEvent.REASONS
+            source_id (int): Id of the quiz attempt, enrollment, etc. that earned it
         """
-        if amount < 0:
-            raise ValueError("XP amount cannot be negative")
-            
-        self.total_xp += amount
-        self.level = self.calculate_level()
-        self.save()
+        XPSystem.grant_xp(self.user_id, amount, reason=reason, source_id=source_id)
+        self.refresh_from_db(fields=['total_xp', 'level'])
 
     def calculate_level(self):
         """Calculate level based on XP thresholds"""
-        return max(1, (self.total_xp // 100) + 1)
+        return max(1, (self.total_xp // XP_PER_LEVEL) + 1)
+
+    @classmethod
+    def grant_xp(cls, user_id, amount, reason='manual', source_id=None, course_id=None):
+        """
+        Add XP without reading the row first: the grant is appended to the
+        XP ledger, one UPDATE increments the total and recomputes the level
+        from the incremented value, and a second copies the new total into
+        the leaderboard, all in the same transaction, so concurrent grants
+        can't lose updates.
+        Args:
+            user_id (int): User receiving the XP
+            amount (int): Amount of XP to add
+            reason (str): One of XPEvent.REASONS
+            source_id (int): Id of the quiz attempt, enrollment, etc. that earned it
+            course_id (int): Course the XP was earned in, if any
+        """
+        if amount < 0:
+            raise ValueError("XP amount cannot be negative")
+
+        new_total = F('total_xp') + amount
+        with transaction.atomic():
+            event = XPEvent.objects.create(
+                user_id=user_id, amount=amount, reason=reason, source_id=source_id, course_id=course_id
+            )
+            XPPeriodTotal.add(user_id, amount, timezone.localdate(event.created_at), course_id)
+            updated = cls.objects.filter(user_id=user_id).update(
+                total_xp=new_total,
+                level=new_total / XP_PER_LEVEL + 1,
+            )
+            if not updated:
+                cls.objects.get_or_create(user_id=user_id)
+                cls.objects.filter(user_id=user_id).update(
+                    total_xp=new_total,
+                    level=new_total / XP_PER_LEVEL + 1,
+                )
+            if not Leaderboard.sync_xp(user_id):
+                Leaderboard.objects.get_or_create(user_id=user_id)
+                Leaderboard.sync_xp(user_id)
+
+    @classmethod
+    def grant_xp_bulk(cls, grants):
+        """
+        Apply many grants with a fixed number of statements: one ledger
+        insert, inserts of any missing rows, and one UPDATE per table with
+        each user's amount in a CASE.
+        Args:
+            grants (list): Dicts with user_id, amount and optional reason, source_id, course_id
+        """
+        if any(grant['amount'] < 0 for grant in grants):
+            raise ValueError("XP amount cannot be negative")
+        grants = [grant for grant in grants if grant['amount']]
+        if not grants:
+            return
+
+        per_user = defaultdict(int)
+        for grant in grants:
+            per_user[grant['user_id']] += grant['amount']
+        user_ids = list(per_user)
+        amount = Case(
+            *[When(user_id=user_id, then=Value(total)) for user_id, total in per_user.items()],
+            default=Value(0), output_field=models.IntegerField(),
+        )
+        new_total = F('total_xp') + amount
+        now = timezone.now()
+        with transaction.atomic():
+            XPEvent.objects.bulk_create([
+                XPEvent(
+                    user_id=grant['user_id'], amount=grant['amount'], reason=grant.get('reason', 'manual'),
+                    source_id=grant.get('source_id'), course_id=grant.get('course_id'), created_at=now,
+                )
+                for grant in grants
+            ])
+            cls.objects.bulk_create([cls(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+            cls.objects.filter(user_id__in=user_ids).update(
+                total_xp=new_total,
+                level=new_total / XP_PER_LEVEL + 1,
+            )
+            Leaderboard.objects.bulk_create([Leaderboard(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+            Leaderboard.sync_xp(*user_ids)
+            XPPeriodTotal.add_bulk(grants, timezone.localdate(now))
+
+class XPEvent(models.Model):
+    """
+    Append-only record of a single XP grant. XPSystem.total_xp is the
+    running sum of these; old events are rolled into XPDailyAggregate.
+    """
+    REASONS = (
+        ('quiz', 'Quiz Completion'),
+        ('course', 'Course Completion'),
+        ('streak', 'Streak Milestone'),
+        ('achievement', 'Achievement'),
+        ('manual', 'Manual Award'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='xp_events')
+    amount = models.PositiveIntegerField()
+    reason = models.CharField(max_length=20, choices=REASONS, default='manual')
+    source_id = models.PositiveIntegerField(null=True, blank=True)
+    course = models.ForeignKey('courses.Course', on_delete=models.SET_NULL, null=True, blank=True, related_name='xp_events')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: +{self.amount} XP ({self.reason})"
+
+class XPDailyAggregate(models.Model):
+    """XP earned per user, day and reason, compacted from XPEvent rows."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='xp_daily')
+    date = models.DateField()
+    reason = models.CharField(max_length=20, choices=XPEvent.REASONS)
+    total_xp = models.PositiveIntegerField(default=0)
+    event_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('user', 'date', 'reason')
+        indexes = [models.Index(fields=['date'])]
+
+    def __str__(self):
+        return f"{self.user_id} {self.date} {self.reason}: {self.total_xp} XP"
+
+class XPPeriodTotal(models.Model):
+    """
+    XP earned per user in a calendar week or month, overall (no course) and
+    per course. Maintained incrementally by XPSystem.grant_xp so windowed
+    leaderboards read one indexed top-N instead of summing events.
+    """
+    PERIODS = (
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='xp_periods')
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, null=True, blank=True, related_name='xp_periods')
+    period = models.CharField(max_length=10, choices=PERIODS)
+    period_start = models.DateField()
+    total_xp = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-total_xp', 'user_id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'period', 'period_start'], condition=models.Q(course__isnull=True),
+                name='unique_global_xp_period',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'course', 'period', 'period_start'], condition=models.Q(course__isnull=False),
+                name='unique_course_xp_period',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'period_start', 'course', '-total_xp', 'user']),
+        ]
+
+    def __str__(self):
+        scope = f"course {self.course_id}" if self.course_id else "overall"
+        return f"{self.user_id} {self.period} of {self.period_start} ({scope}): {self.total_xp} XP"
+
+    @staticmethod
+    def start_of(period, day):
+        """First day of the week (Monday) or month containing ``day``."""
+        if period == 'week':
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @classmethod
+    def add(cls, user_id, amount, day, course_id=None):
+        """Add XP to every bucket covering ``day`` with F() updates, creating missing rows."""
+        scopes = [None] if course_id is None else [None, course_id]
+        for period, _ in cls.PERIODS:
+            start = cls.start_of(period, day)
+            for scope in scopes:
+                bucket = cls.objects.filter(user_id=user_id, period=period, period_start=start, course_id=scope)
+                if bucket.update(total_xp=F('total_xp') + amount):
+                    continue
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            user_id=user_id, period=period, period_start=start,
+                            course_id=scope, total_xp=amount,
+                        )
+                except IntegrityError:
+                    # A concurrent grant created the row first
+                    bucket.update(total_xp=F('total_xp') + amount)
+
+    @classmethod
+    def add_bulk(cls, grants, day):
+        """Add many grants made on ``day`` to their buckets with one UPDATE."""
+        amounts = defaultdict(int)
+        for grant in grants:
+            scopes = [None] if grant.get('course_id') is None else [None, grant['course_id']]
+            for period, _ in cls.PERIODS:
+                for scope in scopes:
+                    amounts[(grant['user_id'], period, cls.start_of(period, day), scope)] += grant['amount']
+
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, period=period, period_start=start, course_id=scope)
+                for user_id, period, start, scope in amounts
+            ],
+            ignore_conflicts=True,
+        )
+        buckets = cls.objects.filter(
+            user_id__in={key[0] for key in amounts}, period_start__in={key[2] for key in amounts}
+        ).values_list('id', 'user_id', 'period', 'period_start', 'course_id')
+        ids = {tuple(row[1:]): row[0] for row in buckets}
+        cls.objects.filter(id__in=[ids[key] for key in amounts]).update(total_xp=F('total_xp') + Case(
+            *[When(id=ids[key], then=Value(total)) for key, total in amounts.items()],
+            default=Value(0), output_field=models.IntegerField(),
+        ))
 
 class Badge(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="badges")
@@ -98,9 +408,19 @@ class Badge(models.Model):
     description = models.TextField()
     icon = CloudinaryField(null=True, blank=True)
     awarded_on = models.DateTimeField(auto_now_add=True)
+    rule = models.ForeignKey(AchievementRule, on_delete=models.SET_NULL, null=True, blank=True, related_name='badges')
 
     class Meta:
         verbose_name_plural = "Badges"
+        indexes = [
+            models.Index(fields=['user', '-awarded_on', '-id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rule'], condition=models.Q(rule__isnull=False),
+                name='unique_badge_per_rule',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -108,6 +428,7 @@ class Badge(models.Model):
 class Leaderboard(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="leaderboard")
     total_xp = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name_plural = "Leaderboards"
@@ -118,5 +439,65 @@ class Leaderboard(models.Model):
 
     def update_xp(self):
         """Sync leaderboard XP with user's XP system"""
-        self.total_xp = self.user.xp.total_xp
-        self.save()
+        Leaderboard.sync_xp(self.user_id)
+        self.refresh_from_db(fields=['total_xp'])
+
+    @classmethod
+    def sync_xp(cls, *user_ids):
+        """Copy the users' XP totals in a single UPDATE; returns the number of rows updated."""
+        return cls.objects.filter(user_id__in=user_ids).update(
+            total_xp=Subquery(XPSystem.objects.filter(user_id=OuterRef('user_id')).values('total_xp')[:1]),
+            updated_at=timezone.now(),
+        )
+
+class LeaderboardSnapshot(models.Model):
+    """
+    Periodic summary of the standings with the AI insights generated from
+    it. The id doubles as the snapshot version served with the leaderboard.
+    """
+    summary = models.JSONField(default=dict)
+    insights = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        get_latest_by = 'id'
+
+    def __str__(self):
+        return f"Leaderboard snapshot {self.id} ({self.created_at:%Y-%m-%d %H:%M})"
+
+class GamificationEvent(models.Model):
+    """
+    Transactional outbox: signal handlers record what happened in the
+    writer's transaction, and streaks.outbox applies the XP, achievement
+    and leaderboard effects later in batches.
+    """
+    KINDS = (
+        ('user_created', 'User Created'),
+        ('quiz_completed', 'Quiz Completed'),
+        ('course_completed', 'Course Completed'),
+        ('streak_changed', 'Streak Changed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='gamification_events')
+    source_id = models.PositiveIntegerField(null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='pending_gamification_idx'),
+        ]
+        constraints = [
+            # A quiz attempt or enrollment is only rewarded for completing once
+            models.UniqueConstraint(
+                fields=['kind', 'source_id'], condition=models.Q(kind__in=['quiz_completed', 'course_completed']),
+                name='unique_completion_event',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.user_id} ({'processed' if self.processed_at else 'pending'})"
@@ -0,0 +1,85 @@
+import logging
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from quizzes.models import Quiz
+from .models import GamificationEvent, Leaderboard, StudyStreak, XPSystem
+from .rules import evaluate_rules
+
+logger = logging.getLogger(__name__)
+
+COURSE_COMPLETION_XP = 100
+
+
+def _create_missing_rows(user_ids):
+    if not user_ids:
+        return
+    has_streak = set(StudyStreak.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    StudyStreak.objects.bulk_create([StudyStreak(user_id=u) for u in user_ids if u not in has_streak])
+    XPSystem.objects.bulk_create([XPSystem(user_id=u) for u in user_ids], ignore_conflicts=True)
+    Leaderboard.objects.bulk_create([Leaderboard(user_id=u) for u in user_ids], ignore_conflicts=True)
+
+
+def apply_events(events):
+    """
+    Apply a batch of events: rows for new users, one bulk XP grant covering
+    every completion, then one rule evaluation over the affected users.
+    """
+    _create_missing_rows({e.user_id for e in events if e.kind == 'user_created'})
+
+    quiz_courses = dict(Quiz.objects.filter(
+        id__in={e.payload.get('quiz_id') for e in events if e.kind == 'quiz_completed'}
+    ).values_list('id', 'course_id'))
+    grants = []
+    for event in events:
+        if event.kind == 'quiz_completed':
+            grants.append({
+                'user_id': event.user_id, 'amount': int(event.payload.get('score') or 0),  # XP based on quiz score
+                'reason': 'quiz', 'source_id': event.source_id,
+                'course_id': quiz_courses.get(event.payload.get('quiz_id')),
+            })
+        elif event.kind == 'course_completed':
+            grants.append({
+                'user_id': event.user_id, 'amount': COURSE_COMPLETION_XP,
+                'reason': 'course', 'source_id': event.source_id, 'course_id': event.payload.get('course_id'),
+            })
+    XPSystem.grant_xp_bulk(grants)
+
+    evaluate_rules(list(dict.fromkeys(e.user_id for e in events if e.kind != 'user_created')))
+
+
+def process_gamification_events(batch_size=500):
+    """
+    Claim and apply one batch of pending events in a transaction. Workers
+    on PostgreSQL skip rows locked by each other.
+
+    Returns:
+        int: Number of events processed
+    """
+    with transaction.atomic():
+        events = list(
+            GamificationEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        apply_events(events)
+        GamificationEvent.objects.filter(id__in=[e.id for e in events]).update(processed_at=timezone.now())
+    return len(events)
+
+
+def drain_gamification_events(batch_size=500):
+    """Process batches until the outbox is empty; returns the number of events."""
+    processed = 0
+    while True:
+        count = process_gamification_events(batch_size=batch_size)
+        if not count:
+            return processed
+        processed += count
+
+
+def purge_processed_events(older_than_days=7):
+    """Delete applied events once they're no longer useful for debugging."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = GamificationEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
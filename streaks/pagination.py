@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+
+
+class StreakCursorPagination(CursorPagination):
+    """Keyset pagination for a user's study streaks, newest first."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class AwardCursorPagination(StreakCursorPagination):
+    """Keyset pagination for a user's achievements or badges, most recent first."""
+    ordering = ('-awarded_on', '-id')
+
+
+class XPSystemCursorPagination(StreakCursorPagination):
+    """Keyset pagination for XP rows (at most one per user)."""
+    ordering = ('id',)
@@ -0,0 +1,228 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Leaderboard, XPPeriodTotal
+
+# Entries are packed into one signed 64-bit key, (MAX_XP - xp) << 32 | user_id,
+# so ascending key order is descending XP with ties broken by user id and the
+# whole index fits in a compact array that bisect can search directly.
+MAX_XP = 2 ** 31 - 1
+USER_BITS = 32
+USER_MASK = (1 << USER_BITS) - 1
+
+# Leaderboard rows changed since the last sync are applied every SYNC_SECONDS;
+# the index is rebuilt from scratch every REBUILD_SECONDS to drop deleted users
+# and any change whose transaction committed after the sync overlap.
+SYNC_SECONDS = getattr(settings, 'LEADERBOARD_SYNC_SECONDS', 5)
+REBUILD_SECONDS = getattr(settings, 'LEADERBOARD_REBUILD_SECONDS', 600)
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Weekly/monthly boards are read from the cache and may lag by this much
+WINDOW_CACHE_SECONDS = getattr(settings, 'LEADERBOARD_WINDOW_CACHE_SECONDS', 60)
+
+
+def _key(user_id, xp):
+    return (MAX_XP - min(xp, MAX_XP)) << USER_BITS | user_id
+
+
+def _decode(key):
+    return key & USER_MASK, MAX_XP - (key >> USER_BITS)
+
+
+class RankIndex:
+    """
+    Users ordered by XP, answering rank, percentile and neighbor queries
+    with binary search instead of counting rows.
+    """
+
+    def __init__(self, rows=()):
+        self.xp_by_user = dict(rows)
+        self.keys = array('q', sorted(_key(u, xp) for u, xp in self.xp_by_user.items()))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, user_id):
+        return user_id in self.xp_by_user
+
+    def set_xp(self, user_id, xp):
+        """
+        Insert or move a user. Moving only shifts the entries between the old
+        and new positions, so small XP changes stay cheap on large boards.
+        """
+        old = self.xp_by_user.get(user_id)
+        if old == xp:
+            return
+        key, keys = _key(user_id, xp), self.keys
+        target = bisect_left(keys, key)
+        if old is None:
+            keys.insert(target, key)
+        else:
+            current = bisect_left(keys, _key(user_id, old))
+            if target <= current:
+                keys[target + 1:current + 1] = keys[target:current]
+                keys[target] = key
+            else:
+                keys[current:target - 1] = keys[current + 1:target]
+                keys[target - 1] = key
+        self.xp_by_user[user_id] = xp
+
+    def remove(self, user_id):
+        old = self.xp_by_user.pop(user_id, None)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, _key(user_id, old))]
+
+    def rank_for_xp(self, xp):
+        """Competition rank: one more than the number of users with more XP."""
+        return bisect_left(self.keys, _key(0, xp)) + 1
+
+    def position(self, user_id):
+        """Zero-based index of the user in leaderboard order."""
+        return bisect_left(self.keys, _key(user_id, self.xp_by_user[user_id]))
+
+    def entries(self, start, stop):
+        """(rank, user_id, xp) for leaderboard positions [start, stop)."""
+        start, stop = max(start, 0), min(stop, len(self.keys))
+        result = []
+        for key in self.keys[start:stop]:
+            user_id, xp = _decode(key)
+            result.append((self.rank_for_xp(xp), user_id, xp))
+        return result
+
+    def standing(self, user_id, neighbors=2):
+        """
+        Rank, percentile and the users directly above and below.
+
+        Percentile is the share of other users with strictly less XP.
+        """
+        xp = self.xp_by_user[user_id]
+        position = self.position(user_id)
+        total = len(self.keys)
+        below = total - bisect_right(self.keys, _key(USER_MASK, xp))
+        return {
+            'rank': self.rank_for_xp(xp),
+            'total_xp': xp,
+            'total_users': total,
+            'percentile': round(100 * below / (total - 1), 2) if total > 1 else 100.0,
+            'above': self.entries(position - neighbors, position),
+            'below': self.entries(position + 1, position + 1 + neighbors),
+        }
+
+
+class _CachedRankIndex:
+    """Process-wide RankIndex kept in step with the Leaderboard table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.invalidate()
+
+    def invalidate(self):
+        self._index = None
+        self._built_at = self._synced_at = 0.0
+        self._synced_until = None
+
+    def _rebuild(self):
+        started = timezone.now()
+        rows = Leaderboard.objects.values_list('user_id', 'total_xp').iterator(chunk_size=10000)
+        self._index = RankIndex(rows)
+        self._built_at = self._synced_at = time.monotonic()
+        self._synced_until = started
+
+    def _sync(self):
+        started = timezone.now()
+        changed = Leaderboard.objects.filter(
+            updated_at__gte=self._synced_until - SYNC_OVERLAP
+        ).values_list('user_id', 'total_xp')
+        for user_id, xp in changed.iterator(chunk_size=10000):
+            self._index.set_xp(user_id, xp)
+        self._synced_at = time.monotonic()
+        self._synced_until = started
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._index is None or now - self._built_at >= REBUILD_SECONDS:
+                self._rebuild()
+            elif now - self._synced_at >= SYNC_SECONDS:
+                self._sync()
+            return self._index
+
+    def peek(self):
+        """
+        The index if this process has built one, synced when due but never
+        rebuilt; None on a cold process.
+        """
+        with self._lock:
+            if self._index is not None and time.monotonic() - self._synced_at >= SYNC_SECONDS:
+                self._sync()
+            return self._index
+
+
+def table_standing(user_id):
+    """
+    Rank, percentile and user count read from the Leaderboard table with
+    two counting queries, for when no index is built; None for users
+    without a row.
+    """
+    xp = Leaderboard.objects.filter(user_id=user_id).values_list('total_xp', flat=True).first()
+    if xp is None:
+        return None
+    counts = Leaderboard.objects.aggregate(
+        total=Count('id'),
+        above=Count('id', filter=Q(total_xp__gt=xp)),
+        below=Count('id', filter=Q(total_xp__lt=xp)),
+    )
+    total = counts['total']
+    return {
+        'rank': counts['above'] + 1,
+        'total_users': total,
+        'percentile': round(100 * counts['below'] / (total - 1), 2) if total > 1 else 100.0,
+    }
+
+
+rank_index = _CachedRankIndex()
+
+
+def windowed_leaderboard(period, course_id=None, offset=0, limit=20, day=None):
+    """
+    A page of the current week's or month's standings, overall or for one
+    course, read from the incrementally maintained XPPeriodTotal rows and
+    cached for WINDOW_CACHE_SECONDS.
+
+    Returns:
+        dict: period, period_start, course, count and ranked entries
+    """
+    start = XPPeriodTotal.start_of(period, day or timezone.localdate())
+    cache_key = f"leaderboard_{period}_{start.isoformat()}_{course_id or 'all'}_{offset}_{limit}"
+    board = cache.get(cache_key)
+    if board is not None:
+        return board
+
+    totals = XPPeriodTotal.objects.filter(period=period, period_start=start, course_id=course_id)
+    page = list(
+        totals.order_by('-total_xp', 'user_id')
+        .values_list('user_id', 'user__username', 'total_xp')[offset:offset + limit]
+    )
+    entries = []
+    for position, (user_id, username, xp) in enumerate(page, start=offset + 1):
+        if not entries:
+            rank = totals.filter(total_xp__gt=xp).count() + 1
+        elif xp != entries[-1]['total_xp']:
+            rank = position
+        entries.append({'rank': rank, 'user': user_id, 'username': username, 'total_xp': xp})
+
+    board = {
+        'period': period,
+        'period_start': start,
+        'course': course_id,
+        'count': totals.count(),
+        'leaderboard': entries,
+    }
+    cache.set(cache_key, board, WINDOW_CACHE_SECONDS)
+    return board
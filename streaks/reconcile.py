@@ -0,0 +1,70 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, available_timezones
+from django.db import transaction
+from django.utils import timezone
+from notifications.tasks import send_bulk_notifications
+from .models import StudyStreak
+from .signals import streaks_reset
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _zones():
+    return [(name, ZoneInfo(name)) for name in sorted(available_timezones())]
+
+
+def zones_by_local_date(now=None):
+    """Group time zone names by their current local date (at most three groups)."""
+    now = now or timezone.now()
+    groups = defaultdict(list)
+    for name, zone in _zones():
+        groups[now.astimezone(zone).date()].append(name)
+    return groups
+
+
+def reconcile_streaks(now=None, notify=True):
+    """
+    Reset streaks whose owner missed a whole local day.
+
+    Meant to run hourly so every time zone is reconciled shortly after its
+    midnight. Zones sharing a local date are handled by one set-based UPDATE
+    over the live-streak index, so the work is proportional to the streaks
+    that actually broke. Resetting is idempotent.
+
+    Returns:
+        int: Number of streaks reset
+    """
+    reset = 0
+    for today, zones in zones_by_local_date(now).items():
+        broken = StudyStreak.objects.filter(
+            timezone__in=zones,
+            current_streak__gt=0,
+            last_study_date__lt=today - timedelta(days=1),
+        )
+        with transaction.atomic():
+            lost = list(broken.select_for_update().values_list('id', 'user_id', 'current_streak'))
+            if not lost:
+                continue
+            broken.update(current_streak=0, updated_at=timezone.now())
+        reset += len(lost)
+        streaks_reset.send(sender=StudyStreak, user_ids=[user_id for _, user_id, _ in lost])
+        if notify:
+            send_bulk_notifications(
+                (
+                    {
+                        'user_id': user_id,
+                        'title': "Your study streak ended",
+                        'message': f"Your {days}-day study streak has ended. Study today to start a new one!",
+                        'source_id': streak_id,
+                    }
+                    for streak_id, user_id, days in lost
+                ),
+                notification_type='streak',
+                source_model='StudyStreak',
+            )
+    logger.info("Reset %s broken study streak(s)", reset)
+    return reset
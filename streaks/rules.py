@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from notifications.tasks import send_bulk_notifications
+from quizzes.models import QuizAttempt, pass_threshold
+from courses.models import Enrollment
+from .models import Achievement, AchievementRule, Badge, StudyStreak, XPSystem
+
+User = get_user_model()
+
+COUNTERS = [counter for counter, _ in AchievementRule.COUNTERS]
+
+
+def user_counters(user_ids):
+    """
+    Snapshot every rule counter for a batch of users with one grouped query
+    per source table.
+
+    Returns:
+        dict: user_id -> {counter: value}, with zeros for missing data
+    """
+    counters = {user_id: dict.fromkeys(COUNTERS, 0) for user_id in user_ids}
+
+    quizzes = (
+        QuizAttempt.objects.filter(user_id__in=user_ids, status='completed')
+        .values('user_id')
+        .annotate(
+            completed=Count('id'),
+            passed=Count('quiz', distinct=True, filter=Q(score__gte=pass_threshold())),
+        )
+        .order_by()
+    )
+    for row in quizzes:
+        counters[row['user_id']].update(quizzes_completed=row['completed'], quizzes_passed=row['passed'])
+
+    courses = (
+        Enrollment.objects.filter(student_id__in=user_ids, status='completed')
+        .values('student_id').annotate(completed=Count('id')).order_by()
+    )
+    for row in courses:
+        counters[row['student_id']]['courses_completed'] = row['completed']
+
+    streaks = (
+        StudyStreak.objects.filter(user_id__in=user_ids)
+        .values('user_id').annotate(current=Max('current_streak'), longest=Max('longest_streak')).order_by()
+    )
+    for row in streaks:
+        counters[row['user_id']].update(current_streak=row['current'], longest_streak=row['longest'])
+
+    for user_id, total_xp, level in XPSystem.objects.filter(user_id__in=user_ids).values_list('user_id', 'total_xp', 'level'):
+        counters[user_id].update(total_xp=total_xp, level=level)
+    return counters
+
+
+def _award(user_ids, rules):
+    """Create the awards earned by ``user_ids`` and not yet held; returns the new objects."""
+    with transaction.atomic():
+        # Evaluators of the same users queue on their XP rows, so what is held
+        # can't change between the lookup and the insert
+        list(XPSystem.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id').values_list('id'))
+        return _insert_awards(user_ids, rules)
+
+
+def _insert_awards(user_ids, rules):
+    rule_ids = [rule.id for rule in rules]
+    held = set(Achievement.objects.filter(user_id__in=user_ids, rule_id__in=rule_ids).values_list('user_id', 'rule_id'))
+    held |= set(Badge.objects.filter(user_id__in=user_ids, rule_id__in=rule_ids).values_list('user_id', 'rule_id'))
+    counters = user_counters(user_ids)
+
+    achievements, badges = [], []
+    for user_id, values in counters.items():
+        for rule in rules:
+            if values[rule.counter] < rule.threshold or (user_id, rule.id) in held:
+                continue
+            if rule.kind == 'badge':
+                badges.append(Badge(user_id=user_id, rule=rule, title=rule.title, description=rule.description))
+            else:
+                achievements.append(Achievement(
+                    user_id=user_id, rule=rule, title=rule.title, description=rule.description,
+                    achievement_type=rule.achievement_type or 'engagement', points=rule.points,
+                ))
+
+    return Achievement.objects.bulk_create(achievements), Badge.objects.bulk_create(badges)
+
+
+def evaluate_rules(user_ids, rules=None, notify=True):
+    """
+    Evaluate active achievement rules for a batch of users and award what
+    they have newly earned. XP from awarded achievements can unlock XP or
+    level rules, so users who gained XP are evaluated again.
+
+    Returns:
+        tuple: (new achievements, new badges)
+    """
+    rules = list(rules if rules is not None else AchievementRule.objects.filter(is_active=True))
+    new_achievements, new_badges = [], []
+    pending = list(user_ids)
+    while pending and rules:
+        achievements, badges = _award(pending, rules)
+        new_achievements += achievements
+        new_badges += badges
+        grants = [
+            {'user_id': a.user_id, 'amount': a.points, 'reason': 'achievement', 'source_id': a.id}
+            for a in achievements if a.points
+        ]
+        XPSystem.grant_xp_bulk(grants)
+        pending = list(dict.fromkeys(grant['user_id'] for grant in grants))
+
+    if notify and (new_achievements or new_badges):
+        send_bulk_notifications(
+            (
+                {
+                    'user_id': award.user_id,
+                    'title': f"Unlocked: {award.title}",
+                    'message': award.description,
+                    'source_id': award.id,
+                }
+                for award in new_achievements + new_badges
+            ),
+            notification_type='achievement',
+        )
+    return new_achievements, new_badges
+
+
+def evaluate_all_users(rules=None, batch_size=1000, notify=True):
+    """Evaluate rules over every user, a batch at a time (e.g. after adding a rule)."""
+    awarded = 0
+    last_id = 0
+    while True:
+        user_ids = list(User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not user_ids:
+            return awarded
+        achievements, badges = evaluate_rules(user_ids, rules=rules, notify=notify)
+        awarded += len(achievements) + len(badges)
+        last_id = user_ids[-1]
@@ -1,3 +1,4 @@
+from zoneinfo import available_timezones
 from rest_framework import serializers
 from .models import StudyStreak, Achievement, XPSystem, Badge, Leaderboard
 
@@ -5,9 +6,14 @@ class StudyStreakSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudyStreak
         fields = ['id', 'user', 'current_streak', 'longest_streak', 'last_study_date', 
-                 'total_study_days', 'created_at', 'updated_at']
+                 'total_study_days', 'timezone', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate_timezone(self, value):
+        if value not in available_timezones():
+            raise serializers.ValidationError("Unknown time zone")
+        return value
+
 class AchievementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Achievement
@@ -29,8 +35,9 @@ class BadgeSerializer(serializers.ModelSerializer):
 
 class LeaderboardSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
+    rank = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Leaderboard
-        fields = ['id', 'user', 'username', 'total_xp']
+        fields = ['id', 'user', 'username', 'rank', 'total_xp']
         read_only_fields = ['total_xp']
@@ -1,9 +1,31 @@
-from django.test import TestCase
+import time
+from importlib import import_module
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from django.db import IntegrityError, OperationalError, connection
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.apps import apps
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import StudyStreak, Achievement, XPSystem, Badge, Leaderboard
+from notifications.models import Notification, NotificationPreference
+from .activity import activity_stats, longest_run, record_study_day, user_today
+from .insights import generate_leaderboard_snapshot
+from .ledger import compact_xp_events, xp_history
+from .outbox import drain_gamification_events
+from .reconcile import reconcile_streaks
+from .rules import evaluate_all_users, evaluate_rules, user_counters
+from .ranking import RankIndex, rank_index
+from courses.models import Course, Enrollment
+from quizzes.models import Quiz, QuizAttempt
+from .models import (
+    StudyStreak, Achievement, AchievementRule, XPSystem, Badge, Leaderboard,
+    XPEvent, XPDailyAggregate, XPPeriodTotal, GamificationEvent
+)
 from .serializers import StudyStreakSerializer, XPSystemSerializer
 
 User = get_user_model()
@@ -19,20 +41,21 @@ class StreaksViewsTest(APITestCase):
         self.client.force_authenticate(user=self.user)
         
         # Create test data
-        self.streak = StudyStreak.objects.create(user=self.user)
+        self.streak = StudyStreak.objects.get(user=self.user)  # Created at signup
         self.achievement = Achievement.objects.create(
             user=self.user,
             title='Test Achievement',
             description='Test Description',
             achievement_type='STUDY'
         )
-        self.xp_system = XPSystem.objects.create(user=self.user)
+        self.xp_system = XPSystem.objects.get(user=self.user)
         self.badge = Badge.objects.create(
             user=self.user,
             title='Test Badge',
             description='Test Badge Description'
         )
-        self.leaderboard = Leaderboard.objects.create(user=self.user)
+        self.leaderboard = Leaderboard.objects.get(user=self.user)
+        rank_index.invalidate()
 
     def test_study_streak_views(self):
         """Test Study Streak endpoints"""
@@ -126,6 +149,118 @@ class StreaksViewsTest(APITestCase):
         self.assertIn('leaderboard', response.data)
         self.assertIn('ai_insights', response.data)
 
+    def test_leaderboard_ranks(self):
+        """Test ranked leaderboard pages and the current user's standing"""
+        for name, xp in [('ana', 500), ('ben', 300), ('cai', 300), ('dee', 100)]:
+            user = User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+            XPSystem.grant_xp(user.id, xp)
+        XPSystem.grant_xp(self.user.id, 200)
+
+        response = self.client.get(reverse('leaderboard-list'), {'offset': 1, 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(
+            [(e['username'], e['rank']) for e in response.data['leaderboard']],
+            [('ben', 2), ('cai', 2)]
+        )
+
+        response = self.client.get(reverse('leaderboard-me'), {'neighbors': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['rank'], response.data['percentile']), (4, 25.0))
+        self.assertEqual([e['username'] for e in response.data['above']], ['cai'])
+        self.assertEqual([e['username'] for e in response.data['below']], ['dee'])
+
+        # Incremental updates keep the order and ranks consistent
+        index = RankIndex([(1, 10), (2, 30), (3, 20)])
+        index.set_xp(1, 40)
+        index.remove(2)
+        self.assertEqual(index.entries(0, 5), [(1, 1, 40), (2, 3, 20)])
+        self.assertEqual(index.standing(3)['rank'], 2)
+
+    def test_leaderboard_conditional_get(self):
+        """Test leaderboard pages revalidate against the rank index"""
+        XPSystem.grant_xp(self.user.id, 50)
+        etag = self.client.get(reverse('leaderboard-list'))['ETag']
+        with self.assertNumQueries(1):  # Cached insights version; ranks come from memory
+            response = self.client.get(reverse('leaderboard-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        XPSystem.grant_xp(self.user.id, 10)
+        rank_index.invalidate()
+        response = self.client.get(reverse('leaderboard-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['leaderboard'][0]['total_xp'], 60)
+
+    def test_windowed_leaderboards(self):
+        """Test weekly and per-course standings from period totals"""
+        course = Course.objects.create(title='Algebra', instructor=self.user)
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        XPSystem.grant_xp(self.user.id, 30, reason='quiz', course_id=course.id)
+        XPSystem.grant_xp(other.id, 50)
+        XPSystem.grant_xp(other.id, 10, reason='quiz', course_id=course.id)
+
+        # Last month's XP doesn't count towards this week
+        XPPeriodTotal.add(self.user.id, 1000, timezone.localdate() - timedelta(days=62))
+
+        response = self.client.get(reverse('leaderboard-weekly'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(e['username'], e['rank'], e['total_xp']) for e in response.data['leaderboard']],
+            [('other', 1, 60), ('testuser', 2, 30)]
+        )
+
+        response = self.client.get(reverse('leaderboard-monthly'), {'course': course.id})
+        self.assertEqual(
+            [(e['username'], e['total_xp']) for e in response.data['leaderboard']],
+            [('testuser', 30), ('other', 10)]
+        )
+
+        # Served from cache until it expires
+        XPSystem.grant_xp(self.user.id, 100)
+        response = self.client.get(reverse('leaderboard-weekly'))
+        self.assertEqual(response.data['leaderboard'][0]['username'], 'other')
+
+    @patch('streaks.insights.TaeAI')
+    def test_leaderboard_insights_come_from_snapshots(self, mock_ai):
+        """Test that leaderboard reads serve stored insights without model calls"""
+        mock_ai.return_value.process_text.return_value = 'XP is concentrated at the top.'
+        XPSystem.grant_xp(self.user.id, 120)
+
+        with patch('streaks.views.ai_assistant') as read_ai:
+            response = self.client.get(reverse('leaderboard-list'))
+            self.assertIsNone(response.data['ai_insights'])
+
+            snapshot = generate_leaderboard_snapshot()
+            response = self.client.get(reverse('leaderboard-list'))
+            self.assertEqual(response.data['ai_insights'], 'XP is concentrated at the top.')
+            self.assertEqual(response.data['insights_version'], snapshot.id)
+            response = self.client.get(reverse('leaderboard-detail', args=[self.leaderboard.id]))
+            self.assertEqual(response.data['insights_version'], snapshot.id)
+            read_ai.process_text.assert_not_called()
+
+        prompt = mock_ai.return_value.process_text.call_args[0][0]
+        self.assertIn('"max_xp": 120', prompt)
+        self.assertEqual(snapshot.summary['leaders'][0]['username'], 'testuser')
+        self.assertEqual(snapshot.summary['top_movers'][0]['previous_rank'], None)
+
+    def test_list_endpoints_are_scoped_and_paginated(self):
+        """Test that list endpoints only return the requesting user's rows"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        for i in range(3):
+            Badge.objects.create(user=other, title=f'Other {i}', description='')
+            Badge.objects.create(user=self.user, title=f'Mine {i}', description='')
+
+        for name in ('study-streak-list', 'achievement-list', 'xp-system-list', 'badge-list'):
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual({row['user'] for row in response.data['results']}, {self.user.id}, name)
+
+        response = self.client.get(reverse('badge-list'), {'page_size': 2})
+        self.assertEqual([b['title'] for b in response.data['results']], ['Mine 2', 'Mine 1'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([b['title'] for b in response.data['results']], ['Mine 0', 'Test Badge'])
+
     def test_update_streak_view(self):
         """Test Update Streak endpoint"""
         response = self.client.post(reverse('update-streak', args=[self.user.id]))
@@ -138,3 +273,301 @@ class StreaksViewsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('xp_system', response.data)
         self.assertIn('new_badges', response.data)
+
+
+class XPGrantConcurrencyTest(TransactionTestCase):
+    """Grants from parallel requests must all land; each thread gets its own connection."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='racer',
+            email='racer@example.com',
+            password='testpass123'
+        )
+
+    def grant(self, amount):
+        try:
+            while True:
+                try:
+                    XPSystem.grant_xp(self.user.id, amount)
+                    return
+                except OperationalError:
+                    # SQLite's shared-cache test database reports lock conflicts
+                    # instead of waiting; the failed grant was rolled back.
+                    time.sleep(0.001)
+        finally:
+            connection.close()
+
+    def test_parallel_grants_are_not_lost(self):
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(self.grant, [7] * 100))
+
+        xp_system = XPSystem.objects.get(user=self.user)
+        self.assertEqual(xp_system.total_xp, 700)
+        self.assertEqual(xp_system.level, xp_system.calculate_level())
+        self.assertEqual(Leaderboard.objects.get(user=self.user).total_xp, 700)
+
+    def test_grant_creates_missing_rows(self):
+        XPSystem.grant_xp(self.user.id, 150)
+
+        xp_system = XPSystem.objects.get(user=self.user)
+        self.assertEqual((xp_system.total_xp, xp_system.level), (150, 2))
+        self.assertEqual(Leaderboard.objects.get(user=self.user).total_xp, 150)
+        with self.assertRaises(ValueError):
+            XPSystem.grant_xp(self.user.id, -1)
+
+
+class XPLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ledger',
+            email='ledger@example.com',
+            password='testpass123'
+        )
+
+    def test_grants_are_ledgered_and_compacted(self):
+        XPSystem.grant_xp(self.user.id, 10, reason='quiz', source_id=1)
+        XPSystem.grant_xp(self.user.id, 20, reason='quiz', source_id=2)
+        XPSystem.grant_xp(self.user.id, 5, reason='streak')
+        XPSystem.grant_xp(self.user.id, 1)
+        self.assertEqual(XPEvent.objects.filter(user=self.user).count(), 4)
+
+        old = timezone.now() - timedelta(days=40)
+        XPEvent.objects.exclude(amount=1).update(created_at=old)
+        self.assertEqual(compact_xp_events(older_than_days=30), 3)
+
+        aggregates = {a.reason: (a.total_xp, a.event_count) for a in XPDailyAggregate.objects.filter(user=self.user)}
+        self.assertEqual(aggregates, {'quiz': (30, 2), 'streak': (5, 1)})
+        self.assertEqual(XPEvent.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(sum(xp_history(self.user.id, timezone.localdate(old)).values()), 36)
+        self.assertEqual(XPSystem.objects.get(user=self.user).total_xp, 36)
+
+        # A late event for an already compacted day is added to its aggregate
+        XPEvent.objects.create(user=self.user, amount=4, reason='quiz', created_at=old)
+        compact_xp_events(older_than_days=30)
+        self.assertEqual(XPDailyAggregate.objects.get(user=self.user, reason='quiz').total_xp, 34)
+
+
+class StreakReconciliationTest(TestCase):
+    def make_streak(self, name, last_study_date, tz='UTC', current=5):
+        user = User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+        return StudyStreak.objects.update_or_create(user=user, defaults={
+            'current_streak': current, 'longest_streak': current,
+            'last_study_date': last_study_date, 'timezone': tz,
+        })[0]
+
+    def test_broken_streaks_are_reset_per_time_zone(self):
+        # 23:30 UTC on March 10th is already March 11th in Tokyo
+        now = datetime(2026, 3, 10, 23, 30, tzinfo=dt_timezone.utc)
+        kept = self.make_streak('kept', date(2026, 3, 9))
+        broken = self.make_streak('broken', date(2026, 3, 8))
+        tokyo = self.make_streak('tokyo', date(2026, 3, 9), tz='Asia/Tokyo')
+        quiet = self.make_streak('quiet', date(2026, 3, 1))
+        NotificationPreference.objects.create(user=quiet.user, streak_notifications=False)
+        self.make_streak('already_reset', date(2026, 1, 1), current=0)
+
+        self.assertEqual(reconcile_streaks(now=now), 3)
+        self.assertEqual(reconcile_streaks(now=now), 0)
+
+        streaks = {s.user.username: s.current_streak for s in StudyStreak.objects.select_related('user')}
+        self.assertEqual(streaks, {'kept': 5, 'broken': 0, 'tokyo': 0, 'quiet': 0, 'already_reset': 0})
+        self.assertEqual(StudyStreak.objects.get(pk=broken.pk).longest_streak, 5)
+        notified = set(Notification.objects.filter(notification_type='streak').values_list('user__username', flat=True))
+        self.assertEqual(notified, {'broken', 'tokyo'})
+        self.assertEqual(kept.user.notifications.count(), 0)
+        self.assertEqual(tokyo.user.notifications.get().source_model, 'StudyStreak')
+
+
+class AchievementRuleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='achiever', email='achiever@example.com', password='testpass123')
+
+    def test_rules_award_once_and_cascade_through_xp(self):
+        StudyStreak.objects.update_or_create(user=self.user, defaults={'current_streak': 30, 'longest_streak': 30})
+        XPSystem.grant_xp(self.user.id, 30)
+
+        achievements, badges = evaluate_rules([self.user.id])
+        # Week Warrior + Monthly Master grant 370 XP, reaching level 5 for XP Master
+        self.assertEqual({a.rule.code for a in achievements}, {'week-warrior', 'monthly-master'})
+        self.assertEqual([b.title for b in badges], ['XP Master'])
+        self.assertEqual(XPSystem.objects.get(user=self.user).total_xp, 400)
+        self.assertEqual(self.user.notifications.filter(notification_type='achievement').count(), 3)
+
+        self.assertEqual(evaluate_rules([self.user.id]), ([], []))
+        self.assertEqual(Achievement.objects.filter(user=self.user).count(), 2)
+
+    def test_new_rule_is_evaluated_in_bulk(self):
+        others = [
+            User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+        for user in others[:2]:
+            XPSystem.grant_xp(user.id, 250)
+        rule = AchievementRule.objects.create(
+            code='xp-250', title='Quarter Grand', description='Earned 250 XP',
+            counter='total_xp', threshold=250,
+        )
+
+        self.assertEqual(user_counters([others[0].id])[others[0].id]['level'], 3)
+        # Users batch, savepoint, XP row lock, two held-award lookups, four
+        # counter queries, one insert, release and the final empty users batch
+        with self.assertNumQueries(12):
+            self.assertEqual(evaluate_all_users(rules=[rule], notify=False), 2)
+        self.assertEqual(
+            set(rule.achievements.values_list('user__username', flat=True)), {'u0', 'u1'}
+        )
+        self.assertEqual(evaluate_all_users(rules=[rule], notify=False), 0)
+
+
+    def test_legacy_awards_are_linked_to_rules(self):
+        link_legacy_awards = import_module('streaks.migrations.0013_link_legacy_awards').link_legacy_awards
+
+        first = Achievement.objects.create(user=self.user, title='Quiz Master', description='Passed Algebra', points=50)
+        Achievement.objects.create(user=self.user, title='Quiz Master', description='Passed Biology', points=50)
+        Badge.objects.create(user=self.user, title='XP Master', description='Reached level 5')
+        link_legacy_awards(apps, None)
+
+        first.refresh_from_db()
+        self.assertEqual(first.rule.code, 'quiz-master')
+        self.assertEqual(Achievement.objects.filter(user=self.user, rule__isnull=True).count(), 1)
+        self.assertEqual(Badge.objects.get(user=self.user).rule.code, 'xp-master')
+
+        QuizAttempt.objects.create(
+            quiz=Quiz.objects.create(course=Course.objects.create(title='C', description='', instructor=self.user), title='Q'),
+            user=self.user, status='completed', score=90,
+        )
+        XPSystem.grant_xp(self.user.id, 1000)
+        achievements, badges = evaluate_rules([self.user.id], notify=False)
+        self.assertNotIn('quiz-master', {a.rule.code for a in achievements})
+        self.assertEqual(badges, [])
+
+    def test_concurrently_awarded_rules_are_not_paid_twice(self):
+        XPSystem.grant_xp(self.user.id, 250)
+        rule = AchievementRule.objects.create(
+            code='xp-250', title='Quarter Grand', description='Earned 250 XP',
+            counter='total_xp', threshold=250, points=25,
+        )
+        real_counters = user_counters
+
+        def counters_then_race(user_ids):
+            # An award slipping in past the XP row locks after the held lookup
+            Achievement.objects.create(user=self.user, rule=rule, title=rule.title, points=rule.points)
+            return real_counters(user_ids)
+
+        # fails the whole batch rather than being paid out twice
+        with patch('streaks.rules.user_counters', side_effect=counters_then_race):
+            with self.assertRaises(IntegrityError):
+                evaluate_rules([self.user.id], rules=[rule], notify=False)
+        self.assertEqual(XPSystem.objects.get(user=self.user).total_xp, 250)
+        self.assertEqual(rule.achievements.count(), 0)
+
+        # Held awards are skipped, so the next evaluation pays it exactly once
+        evaluate_rules([self.user.id], rules=[rule], notify=False)
+        evaluate_rules([self.user.id], rules=[rule], notify=False)
+        self.assertEqual(XPSystem.objects.get(user=self.user).total_xp, 275)
+        self.assertEqual(rule.achievements.count(), 1)
+
+
+class StudyActivityTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='calendar', email='calendar@example.com', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+    def test_streaks_from_activity_bitmap(self):
+        streak = StudyStreak.objects.get(user=self.user)
+        # A run across New Year, a gap, then three days
+        for day in [date(2025, 12, 30), date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2),
+                    date(2026, 1, 10), date(2026, 1, 11)]:
+            streak.update_streak(day)
+        streak.update_streak(date(2026, 1, 11))  # Same day again is a no-op
+        streak.update_streak(date(2026, 1, 9))   # Late entry extends the current run
+
+        streak.refresh_from_db()
+        self.assertEqual(
+            (streak.current_streak, streak.longest_streak, streak.total_study_days, streak.last_study_date),
+            (3, 4, 7, date(2026, 1, 11))
+        )
+        self.assertEqual(activity_stats(self.user.id, today=date(2026, 1, 12))['current_streak'], 3)
+        self.assertEqual(activity_stats(self.user.id, today=date(2026, 1, 13))['current_streak'], 0)
+        self.assertFalse(record_study_day(self.user.id, date(2026, 1, 9)))
+        self.assertEqual(longest_run(0b1110111101), 4)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('study-activity'), {'year': 2026})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['days'], ['2026-01-01', '2026-01-02', '2026-01-09', '2026-01-10', '2026-01-11'])
+        self.assertEqual((response.data['total_days'], response.data['longest_streak']), (5, 3))
+        self.assertEqual(self.client.get(reverse('study-activity'), {'year': 2024}).data['days'], [])
+
+    def test_streaks_from_before_the_bitmap_continue(self):
+        seed_activity = import_module('streaks.migrations.0014_seed_activity_from_streaks').seed_activity
+        streak, _ = StudyStreak.objects.update_or_create(user=self.user, defaults={
+            'current_streak': 10, 'longest_streak': 12, 'total_study_days': 40,
+            'last_study_date': date(2026, 1, 9),
+        })
+        seed_activity(apps, None)
+        self.assertEqual(activity_stats(self.user.id, today=date(2026, 1, 9))['current_streak'], 10)
+
+        streak.refresh_from_db()
+        streak.update_streak(date(2026, 1, 10))
+        self.assertEqual((streak.current_streak, streak.longest_streak, streak.total_study_days), (11, 12, 41))
+
+    def test_activity_defaults_to_local_date(self):
+        StudyStreak.objects.filter(user=self.user).update(timezone='Pacific/Kiritimati')  # UTC+14
+        with patch('streaks.activity.timezone.now', return_value=datetime(2026, 1, 9, 12, tzinfo=dt_timezone.utc)):
+            self.assertEqual(user_today(self.user.id), date(2026, 1, 10))
+
+        # Already New Year's Day in Kiritimati while it is still 2025 in UTC
+        with patch('streaks.activity.timezone.now', return_value=datetime(2025, 12, 31, 12, tzinfo=dt_timezone.utc)):
+            self.assertEqual(self.client.get(reverse('study-activity')).data['year'], 2026)
+
+
+class GamificationOutboxTest(TestCase):
+    def make_user(self, name):
+        return User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+
+    def test_signals_enqueue_and_worker_applies_in_batches(self):
+        user = self.make_user('learner')
+        # Signup creates the user's rows directly; nothing is queued for it
+        self.assertFalse(GamificationEvent.objects.exists())
+        self.assertEqual(XPSystem.objects.get(user=user).total_xp, 0)
+        self.assertTrue(Leaderboard.objects.filter(user=user).exists())
+
+        course = Course.objects.create(title='Biology', instructor=user)
+        quiz = Quiz.objects.create(course=course, title='Cells', description='Cells quiz')
+        attempt = QuizAttempt.objects.create(quiz=quiz, user=user, score=80, status='completed')
+        attempt.save()  # Saving a completed attempt again isn't a second completion
+        Enrollment.objects.create(student=user, course=course, status='completed', completed_at=timezone.now())
+        streak = StudyStreak.objects.get(user=user)
+        streak.save()  # Unchanged streak: no event
+        streak.current_streak = streak.longest_streak = 7
+        streak.save()
+        self.assertEqual(
+            list(GamificationEvent.objects.values_list('kind', flat=True)),
+            ['quiz_completed', 'course_completed', 'streak_changed']
+        )
+        self.assertEqual(XPSystem.objects.get(user=user).total_xp, 0)
+
+        self.assertEqual(drain_gamification_events(), 3)
+        # 80 (quiz) + 100 (course) + 50 Quiz Master + 100 Course Champion + 70 Week Warrior
+        self.assertEqual(XPSystem.objects.get(user=user).total_xp, 400)
+        self.assertEqual(Leaderboard.objects.get(user=user).total_xp, 400)
+        self.assertEqual(StudyStreak.objects.filter(user=user).count(), 1)
+        self.assertEqual(
+            set(Achievement.objects.filter(user=user).values_list('rule__code', flat=True)),
+            {'quiz-master', 'course-champion', 'week-warrior'}
+        )
+        self.assertEqual(XPPeriodTotal.objects.get(user=user, period='week', course=course).total_xp, 180)
+        self.assertEqual(drain_gamification_events(), 0)
+
+    def test_batch_query_count_does_not_grow_with_users(self):
+        def queries_for(count):
+            course = Course.objects.create(title='Batch', instructor=self.make_user(f'teacher{count}'))
+            quiz = Quiz.objects.create(course=course, title='Quiz', description='')
+            for i in range(count):
+                QuizAttempt.objects.create(quiz=quiz, user=self.make_user(f'b{count}_{i}'), score=10, status='completed')
+            with CaptureQueriesContext(connection) as queries:
+                drain_gamification_events()
+            return len(queries)
+
+        self.assertEqual(queries_for(3), queries_for(9))
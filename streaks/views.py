@@ -1,4 +1,5 @@
 from datetime import date
+from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from rest_framework import generics, status
 from rest_framework.response import Response
@@ -7,12 +8,20 @@ from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import StudyStreak, Achievement, XPSystem, Badge, Leaderboard
+from .activity import user_today, year_heatmap
+from .insights import latest_insights
+from .pagination import AwardCursorPagination, StreakCursorPagination, XPSystemCursorPagination
+from .ranking import rank_index, windowed_leaderboard
+from .rules import evaluate_rules
 from .serializers import (
     StudyStreakSerializer, AchievementSerializer, XPSystemSerializer,
     BadgeSerializer, LeaderboardSerializer
 )
+from studypal.conditional import ConditionalGetMixin
 from study_assistant.ai_service import TaeAI  
 
+User = get_user_model()
+
 # Initialize AI assistant for generating insights
 ai_assistant = TaeAI()
 
@@ -24,15 +33,18 @@ class StudyStreakListCreateView(generics.ListCreateAPIView):
     API endpoint for listing and creating study streaks.
     
     Provides functionality to:
-    - List all study streaks for the authenticated user
+    - List the authenticated user's study streaks, cursor-paginated
     - Create a new study streak with AI-powered insights
     
     Authentication:
         Requires user to be authenticated.
     """
     permission_classes = [IsAuthenticated]
-    queryset = StudyStreak.objects.all()
     serializer_class = StudyStreakSerializer
+    pagination_class = StreakCursorPagination
+
+    def get_queryset(self):
+        return StudyStreak.objects.filter(user=self.request.user).select_related('user')
 
     # @swagger_auto_schema(
     #     operation_description="List all study streaks for the authenticated user",
@@ -141,15 +153,18 @@ class AchievementListCreateView(generics.ListCreateAPIView):
     API endpoint for listing and creating achievements.
     
     Provides functionality to:
-    - List all achievements for the authenticated user
+    - List the authenticated user's achievements, cursor-paginated
     - Create a new achievement with AI-powered insights
     
     Authentication:
         Requires user to be authenticated.
     """
     permission_classes = [IsAuthenticated]
-    queryset = Achievement.objects.all()
     serializer_class = AchievementSerializer
+    pagination_class = AwardCursorPagination
+
+    def get_queryset(self):
+        return Achievement.objects.filter(user=self.request.user).select_related('user')
 
     # @swagger_auto_schema(
     #     operation_description="List all achievements for the authenticated user",
@@ -296,15 +311,18 @@ class XPSystemListCreateView(generics.ListCreateAPIView):
     API endpoint for listing and creating XP systems.
     
     Provides functionality to:
-    - List all XP systems for the authenticated user
+    - List the authenticated user's XP system, cursor-paginated
     - Create a new XP system with AI-powered insights
     
     Authentication:
         Requires user to be authenticated.
     """
     permission_classes = [IsAuthenticated]
-    queryset = XPSystem.objects.all()
     serializer_class = XPSystemSerializer
+    pagination_class = XPSystemCursorPagination
+
+    def get_queryset(self):
+        return XPSystem.objects.filter(user=self.request.user).select_related('user')
 
     # @swagger_auto_schema(
     #     operation_description="List all XP systems for the authenticated user",
@@ -408,20 +426,29 @@ class XPSystemDetailView(generics.RetrieveUpdateDestroyAPIView):
         xp_system.save()
 
 ## 📌 Leaderboard Views
-class LeaderboardListView(generics.ListAPIView):
+class LeaderboardListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API endpoint for listing leaderboard entries with AI insights.
     
     Provides functionality to:
-    - List all leaderboard entries
-    - Include AI-generated insights about user performance
+    - List a page of leaderboard entries with their ranks, served from the
+      in-memory rank index rather than sorting the table
+    - Include the latest stored AI insights and their snapshot version
+    - Answer 304 Not Modified when the requested page of the rank index and
+      the insights version are unchanged, without touching the database
     
     Authentication:
         Requires user to be authenticated.
+        
+    Query Parameters:
+        offset (int): Position of the first entry, default 0
+        limit (int): Entries per page, default 20, at most 100
     """
     permission_classes = [IsAuthenticated]
-    queryset = Leaderboard.objects.all()
+    queryset = Leaderboard.objects.select_related('user')
     serializer_class = LeaderboardSerializer
+    default_limit = 20
+    max_limit = 100
 
     # @swagger_auto_schema(
     #     operation_description="List all leaderboard entries with AI insights",
@@ -439,27 +466,116 @@ class LeaderboardListView(generics.ListAPIView):
     #         401: "Unauthorized"
     #     }
     # )
+    def get_window(self):
+        offset = max(int(self.request.query_params.get('offset', 0)), 0)
+        limit = min(max(int(self.request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        return offset, limit
+
+    def get_validators(self):
+        try:
+            offset, limit = self.get_window()
+        except ValueError:
+            return None, None
+        index = rank_index.get()
+        page = index.entries(offset, offset + limit)
+        return (offset, limit, len(index), page, latest_insights()['insights_version']), None
+
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        
-        # Get AI insights
-        insights = ai_assistant.process_text(
-            "Analyze leaderboard trends and provide insights on user performance"
-        )
+        try:
+            offset, limit = self.get_window()
+        except ValueError:
+            return Response({"error": "offset and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        index = rank_index.get()
+        page = index.entries(offset, offset + limit)
+        rows = self.get_queryset().in_bulk([user_id for _, user_id, _ in page], field_name='user_id')
+        entries = []
+        for rank, user_id, _ in page:
+            if user_id in rows:
+                rows[user_id].rank = rank
+                entries.append(rows[user_id])
+        serializer = self.get_serializer(entries, many=True)
         
+        # AI insights are generated on a schedule from a standings summary
         return Response({
+            'count': len(index),
+            'offset': offset,
+            'limit': limit,
             'leaderboard': serializer.data,
-            'ai_insights': insights
+            **latest_insights()
         })
 
+class LeaderboardMeView(APIView):
+    """
+    API endpoint for the authenticated user's leaderboard standing.
+    
+    Returns rank, percentile and the users directly above and below, all
+    found by binary search over the rank index.
+    
+    Authentication:
+        Requires user to be authenticated.
+        
+    Query Parameters:
+        neighbors (int): Users to include on each side, default 2, at most 10
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            neighbors = min(max(int(request.query_params.get('neighbors', 2)), 0), 10)
+        except ValueError:
+            return Response({"error": "neighbors must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        index = rank_index.get()
+        if request.user.id not in index:
+            return Response({"error": "Leaderboard entry not found"}, status=status.HTTP_404_NOT_FOUND)
+        standing = index.standing(request.user.id, neighbors=neighbors)
+
+        user_ids = [user_id for _, user_id, _ in standing['above'] + standing['below']]
+        usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+        for side in ('above', 'below'):
+            standing[side] = [
+                {'rank': rank, 'user': user_id, 'username': usernames.get(user_id), 'total_xp': xp}
+                for rank, user_id, xp in standing[side]
+            ]
+        return Response({'user': request.user.id, 'username': request.user.username, **standing})
+
+class WindowedLeaderboardView(APIView):
+    """
+    API endpoint for weekly or monthly leaderboards, overall or per course.
+    
+    Standings come from per-period XP totals updated as XP is granted and
+    are cached briefly, so requests never aggregate raw XP events.
+    
+    Authentication:
+        Requires user to be authenticated.
+        
+    Query Parameters:
+        course (int): Restrict to XP earned in this course
+        offset (int): Position of the first entry, default 0
+        limit (int): Entries per page, default 20, at most 100
+    """
+    permission_classes = [IsAuthenticated]
+    period = 'week'
+
+    def get(self, request):
+        try:
+            course_id = int(request.query_params['course']) if request.query_params.get('course') else None
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "course, offset and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        board = windowed_leaderboard(self.period, course_id=course_id, offset=offset, limit=limit)
+        return Response({**board, 'offset': offset, 'limit': limit})
+
 class LeaderboardDetailView(generics.RetrieveAPIView):
     """
     API endpoint for retrieving a specific leaderboard entry with AI insights.
     
     Provides functionality to:
     - Retrieve a specific leaderboard entry
-    - Include AI-generated insights about the user's performance
+    - Include the latest stored AI insights and their snapshot version
     
     Authentication:
         Requires user to be authenticated.
@@ -489,14 +605,10 @@ class LeaderboardDetailView(generics.RetrieveAPIView):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         
-        # Get AI insights
-        insights = ai_assistant.process_text(
-            "Analyze leaderboard trends and provide insights on user performance"
-        )
-        
+        # AI insights are generated on a schedule from a standings summary
         return Response({
             'leaderboard': serializer.data,
-            'ai_insights': insights
+            **latest_insights()
         })
 
 ## 📌 Badge Views
@@ -505,15 +617,18 @@ class BadgeListCreateView(generics.ListCreateAPIView):
     API endpoint for listing and creating badges.
     
     Provides functionality to:
-    - List all badges for the authenticated user
+    - List the authenticated user's badges, cursor-paginated
     - Create a new badge
     
     Authentication:
         Requires user to be authenticated.
     """
     permission_classes = [IsAuthenticated]
-    queryset = Badge.objects.all()
     serializer_class = BadgeSerializer
+    pagination_class = AwardCursorPagination
+
+    def get_queryset(self):
+        return Badge.objects.filter(user=self.request.user).select_related('user')
 
     # @swagger_auto_schema(
     #     operation_description="List all badges for the authenticated user",
@@ -577,8 +692,8 @@ class UpdateStreakView(APIView):
     API endpoint for updating a user's study streak.
     
     Provides functionality to:
-    - Increment the current streak
-    - Update the longest streak if applicable
+    - Record today as a study day in the user's activity calendar
+    - Recount the current and longest streak from that calendar
     - Generate AI insights about the streak
     
     Authentication:
@@ -603,21 +718,44 @@ class UpdateStreakView(APIView):
     def post(self, request, user_id):
         try:
             streak = StudyStreak.objects.get(user_id=user_id)
-            streak.current_streak += 1
-            streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+            streak.update_streak()
             
             # Generate AI insights
             insights = ai_assistant.process_text(
                 f"Analyze study streak:\nCurrent Streak: {streak.current_streak}\nLongest Streak: {streak.longest_streak}"
             )
             streak.ai_insights = insights
-            streak.save()
             
             serializer = StudyStreakSerializer(streak)
             return Response(serializer.data)
         except StudyStreak.DoesNotExist:
             return Response({"error": "Streak not found"}, status=status.HTTP_404_NOT_FOUND)
 
+class StudyActivityView(APIView):
+    """
+    API endpoint for the authenticated user's study calendar heatmap.
+    
+    Reads a single activity bitmap row for the year and returns the studied
+    dates with the year's totals.
+    
+    Authentication:
+        Requires user to be authenticated.
+        
+    Query Parameters:
+        year (int): Calendar year, default the current year in the user's time zone
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        year = request.query_params.get('year')
+        try:
+            year = int(year) if year is not None else user_today(request.user.id).year
+        except ValueError:
+            return Response({"error": "year must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= year <= 9999:
+            return Response({"error": "year is out of range"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(year_heatmap(request.user.id, year))
+
 class AddXPView(APIView):
     """
     API endpoint for adding XP to a user's XP system.
@@ -666,27 +804,25 @@ class AddXPView(APIView):
     def post(self, request, user_id):
         try:
             xp_system = XPSystem.objects.get(user_id=user_id)
-            amount = request.data.get('amount', 0)
+            try:
+                amount = int(request.data.get('amount', 0))
+            except (TypeError, ValueError):
+                return Response({"error": "amount must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            if amount < 0:
+                return Response({"error": "XP amount cannot be negative"}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Add XP and update level
-            xp_system.current_xp += amount
-            xp_system.level = xp_system.current_xp // 1000  # Level up every 1000 XP
+            # Add XP and update level atomically; the row is never written back
+            # from this stale copy, so concurrent grants aren't lost
+            xp_system.add_xp(amount)
             
             # Generate AI insights
             insights = ai_assistant.process_text(
-                f"Analyze XP system:\nCurrent XP: {xp_system.current_xp}\nLevel: {xp_system.level}"
+                f"Analyze XP system:\nCurrent XP: {xp_system.total_xp}\nLevel: {xp_system.level}"
             )
             xp_system.ai_insights = insights
-            xp_system.save()
             
             # Check for new badges
-            new_badges = []
-            if xp_system.level >= 5 and not Badge.objects.filter(user_id=user_id, title="XP Master").exists():
-                new_badges.append(Badge.objects.create(
-                    user_id=user_id,
-                    title="XP Master",
-                    description="Reached level 5"
-                ))
+            _, new_badges = evaluate_rules([xp_system.user_id])
             
             serializer = XPSystemSerializer(xp_system)
             badge_serializer = BadgeSerializer(new_badges, many=True)
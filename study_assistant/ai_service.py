@@ -1,4 +1,5 @@
 import os
+import json
 from google import genai
 from google.genai.types import GenerateContentConfig
 from docx import Document
@@ -59,6 +60,22 @@ class TaeAI:
         except Exception as e:
             return f"Error: {str(e)}"
 
+    def generate_json(self, query: str, max_output_tokens: int = 4000):
+        """
+        Handles AI queries that must return structured data.
+        Raises on API errors or invalid JSON so callers can retry or record the failure.
+        """
+        response = self.client.models.generate_content(
+            model='gemini-2.0-flash',
+            contents=query,
+            config=GenerateContentConfig(
+                response_mime_type='application/json',
+                max_output_tokens=max_output_tokens,
+                temperature=0.2,
+            ),
+        )
+        return json.loads(response.text)
+
     def process_file(self, uploaded_file) -> str:
         """Handles document processing and AI-based summarization."""
         try:
@@ -0,0 +1,42 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified support for read-heavy views.
+
+    Subclasses implement ``get_validators`` with a cheap lookup of version
+    columns (``updated_at`` maxima, row counts, in-memory state). When the
+    client's copy is still current the view answers 304 Not Modified before
+    any object is loaded or serialized.
+    """
+
+    def get_validators(self):
+        """
+        Returns:
+            tuple: (ETag source, last modified datetime). The source is any
+            value with a stable repr; either part may be None, and
+            (None, None) skips conditional handling, e.g. for a missing object.
+        """
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        source, modified = self.get_validators()
+        etag = quote_etag(hashlib.md5(repr(source).encode()).hexdigest()) if source is not None else None
+        last_modified = int(modified.timestamp()) if modified is not None else None
+        if etag or last_modified:
+            conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if conditional is not None:
+                return conditional
+
+        response = super().get(request, *args, **kwargs)
+        if 200 <= response.status_code < 300:
+            if etag:
+                response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Per-user data: clients may keep it but must revalidate
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import StudySession, Exam
+from .models import StudySession, StudySessionSeries, StudySessionException, Exam
 # Register your models here.
 admin.site.register(StudySession)
-admin.site.register(Exam)
\ No newline at end of file
+admin.site.register(StudySessionSeries)
+admin.site.register(StudySessionException)
+admin.site.register(Exam)
@@ -0,0 +1,246 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from django.db.models import Count, Max, Min, Prefetch, Q
+from django.utils import timezone
+from .models import Exam, StudySession, StudySessionException, StudySessionSeries
+from .recurrence import first_occurrence
+
+PRODID = '-//StudyPal//Timetable//EN'
+UID_DOMAIN = 'studypal'
+CHUNK_SIZE = 500
+BYDAY = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+BUFFER_SIZE = 16 * 1024
+# VTIMEZONEs list every offset change in the years a zone's series cover, and
+# this many years ahead for series without an end
+VTIMEZONE_YEARS = 10
+
+
+def escape(text):
+    """Escape a TEXT value (RFC 5545 section 3.3.11)."""
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line at 75 octets, continuation lines starting with a space."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # Don't split a UTF-8 sequence
+        parts.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def utc_stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def local_stamp(value, tzinfo):
+    """A DATE-TIME in ``tzinfo``'s wall-clock time, for use with a TZID parameter."""
+    return value.astimezone(tzinfo).strftime('%Y%m%dT%H%M%S')
+
+
+def utc_offset(delta):
+    """A UTC-OFFSET value (RFC 5545 section 3.3.14)."""
+    seconds = int(delta.total_seconds())
+    sign = '-' if seconds < 0 else '+'
+    hours, rest = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f'{sign}{hours:02}{minutes:02}' + (f'{seconds:02}' if seconds else '')
+
+
+def _transitions(tzinfo, start, end):
+    """
+    Yield (instant, offset before, local time after) for each UTC offset
+    change of ``tzinfo`` in [start, end): the offset is checked daily and a
+    change bisected to the second.
+    """
+    day, second = timedelta(days=1), timedelta(seconds=1)
+    moment, before = start, start.astimezone(tzinfo).utcoffset()
+    while moment < end:
+        following = moment + day
+        offset = following.astimezone(tzinfo).utcoffset()
+        if offset != before:
+            low, high = moment, following
+            while high - low > second:
+                middle = low + timedelta(seconds=(high - low).total_seconds() // 2)
+                if middle.astimezone(tzinfo).utcoffset() == before:
+                    low = middle
+                else:
+                    high = middle
+            yield high, before, high.astimezone(tzinfo)
+            before = offset
+        moment = following
+
+
+@lru_cache(maxsize=64)
+def vtimezone(name, first_year, last_year):
+    """
+    The VTIMEZONE component of an IANA zone with one observance per offset
+    change from ``first_year`` through ``last_year``, so clients that don't
+    know the TZID still place every occurrence in that range correctly.
+    """
+    tzinfo = ZoneInfo(name)
+    start = datetime(first_year, 1, 1, tzinfo=dt_timezone.utc) - timedelta(days=1)
+    end = datetime(last_year + 1, 1, 1, tzinfo=dt_timezone.utc) + timedelta(days=1)
+    initial = start.astimezone(tzinfo)
+    observances = [(initial, initial.utcoffset(), initial)] + [
+        (instant + before, before, local) for instant, before, local in _transitions(tzinfo, start, end)
+    ]
+    lines = ['BEGIN:VTIMEZONE\r\n', fold(f'TZID:{name}')]
+    for onset, before, local in observances:
+        kind = 'DAYLIGHT' if local.dst() else 'STANDARD'
+        lines += [
+            f'BEGIN:{kind}\r\n',
+            # The onset is wall-clock time in the offset being left
+            f'DTSTART:{onset:%Y%m%dT%H%M%S}\r\n',
+            f'TZOFFSETFROM:{utc_offset(before)}\r\n',
+            f'TZOFFSETTO:{utc_offset(local.utcoffset())}\r\n',
+            fold(f'TZNAME:{escape(local.tzname())}'),
+            f'END:{kind}\r\n',
+        ]
+    lines.append('END:VTIMEZONE\r\n')
+    return ''.join(lines)
+
+
+def _vtimezones(user):
+    """A VTIMEZONE for each zone the user's series use as TZID; one query."""
+    this_year = timezone.now().year
+    zones = (
+        StudySessionSeries.objects.filter(user=user).values('timezone')
+        .annotate(first=Min('start_date'), last=Max('until'), open=Count('id', filter=Q(until__isnull=True)))
+        .order_by('timezone')
+    )
+    for zone in zones:
+        last_year = zone['last'].year if zone['last'] else this_year
+        if zone['open']:
+            last_year = max(last_year, this_year + VTIMEZONE_YEARS)
+        yield vtimezone(zone['timezone'], zone['first'].year, last_year)
+
+
+def _event(uid, stamp, start, end, summary, properties=(), **extra):
+    yield 'BEGIN:VEVENT\r\n'
+    yield fold(f'UID:{uid}@{UID_DOMAIN}')
+    yield f'DTSTAMP:{utc_stamp(stamp)}\r\n'
+    yield f'{start}\r\n'
+    yield f'{end}\r\n'
+    for line in properties:
+        yield fold(line)
+    yield fold(f'SUMMARY:{escape(summary)}')
+    for name, value in extra.items():
+        if value:
+            yield fold(f'{name.upper()}:{escape(value)}')
+    yield 'END:VEVENT\r\n'
+
+
+def calendar_lines(user, name='StudyPal'):
+    """
+    Yield the user's study sessions and exams as an iCalendar document, a
+    line at a time. Rows are read with chunked iterators, so memory use
+    doesn't grow with the number of events; a recurring series is a single
+    RRULE event rather than one per occurrence. The zones series use as
+    TZID are defined up front.
+    """
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield f'PRODID:{PRODID}\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield fold(f'X-WR-CALNAME:{escape(name)}')
+    yield from _vtimezones(user)
+
+    sessions = (
+        StudySession.objects.filter(user=user).order_by('start_time', 'id')
+        .values_list('id', 'updated_at', 'subject', 'start_time', 'end_time')
+    )
+    for pk, updated_at, subject, start_time, end_time in sessions.iterator(chunk_size=CHUNK_SIZE):
+        yield from _event(
+            f'session-{pk}', updated_at,
+            f'DTSTART:{utc_stamp(start_time)}', f'DTEND:{utc_stamp(end_time)}',
+            f'Study: {subject}', categories='Study session',
+        )
+
+    yield from _series_events(user)
+
+    exams = (
+        Exam.objects.filter(user=user).order_by('exam_date', 'id')
+        .values_list('id', 'updated_at', 'course_name', 'exam_date', 'location', 'notes')
+    )
+    for pk, updated_at, course_name, exam_date, location, notes in exams.iterator(chunk_size=CHUNK_SIZE):
+        yield from _event(
+            f'exam-{pk}', updated_at,
+            f'DTSTART;VALUE=DATE:{exam_date:%Y%m%d}', f'DTEND;VALUE=DATE:{exam_date + timedelta(days=1):%Y%m%d}',
+            f'Exam: {course_name}', categories='Exam', location=location, description=notes,
+        )
+
+    yield 'END:VCALENDAR\r\n'
+
+
+def rrule(series, tzinfo):
+    """The RRULE value of a series; UNTIL is the end of its last day, in UTC as RFC 5545 requires."""
+    weekdays = sorted(set(series.weekdays)) or [series.start_date.weekday()]
+    rule = f'FREQ=WEEKLY;INTERVAL={series.interval};BYDAY={",".join(BYDAY[day] for day in weekdays)}'
+    if series.until:
+        rule += f';UNTIL={utc_stamp(datetime.combine(series.until, time.max, tzinfo))}'
+    return rule
+
+
+def _series_events(user):
+    """
+    One recurring event per series: cancelled occurrences become EXDATEs
+    and moved ones separate events with a RECURRENCE-ID. Times use the
+    series' IANA zone as TZID so occurrences keep their wall-clock time
+    across daylight saving changes. DTSTART is the first real occurrence,
+    as RFC 5545 counts DTSTART itself as one; a series whose ``until``
+    comes before any occurrence is left out.
+    """
+    series_list = (
+        StudySessionSeries.objects.filter(user=user).order_by('start_date', 'id')
+        .prefetch_related(Prefetch('exceptions', queryset=StudySessionException.objects.order_by('original_start')))
+    )
+    for series in series_list.iterator(chunk_size=CHUNK_SIZE):
+        first = first_occurrence(series)
+        if first is None:
+            continue
+        tzinfo = ZoneInfo(series.timezone)
+        tzid = f'TZID={series.timezone}'
+        start = datetime.combine(first, series.start_time, tzinfo)
+        exceptions = list(series.exceptions.all())
+        properties = [f'RRULE:{rrule(series, tzinfo)}'] + [
+            f'EXDATE;{tzid}:{local_stamp(exception.original_start, tzinfo)}'
+            for exception in exceptions if exception.is_cancelled
+        ]
+        yield from _event(
+            f'series-{series.id}', series.updated_at,
+            f'DTSTART;{tzid}:{local_stamp(start, tzinfo)}', f'DURATION:PT{series.duration}M',
+            f'Study: {series.subject}', properties, categories='Study session',
+        )
+        for exception in exceptions:
+            if not exception.is_cancelled:
+                yield from _event(
+                    f'series-{series.id}', exception.updated_at,
+                    f'DTSTART:{utc_stamp(exception.start_time)}', f'DTEND:{utc_stamp(exception.end_time)}',
+                    f'Study: {series.subject}',
+                    [f'RECURRENCE-ID;{tzid}:{local_stamp(exception.original_start, tzinfo)}'],
+                    categories='Study session',
+                )
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Join lines into chunks of about ``size`` characters for streaming."""
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield ''.join(chunk)
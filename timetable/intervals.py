@@ -0,0 +1,62 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+
+class IntervalSet:
+    """
+    Sorted, non-overlapping [start, end) intervals built from arbitrary ones
+    in O(n log n). Touching or overlapping inputs are merged, so overlap
+    tests are a binary search and gaps fall out of a single pass.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts, self.ends = [], []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def overlaps(self, start, end):
+        """Whether [start, end) intersects any interval."""
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and self.ends[i] > start:
+            return True
+        return i + 1 < len(self.starts) and self.starts[i + 1] < end
+
+    def gaps(self, start, end, min_length=None):
+        """Yield the (start, end) stretches of [start, end) not covered, at least ``min_length`` long."""
+        cursor = start
+        for i in range(bisect_left(self.ends, start), len(self.starts)):
+            if self.starts[i] >= end:
+                break
+            if self.starts[i] > cursor and (min_length is None or self.starts[i] - cursor >= min_length):
+                yield cursor, self.starts[i]
+            cursor = max(cursor, self.ends[i])
+        if end > cursor and (min_length is None or end - cursor >= min_length):
+            yield cursor, end
+
+
+def free_slots_between(busy, start, end, day_start, day_end, tzinfo, min_length=None):
+    """
+    Free stretches between ``start`` and ``end`` that fall within the daily
+    [day_start, day_end) hours and don't overlap ``busy`` intervals; one
+    sort of the busy intervals plus a linear pass.
+    """
+    taken = IntervalSet(busy)
+    day = start.astimezone(tzinfo).date()
+    while datetime.combine(day, day_start, tzinfo) < end:
+        opens = max(datetime.combine(day, day_start, tzinfo), start)
+        closes = min(datetime.combine(day, day_end, tzinfo), end)
+        if opens < closes:
+            yield from taken.gaps(opens, closes, min_length)
+        day += timedelta(days=1)
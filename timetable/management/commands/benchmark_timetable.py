@@ -0,0 +1,40 @@
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from django.core.management.base import BaseCommand
+from timetable.scheduler import PLAN_DAYS, build_week_plan
+
+
+class Command(BaseCommand):
+    help = "Measure the local timetable scheduler on a synthetic week of subjects, exams and sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subjects', type=int, default=50)
+        parser.add_argument('--exams', type=int, default=20)
+        parser.add_argument('--sessions', type=int, default=30, help="Existing sessions in the week")
+        parser.add_argument('--hours', type=float, default=6)
+        parser.add_argument('--runs', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = date(2026, 1, 5)
+        subjects = [f"Subject {i}" for i in range(options['subjects'])]
+        exams = [(subject, start + timedelta(days=rng.randint(1, 30))) for subject in rng.sample(subjects, options['exams'])]
+        busy = []
+        for _ in range(options['sessions']):
+            begin = datetime.combine(start + timedelta(days=rng.randrange(PLAN_DAYS)), datetime.min.time(), timezone.utc)
+            begin += timedelta(minutes=30 * rng.randint(18, 40))
+            busy.append((begin, begin + timedelta(minutes=30 * rng.randint(1, 4))))
+        priorities = rng.sample(subjects, 5)
+
+        started = time.perf_counter()
+        for _ in range(options['runs']):
+            plan = build_week_plan(
+                start, options['hours'], subjects, exams=exams, busy=busy, priorities=priorities, tzinfo=timezone.utc
+            )
+        elapsed = (time.perf_counter() - started) / options['runs']
+        self.stdout.write(
+            f"{options['subjects']} subjects, {options['exams']} exams, {options['sessions']} sessions: "
+            f"{len(plan)} blocks in {elapsed * 1000:,.2f} ms per plan"
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['user', 'start_time', 'end_time'], name='session_user_interval_idx'),
+        ),
+    ]
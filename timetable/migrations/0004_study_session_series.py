@@ -0,0 +1,65 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0003_calendarfeed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudySessionSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('timezone', models.CharField(default='UTC', max_length=50)),
+                ('start_date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('duration', models.PositiveIntegerField(help_text='Duration in minutes')),
+                ('weekdays', models.JSONField(blank=True, default=list, help_text="Days of the week, 0 is Monday; empty repeats on start_date's weekday")),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every this many weeks')),
+                ('until', models.DateField(blank=True, help_text='Last day an occurrence may fall on', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='study_session_series', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'study session series',
+                'ordering': ['start_date', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudySessionException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField()),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='timetable.studysessionseries')),
+            ],
+            options={
+                'ordering': ['original_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='studysessionseries',
+            index=models.Index(fields=['user', 'start_date', 'until'], name='series_user_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studysessionexception',
+            index=models.Index(fields=['series', 'start_time', 'end_time'], name='exception_moved_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studysessionexception',
+            constraint=models.UniqueConstraint(fields=('series', 'original_start'), name='unique_series_occurrence'),
+        ),
+    ]
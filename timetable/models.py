@@ -1,3 +1,4 @@
+import secrets
 from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
@@ -15,12 +16,22 @@ class StudySession(models.Model):
 
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['user', 'start_time', 'end_time'], name='session_user_interval_idx'),
+        ]
+
+    @classmethod
+    def overlapping(cls, user, start, end):
+        """The user's sessions that intersect [start, end)."""
+        return cls.objects.filter(user=user, start_time__lt=end, end_time__gt=start)
 
     def clean(self):
         if self.end_time <= self.start_time:
             raise ValidationError("End time must be after start time")
         if self.start_time < timezone.now():
             raise ValidationError("Cannot create study sessions in the past")
+        if StudySession.overlapping(self.user_id, self.start_time, self.end_time).exclude(pk=self.pk).exists():
+            raise ValidationError("Study session overlaps another session")
 
     def duration(self):
         """Returns the duration of the study session in minutes"""
@@ -53,3 +64,87 @@ class Exam(models.Model):
 
     def __str__(self):
         return f"{self.course_name} exam on {self.exam_date.strftime('%Y-%m-%d')}"
+
+
+def new_feed_token():
+    return secrets.token_urlsafe(32)
+
+class CalendarFeed(models.Model):
+    """Secret token in the URL of a user's iCalendar subscription feed"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='calendar_feed')
+    token = models.CharField(max_length=64, unique=True, default=new_feed_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def rotate(self):
+        """Issue a new token; subscriptions using the old URL stop working."""
+        self.token = new_feed_token()
+        self.save(update_fields=['token'])
+
+    def __str__(self):
+        return f"Calendar feed for user {self.user_id}"
+
+
+class StudySessionSeries(models.Model):
+    """
+    A weekly recurring study session, stored as its rule rather than one row
+    per occurrence. Times are wall-clock times in ``timezone``, so a session
+    stays at 18:00 across daylight saving changes.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='study_session_series')
+    subject = models.CharField(max_length=255)
+    timezone = models.CharField(max_length=50, default='UTC')
+    start_date = models.DateField()
+    start_time = models.TimeField()
+    duration = models.PositiveIntegerField(help_text="Duration in minutes")
+    weekdays = models.JSONField(default=list, blank=True, help_text="Days of the week, 0 is Monday; empty repeats on start_date's weekday")
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Repeat every this many weeks")
+    until = models.DateField(null=True, blank=True, help_text="Last day an occurrence may fall on")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start_date', 'start_time']
+        verbose_name_plural = 'study session series'
+        indexes = [
+            models.Index(fields=['user', 'start_date', 'until'], name='series_user_range_idx'),
+        ]
+
+    def clean(self):
+        if self.until and self.until < self.start_date:
+            raise ValidationError("A series can't end before it starts")
+
+    def __str__(self):
+        return f"{self.subject} every {self.interval} week(s) from {self.start_date.strftime('%Y-%m-%d')}"
+
+class StudySessionException(models.Model):
+    """
+    One occurrence of a series that was cancelled or moved. Only changed
+    occurrences get a row; ``original_start`` identifies which one.
+    """
+    series = models.ForeignKey(StudySessionSeries, on_delete=models.CASCADE, related_name='exceptions')
+    original_start = models.DateTimeField()
+    is_cancelled = models.BooleanField(default=False)
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['original_start']
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'original_start'], name='unique_series_occurrence'),
+        ]
+        indexes = [
+            models.Index(fields=['series', 'start_time', 'end_time'], name='exception_moved_idx'),
+        ]
+
+    def clean(self):
+        if not self.is_cancelled:
+            if self.start_time is None or self.end_time is None:
+                raise ValidationError("A moved occurrence needs a start and end time")
+            if self.end_time <= self.start_time:
+                raise ValidationError("End time must be after start time")
+
+    def __str__(self):
+        change = 'cancelled' if self.is_cancelled else 'moved'
+        return f"{self.series.subject} on {self.original_start.strftime('%Y-%m-%d %H:%M')} {change}"
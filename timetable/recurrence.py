@@ -0,0 +1,161 @@
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from zoneinfo import ZoneInfo
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from .intervals import IntervalSet
+from .models import StudySession, StudySessionException, StudySessionSeries
+
+MAX_DURATION_MINUTES = 24 * 60
+# Local dates of a series can be a day either side of the UTC window's dates
+DATE_SLACK = timedelta(days=1)
+# A series is checked for clashes this far ahead; an open-ended one never ends
+CLASH_WINDOW = timedelta(weeks=52)
+
+Occurrence = namedtuple('Occurrence', 'series_id subject original_start start end')
+
+
+def occurrence_dates(start_date, weekdays, interval, first, last):
+    """
+    Lazily yield the dates in [first, last] of a rule repeating on
+    ``weekdays`` every ``interval`` weeks from ``start_date``. The first week
+    is found arithmetically, so a window at the end of a long series costs
+    the same as one at its start.
+    """
+    first = max(first, start_date)
+    anchor = start_date - timedelta(days=start_date.weekday())
+    weeks = (first - anchor).days // 7
+    monday = anchor + timedelta(weeks=weeks + (-weeks % interval))
+    while monday <= last:
+        for weekday in weekdays:
+            day = monday + timedelta(days=weekday)
+            if day > last:
+                return
+            if day >= first:
+                yield day
+        monday += timedelta(weeks=interval)
+
+
+def _rule(series):
+    tzinfo = ZoneInfo(series.timezone)
+    weekdays = sorted(set(series.weekdays)) or [series.start_date.weekday()]
+    return tzinfo, weekdays
+
+
+def first_occurrence(series):
+    """Date of the series' first occurrence; None when ``until`` comes before it."""
+    _, weekdays = _rule(series)
+    return next(occurrence_dates(series.start_date, weekdays, series.interval, series.start_date, series.until or date.max), None)
+
+
+def is_occurrence(series, value):
+    """Whether ``value`` is the start of one of the series' occurrences."""
+    tzinfo, weekdays = _rule(series)
+    local = value.astimezone(tzinfo)
+    if local.time() != series.start_time:
+        return False
+    if series.until and local.date() > series.until:
+        return False
+    return any(occurrence_dates(series.start_date, weekdays, series.interval, local.date(), local.date()))
+
+
+def expand(series, start, end, exceptions=()):
+    """
+    Yield the series' occurrences that intersect [start, end), generated
+    for that window only. Cancelled occurrences are skipped and moved ones
+    use their new times, including those moved into the window from
+    outside it.
+
+    Args:
+        exceptions (iterable): The series' StudySessionException rows; any
+            superset of those touching the window will do
+    """
+    tzinfo, weekdays = _rule(series)
+    length = timedelta(minutes=series.duration)
+    last = end.astimezone(tzinfo).date()
+    if series.until:
+        last = min(last, series.until)
+    changed = {exception.original_start: exception for exception in exceptions}
+
+    for day in occurrence_dates(series.start_date, weekdays, series.interval, (start - length).astimezone(tzinfo).date(), last):
+        original = datetime.combine(day, series.start_time, tzinfo)
+        exception = changed.pop(original, None)
+        if exception is None:
+            occurrence_start, occurrence_end = original, original + length
+        elif exception.is_cancelled:
+            continue
+        else:
+            occurrence_start, occurrence_end = exception.start_time, exception.end_time
+        if occurrence_start < end and occurrence_end > start:
+            yield Occurrence(series.id, series.subject, original, occurrence_start, occurrence_end)
+
+    for original, exception in changed.items():
+        if not exception.is_cancelled and exception.start_time < end and exception.end_time > start \
+                and is_occurrence(series, original):
+            yield Occurrence(series.id, series.subject, original, exception.start_time, exception.end_time)
+
+
+def series_between(user, start, end, exclude=None):
+    """
+    The user's series that may have occurrences in [start, end), with the
+    exceptions that can affect the window prefetched: two queries however
+    long the series run. ``exclude`` is the id of a series to leave out.
+    """
+    exceptions = StudySessionException.objects.filter(
+        Q(original_start__gte=start - timedelta(minutes=MAX_DURATION_MINUTES), original_start__lt=end)
+        | Q(is_cancelled=False, start_time__lt=end, end_time__gt=start)
+    )
+    series = (
+        StudySessionSeries.objects
+        .filter(user=user, start_date__lte=end.date() + DATE_SLACK)
+        .filter(Q(until__isnull=True) | Q(until__gte=start.date() - DATE_SLACK))
+        .prefetch_related(Prefetch('exceptions', queryset=exceptions))
+    )
+    return series.exclude(pk=exclude) if exclude is not None else series
+
+
+def occurrences_between(user, start, end, exclude=None):
+    """The user's series occurrences intersecting [start, end), in start order."""
+    return sorted(
+        chain.from_iterable(
+            expand(series, start, end, series.exceptions.all()) for series in series_between(user, start, end, exclude)
+        ),
+        key=lambda occurrence: (occurrence.start, occurrence.series_id),
+    )
+
+
+def busy_intervals(user, start, end, exclude=None):
+    """(start, end) of every one-off session and series occurrence intersecting [start, end)."""
+    sessions = StudySession.overlapping(user, start, end).order_by('start_time').values_list('start_time', 'end_time')
+    return list(sessions) + [
+        (occurrence.start, occurrence.end) for occurrence in occurrences_between(user, start, end, exclude)
+    ]
+
+
+def series_clashes(series, exceptions=(), now=None):
+    """
+    Whether an upcoming occurrence of ``series``, saved or not, overlaps one
+    of the user's sessions or another series' occurrences. Checked from now
+    until the series ends, at most CLASH_WINDOW ahead.
+    """
+    tzinfo, _ = _rule(series)
+    start = max(now or timezone.now(), datetime.combine(series.start_date, series.start_time, tzinfo))
+    end = start + CLASH_WINDOW
+    if series.until:
+        end = min(end, datetime.combine(series.until + timedelta(days=1), time(), tzinfo)
+                  + timedelta(minutes=series.duration))
+    if end <= start:
+        return False
+    taken = IntervalSet(busy_intervals(series.user_id, start, end, exclude=series.pk))
+    return any(taken.overlaps(occurrence.start, occurrence.end) for occurrence in expand(series, start, end, exceptions))
+
+
+def move_clashes(series, original_start, start, end):
+    """Whether moving an occurrence to [start, end) overlaps a session or any other occurrence."""
+    if StudySession.overlapping(series.user_id, start, end).exists():
+        return True
+    return any(
+        occurrence.series_id != series.id or occurrence.original_start != original_start
+        for occurrence in occurrences_between(series.user_id, start, end)
+    )
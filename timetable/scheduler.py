@@ -0,0 +1,121 @@
+import heapq
+from collections import Counter
+from datetime import datetime, time, timedelta
+from .intervals import IntervalSet
+
+SLOT_MINUTES = 30
+MAX_SESSION_SLOTS = 4  # At most two hours of one subject in a row
+DAY_START = time(9, 0)
+DAY_END = time(21, 0)
+PLAN_DAYS = 7
+PRIORITY_WEIGHT = 2.0
+PROXIMITY_DAYS = 7  # An exam this many days away doubles a subject's weight
+
+
+def subject_weight(subject, day, exam_dates, priorities):
+    """
+    How much of ``day`` a subject deserves relative to the others: 1, plus
+    a term that grows as its exam gets closer, doubled for priority subjects.
+    """
+    weight = 1.0
+    exam_date = exam_dates.get(subject)
+    if exam_date is not None:
+        weight += PROXIMITY_DAYS / max((exam_date - day).days, 1)
+    if subject in priorities:
+        weight *= PRIORITY_WEIGHT
+    return weight
+
+
+def free_slots(day, taken, tzinfo):
+    """Start times of the day's study slots that don't overlap an interval in ``taken``."""
+    start = datetime.combine(day, DAY_START, tzinfo)
+    end = datetime.combine(day, DAY_END, tzinfo)
+    step = timedelta(minutes=SLOT_MINUTES)
+    slots = []
+    while start + step <= end:
+        if not taken.overlaps(start, start + step):
+            slots.append(start)
+        start += step
+    return slots
+
+
+def _daily_quota(subjects, count, weights, assigned):
+    """
+    Split ``count`` slots between subjects by the highest-averages method,
+    continuing from the slots each subject already got this week so the
+    weekly totals stay proportional to the weights.
+    """
+    heap = [(-weights[s] / (assigned[s] + 1), s) for s in subjects]
+    heapq.heapify(heap)
+    quota = Counter()
+    for _ in range(count):
+        _, subject = heapq.heappop(heap)
+        quota[subject] += 1
+        assigned[subject] += 1
+        heapq.heappush(heap, (-weights[subject] / (assigned[subject] + 1), subject))
+    return quota
+
+
+def _runs(quota):
+    """Order a day's slots as runs of at most MAX_SESSION_SLOTS, largest quota first, interleaved."""
+    queues = [
+        [subject] * count
+        for subject, count in sorted(quota.items(), key=lambda item: (-item[1], item[0]))
+    ]
+    order = []
+    while queues:
+        for queue in queues:
+            order.extend(queue[:MAX_SESSION_SLOTS])
+            del queue[:MAX_SESSION_SLOTS]
+        queues = [queue for queue in queues if queue]
+    return order
+
+
+def build_week_plan(start_date, available_hours, subjects, exams=(), busy=(), priorities=(), tzinfo=None,
+                    days=PLAN_DAYS):
+    """
+    Lay out a study plan without any model call.
+
+    Each day offers up to ``available_hours`` of SLOT_MINUTES slots between
+    DAY_START and DAY_END that don't clash with existing sessions. Slots are
+    shared out by subject weight (exam proximity, priority), a subject
+    drops out on its exam day, and consecutive slots of the same subject
+    are merged into one session. The result only depends on the inputs.
+
+    Args:
+        subjects (iterable): Subject names to plan for
+        exams (iterable): (subject, exam date) pairs; the earliest date per subject counts
+        busy (iterable): (start, end) datetimes of existing study sessions
+        priorities (iterable): Subjects to favour
+    Returns:
+        list: {'subject', 'start', 'end'} dicts in chronological order
+    """
+    exam_dates = {}
+    for subject, exam_date in exams:
+        if subject not in exam_dates or exam_date < exam_dates[subject]:
+            exam_dates[subject] = exam_date
+    subjects = sorted(set(subjects) | set(exam_dates))
+    priorities = set(priorities)
+    taken = IntervalSet(busy)
+    per_day = int(available_hours * 60 // SLOT_MINUTES)
+    assigned = Counter()
+    step = timedelta(minutes=SLOT_MINUTES)
+
+    plan = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        open_subjects = [s for s in subjects if s not in exam_dates or exam_dates[s] > day]
+        if not open_subjects or not per_day:
+            continue
+        slots = free_slots(day, taken, tzinfo)[:per_day]
+        weights = {s: subject_weight(s, day, exam_dates, priorities) for s in open_subjects}
+        quota = _daily_quota(open_subjects, len(slots), weights, assigned)
+
+        for slot, subject in zip(slots, _runs(quota)):
+            last = plan[-1] if plan else None
+            if last and last['subject'] == subject and last['end'] == slot \
+                    and (last['end'] - last['start']) < step * MAX_SESSION_SLOTS:
+                last['end'] = slot + step
+            else:
+                plan.append({'subject': subject, 'start': slot, 'end': slot + step})
+    return plan
@@ -1,5 +1,7 @@
+from zoneinfo import available_timezones
 from rest_framework import serializers
-from .models import StudySession, Exam
+from .models import StudySession, StudySessionException, StudySessionSeries, Exam
+from .recurrence import MAX_DURATION_MINUTES, is_occurrence, move_clashes, occurrences_between, series_clashes
 
 class StudySessionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,6 +9,85 @@ class StudySessionSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'subject', 'start_time', 'end_time', 'is_completed', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate(self, data):
+        start = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start and end:
+            if end <= start:
+                raise serializers.ValidationError("End time must be after start time")
+            user = self.instance.user if self.instance else self.context['request'].user
+            clashes = StudySession.overlapping(user, start, end)
+            if self.instance:
+                clashes = clashes.exclude(pk=self.instance.pk)
+            if clashes.exists():
+                raise serializers.ValidationError("Study session overlaps another session")
+            if occurrences_between(user, start, end):
+                raise serializers.ValidationError("Study session overlaps a recurring session")
+        return data
+
+class StudySessionSeriesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StudySessionSeries
+        fields = ['id', 'user', 'subject', 'timezone', 'start_date', 'start_time', 'duration',
+                 'weekdays', 'interval', 'until', 'created_at', 'updated_at']
+        read_only_fields = ['user', 'created_at', 'updated_at']
+
+    def validate_timezone(self, value):
+        if value not in available_timezones():
+            raise serializers.ValidationError("Unknown time zone")
+        return value
+
+    def validate_duration(self, value):
+        if not 0 < value <= MAX_DURATION_MINUTES:
+            raise serializers.ValidationError(f"Duration must be between 1 and {MAX_DURATION_MINUTES} minutes")
+        return value
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or not all(isinstance(day, int) and 0 <= day <= 6 for day in value):
+            raise serializers.ValidationError("Weekdays must be a list of integers from 0 (Monday) to 6")
+        return sorted(set(value))
+
+    def validate_interval(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Interval must be at least 1 week")
+        return value
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        until = data.get('until', getattr(self.instance, 'until', None))
+        if start_date and until and until < start_date:
+            raise serializers.ValidationError("A series can't end before it starts")
+        rule = ['timezone', 'start_date', 'start_time', 'duration', 'weekdays', 'interval', 'until']
+        values = {field: getattr(self.instance, field) for field in rule} if self.instance else {}
+        values.update((field, data[field]) for field in rule if field in data)
+        user = self.instance.user if self.instance else self.context['request'].user
+        series = StudySessionSeries(pk=getattr(self.instance, 'pk', None), user=user, **values)
+        if series_clashes(series, self.instance.exceptions.all() if self.instance else ()):
+            raise serializers.ValidationError("Series overlaps another session")
+        return data
+
+class StudySessionExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StudySessionException
+        fields = ['id', 'series', 'original_start', 'is_cancelled', 'start_time', 'end_time', 'created_at', 'updated_at']
+        read_only_fields = ['series', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        series = self.context['series']
+        if not is_occurrence(series, data['original_start']):
+            raise serializers.ValidationError("original_start is not an occurrence of this series")
+        if data.get('is_cancelled'):
+            data['start_time'] = data['end_time'] = None
+        else:
+            start, end = data.get('start_time'), data.get('end_time')
+            if start is None or end is None:
+                raise serializers.ValidationError("A moved occurrence needs a start and end time")
+            if end <= start:
+                raise serializers.ValidationError("End time must be after start time")
+            if move_clashes(series, data['original_start'], start, end):
+                raise serializers.ValidationError("Moved occurrence overlaps another session")
+        return data
+
 class ExamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exam
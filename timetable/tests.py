@@ -1,11 +1,19 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 from django.utils import timezone
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import StudySession, Exam
+from .models import StudySession, StudySessionException, StudySessionSeries, Exam
 from .serializers import StudySessionSerializer, ExamSerializer
+from .ical import fold
+from .intervals import IntervalSet
+from .recurrence import occurrence_dates, occurrences_between
+from .scheduler import build_week_plan
 from unittest.mock import patch
+from zoneinfo import ZoneInfo
 import json
 
 User = get_user_model()
@@ -168,3 +176,362 @@ class TimetableViewsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertEqual(response.data['status'], 'Failed')
         self.assertEqual(response.data['error'], 'Task failed')
+
+
+class TimetableSchedulerTest(APITestCase):
+    """The local scheduler and the timetable endpoint built on it."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='planner',
+            email='planner@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_week_plan(self):
+        start = date(2026, 3, 2)
+        busy_start = datetime(2026, 3, 2, 9, 0, tzinfo=dt_timezone.utc)
+        exams = [('Physics', start + timedelta(days=2)), ('History', start + timedelta(days=20))]
+        args = (start, 3, ['Maths', 'History'])
+        kwargs = {'exams': exams, 'busy': [(busy_start, busy_start + timedelta(hours=1))], 'tzinfo': dt_timezone.utc}
+        plan = build_week_plan(*args, **kwargs)
+        self.assertEqual(plan, build_week_plan(*args, **kwargs))  # Deterministic
+
+        by_day = {}
+        for entry in plan:
+            by_day.setdefault(entry['start'].date(), []).append(entry)
+            self.assertLessEqual(entry['end'] - entry['start'], timedelta(hours=2))
+        for entries in by_day.values():
+            self.assertEqual(sum((e['end'] - e['start'] for e in entries), timedelta()), timedelta(hours=3))
+        # Existing sessions are worked around and subjects stop on their exam day
+        self.assertEqual(by_day[start][0]['start'], busy_start + timedelta(hours=1))
+        self.assertFalse(any(e['subject'] == 'Physics' and e['start'].date() >= exams[0][1] for e in plan))
+
+        # The nearer exam gets more time than the distant one
+        first_day = Counter()
+        for entry in by_day[start]:
+            first_day[entry['subject']] += (entry['end'] - entry['start']).seconds
+        self.assertGreater(first_day['Physics'], first_day['History'])
+
+    @patch('timetable.views.ai_assistant')
+    def test_generate_timetable_view(self, mock_ai):
+        Exam.objects.create(user=self.user, course_name='Chemistry', exam_date=timezone.now().date() + timedelta(days=3))
+        response = self.client.post(
+            reverse('generate-timetable'), {'available_hours': 2, 'priority_subjects': ['Biology']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({e['subject'] for e in response.data['timetable']}, {'Biology', 'Chemistry'})
+        self.assertIsNone(response.data['narrative'])
+        mock_ai.process_text.assert_not_called()
+
+        response = self.client.post(reverse('generate-timetable'), {'available_hours': 'lots'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('timetable.views.build_week_plan', wraps=build_week_plan)
+    @patch('timetable.views.timezone.localtime', return_value=timezone.localtime())  # Stay within one slot
+    def test_timetable_cache_is_per_user_and_input(self, localtime, solver):
+        url = reverse('generate-timetable')
+        data = {'available_hours': 2, 'priority_subjects': ['Biology']}
+        first = self.client.post(url, data, format='json').data
+        self.assertEqual(self.client.post(url, data, format='json').data, first)
+        self.assertEqual(solver.call_count, 1)
+
+        # Same inputs from another user are planned from that user's data
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        Exam.objects.create(user=other, course_name='Law', exam_date=timezone.now().date() + timedelta(days=2))
+        self.client.force_authenticate(user=other)
+        self.assertIn('Law', self.client.post(url, data, format='json').data['minutes_by_subject'])
+        self.assertEqual(solver.call_count, 2)
+
+        # Adding, editing or deleting an exam invalidates the user's plan
+        self.client.force_authenticate(user=self.user)
+        exam = Exam.objects.create(user=self.user, course_name='Art', exam_date=timezone.now().date() + timedelta(days=4))
+        self.assertIn('Art', self.client.post(url, data, format='json').data['minutes_by_subject'])
+        exam.course_name = 'Drama'
+        exam.save()
+        self.assertIn('Drama', self.client.post(url, data, format='json').data['minutes_by_subject'])
+        exam.delete()
+        self.assertEqual(self.client.post(url, data, format='json').data, first)
+        self.assertEqual(solver.call_count, 4)
+
+
+    @patch('timetable.views.cache')
+    def test_timetable_cache_expires_at_the_next_slot(self, cache):
+        cache.get.return_value = None
+        now = timezone.localtime().replace(hour=10, minute=7, second=30, microsecond=0)
+        with patch('timetable.views.timezone.localtime', return_value=now):
+            self.client.post(reverse('generate-timetable'), {'available_hours': 2}, format='json')
+        self.assertEqual(cache.set.call_args.kwargs['timeout'], 22 * 60 + 30)
+
+
+class StudySessionIntervalTest(APITestCase):
+    """Overlap validation and free slots from merged session intervals."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='slots',
+            email='slots@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def at(self, hour, minute=0):
+        return datetime.combine(self.day, time(hour, minute), timezone.get_current_timezone())
+
+    def test_interval_set(self):
+        intervals = IntervalSet([(5, 7), (1, 3), (2, 4), (4, 5), (9, 10)])
+        self.assertEqual(list(intervals), [(1, 7), (9, 10)])
+        self.assertTrue(intervals.overlaps(6, 8))
+        self.assertTrue(intervals.overlaps(0, 2))
+        self.assertFalse(intervals.overlaps(7, 9))
+        self.assertEqual(list(intervals.gaps(0, 12)), [(0, 1), (7, 9), (10, 12)])
+        self.assertEqual(list(intervals.gaps(0, 12, min_length=2)), [(7, 9), (10, 12)])
+
+    def test_overlapping_sessions_are_rejected(self):
+        url = reverse('study-session-list')
+        data = {'user': self.user.id, 'subject': 'Maths', 'start_time': self.at(10), 'end_time': self.at(11)}
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_201_CREATED)
+        clash = dict(data, start_time=self.at(10, 30), end_time=self.at(12))
+        self.assertEqual(self.client.post(url, clash, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        after = dict(data, start_time=self.at(11), end_time=self.at(12))
+        self.assertEqual(self.client.post(url, after, format='json').status_code, status.HTTP_201_CREATED)
+
+    def test_free_slots(self):
+        StudySession.objects.create(user=self.user, subject='Maths', start_time=self.at(10), end_time=self.at(11))
+        StudySession.objects.create(user=self.user, subject='Art', start_time=self.at(10, 30), end_time=self.at(12))
+        StudySession.objects.create(user=self.user, subject='Law', start_time=self.at(12, 15), end_time=self.at(20))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('free-slots'), {'start': self.day.isoformat(), 'days': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(slot['start'], slot['end']) for slot in response.data['free_slots']],
+            [(self.at(9), self.at(10)), (self.at(20), self.at(21))]
+        )
+        response = self.client.get(reverse('free-slots'), {'start': self.day.isoformat(), 'days': 1, 'min_minutes': 10})
+        self.assertEqual(len(response.data['free_slots']), 3)
+        self.assertEqual(self.client.get(reverse('free-slots'), {'days': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarFeedTest(APITestCase):
+    """Tokenized, streamed iCalendar feed with ETag revalidation."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='calendar',
+            email='calendar@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        start = timezone.now() + timedelta(days=1)
+        StudySession.objects.create(user=self.user, subject='Maths; algebra', start_time=start, end_time=start + timedelta(hours=1))
+        self.exam = Exam.objects.create(
+            user=self.user, course_name='Physics', exam_date=timezone.now().date() + timedelta(days=5),
+            location='Hall A', notes='Bring a calculator, ruler'
+        )
+
+    def test_feed(self):
+        url = self.client.get(reverse('calendar-feed-link')).data['url']
+        self.client.force_authenticate(user=None)  # Calendar clients only have the URL
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Study: Maths\\; algebra\r\n', body)
+        self.assertIn(f"DTSTART;VALUE=DATE:{self.exam.exam_date:%Y%m%d}\r\n", body)
+        self.assertIn('DESCRIPTION:Bring a calculator\\, ruler\r\n', body)
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.exam.location = 'Hall B'
+        self.exam.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        # Rotating the token revokes the old URL
+        self.client.force_authenticate(user=self.user)
+        new_url = self.client.post(reverse('calendar-feed-link')).data['url']
+        self.assertNotEqual(new_url, url)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(new_url).status_code, status.HTTP_200_OK)
+
+    def test_long_lines_are_folded(self):
+        line = 'SUMMARY:' + 'é' * 60
+        folded = fold(line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded[:-2].split('\r\n')))
+        self.assertEqual(folded[:-2].replace('\r\n ', ''), line)
+
+
+class RecurringStudySessionTest(APITestCase):
+    """Weekly series expanded lazily per window, with sparse exceptions."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='recurring',
+            email='recurring@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=7 - today.weekday())
+        self.series = StudySessionSeries.objects.create(
+            user=self.user, subject='Maths', start_date=self.monday, start_time=time(18),
+            duration=60, weekdays=[0, 2], until=self.monday + timedelta(weeks=15)
+        )
+
+    def at(self, day, hour, minute=0):
+        return datetime.combine(day, time(hour, minute), dt_timezone.utc)
+
+    def test_occurrence_dates(self):
+        # Every other week on Monday and Wednesday; the window starts in an off week
+        dates = occurrence_dates(date(2026, 1, 5), [0, 2], 2, date(2026, 6, 1), date(2026, 6, 14))
+        self.assertEqual(list(dates), [date(2026, 6, 8), date(2026, 6, 10)])
+        self.assertEqual(list(occurrence_dates(date(2026, 1, 7), [0, 2], 1, date(2026, 1, 1), date(2026, 1, 13))),
+                         [date(2026, 1, 7), date(2026, 1, 12)])
+
+    def test_expansion_keeps_wall_clock_time_across_dst(self):
+        series = StudySessionSeries.objects.create(
+            user=self.user, subject='Law', timezone='Europe/London', start_date=date(2026, 3, 16),
+            start_time=time(18), duration=60,
+        )
+        london = ZoneInfo('Europe/London')
+        occurrences = [o for o in occurrences_between(self.user, self.at(date(2026, 3, 23), 0), self.at(date(2026, 4, 6), 0))
+                       if o.series_id == series.id]
+        self.assertEqual([o.start for o in occurrences], [self.at(date(2026, 3, 23), 18), self.at(date(2026, 3, 30), 17)])
+        self.assertTrue(all(o.start.astimezone(london).hour == 18 for o in occurrences))
+
+    def test_exceptions(self):
+        first, second, third = (self.at(self.monday + timedelta(days=offset), 18) for offset in (0, 2, 7))
+        StudySessionException.objects.create(series=self.series, original_start=first, is_cancelled=True)
+        StudySessionException.objects.create(
+            series=self.series, original_start=third, start_time=self.at(self.monday, 8), end_time=self.at(self.monday, 9)
+        )
+        with self.assertNumQueries(2):
+            occurrences = occurrences_between(self.user, self.at(self.monday, 0), self.at(self.monday + timedelta(days=3), 0))
+        # The third occurrence was moved into the window from the week after
+        self.assertEqual([(o.original_start, o.start) for o in occurrences],
+                         [(third, self.at(self.monday, 8)), (second, second)])
+
+        # Past ``until`` nothing is generated
+        end = self.monday + timedelta(weeks=16)
+        self.assertEqual(occurrences_between(self.user, self.at(end, 0), self.at(end + timedelta(days=7), 0)), [])
+
+    @patch('timetable.views.ai_assistant')
+    def test_api(self, mock_ai):
+        response = self.client.post(reverse('study-session-series-list'), {
+            'subject': 'Physics', 'start_date': self.monday.isoformat(), 'start_time': '07:00',
+            'duration': 90, 'weekdays': [1, 1], 'timezone': 'UTC',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['weekdays'], [1])
+        self.assertEqual(StudySessionSeries.objects.filter(user=self.user).count(), 2)
+        invalid = self.client.post(reverse('study-session-series-list'), {
+            'subject': 'Physics', 'start_date': self.monday.isoformat(), 'start_time': '07:00',
+            'duration': 90, 'weekdays': [7],
+        }, format='json')
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Exceptions are upserted per occurrence and must name a real one
+        url = reverse('study-session-exception-list', args=[self.series.id])
+        original = self.at(self.monday, 18)
+        self.assertEqual(self.client.post(url, {'original_start': original, 'is_cancelled': True}, format='json').status_code,
+                         status.HTTP_201_CREATED)
+        moved = {'original_start': original, 'start_time': self.at(self.monday, 19), 'end_time': self.at(self.monday, 20)}
+        self.assertEqual(self.client.post(url, moved, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.series.exceptions.count(), 1)
+        bogus = {'original_start': self.at(self.monday, 17), 'is_cancelled': True}
+        self.assertEqual(self.client.post(url, bogus, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Sessions can't clash with an occurrence
+        clash = {'user': self.user.id, 'subject': 'Art', 'start_time': self.at(self.monday, 19, 30),
+                 'end_time': self.at(self.monday, 21)}
+        self.assertEqual(self.client.post(reverse('study-session-list'), clash, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        StudySession.objects.create(user=self.user, subject='Art', start_time=self.at(self.monday, 12),
+                                    end_time=self.at(self.monday, 13))
+
+        response = self.client.get(reverse('study-session-occurrences'), {'start': self.monday.isoformat(), 'days': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(entry['subject'], entry['start']) for entry in response.data['sessions']], [
+            ('Art', self.at(self.monday, 12)), ('Maths', self.at(self.monday, 19)),
+            ('Physics', self.at(self.monday + timedelta(days=1), 7)),
+        ])
+
+        response = self.client.get(reverse('free-slots'), {'start': self.monday.isoformat(), 'days': 1})
+        self.assertEqual([(slot['start'], slot['end']) for slot in response.data['free_slots']],
+                         [(self.at(self.monday, 9), self.at(self.monday, 12)),
+                          (self.at(self.monday, 13), self.at(self.monday, 19)),
+                          (self.at(self.monday, 20), self.at(self.monday, 21))])
+
+    def test_calendar_feed(self):
+        StudySessionException.objects.create(series=self.series, original_start=self.at(self.monday, 18), is_cancelled=True)
+        url = self.client.get(reverse('calendar-feed-link')).data['url']
+        response = self.client.get(url)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        until = self.monday + timedelta(weeks=15)
+        self.assertIn(f'RRULE:FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE;UNTIL={until:%Y%m%d}T235959Z\r\n', body)
+        self.assertIn(f'EXDATE;TZID=UTC:{self.monday:%Y%m%d}T180000\r\n', body)
+
+        etag = response['ETag']
+        StudySessionException.objects.create(series=self.series, original_start=self.at(self.monday, 18) + timedelta(days=2),
+                                             start_time=self.at(self.monday, 6), end_time=self.at(self.monday, 7))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('RECURRENCE-ID;TZID=UTC:', b''.join(response.streaming_content).decode())
+
+    def test_calendar_feed_series_start_and_zones(self):
+        # Starts on a Monday but only repeats on Wednesdays
+        StudySessionSeries.objects.create(
+            user=self.user, subject='Law', timezone='Europe/London', start_date=date(2026, 1, 5),
+            start_time=time(18), duration=60, weekdays=[2], until=date(2026, 6, 30),
+        )
+        # Ends before its first occurrence
+        StudySessionSeries.objects.create(
+            user=self.user, subject='Art', start_date=date(2026, 1, 5), start_time=time(9), duration=60,
+            weekdays=[4], until=date(2026, 1, 8),
+        )
+        url = self.client.get(reverse('calendar-feed-link')).data['url']
+        body = b''.join(self.client.get(url).streaming_content).decode()
+        self.assertIn('DTSTART;TZID=Europe/London:20260107T180000\r\n', body)
+        self.assertNotIn('Art', body)
+        self.assertEqual(body.count('BEGIN:VTIMEZONE'), 2)
+        self.assertIn('TZID:UTC\r\n', body)
+        london = body[body.index('TZID:Europe/London\r\n'):]
+        london = london[:london.index('END:VTIMEZONE')]
+        self.assertIn('BEGIN:DAYLIGHT\r\nDTSTART:20260329T010000\r\nTZOFFSETFROM:+0000\r\nTZOFFSETTO:+0100\r\n', london)
+        self.assertIn('BEGIN:STANDARD\r\nDTSTART:20261025T020000\r\nTZOFFSETFROM:+0100\r\nTZOFFSETTO:+0000\r\n', london)
+        self.assertLess(body.index('END:VTIMEZONE'), body.index('BEGIN:VEVENT'))
+
+    def test_series_clashes(self):
+        url = reverse('study-session-series-list')
+        clash = {'subject': 'Physics', 'start_date': self.monday.isoformat(), 'start_time': '18:30',
+                 'duration': 60, 'weekdays': [2], 'timezone': 'UTC'}
+        self.assertEqual(self.client.post(url, clash, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        # Only a clash after the other series has ended is fine
+        later = dict(clash, start_date=(self.monday + timedelta(weeks=16)).isoformat())
+        self.assertEqual(self.client.post(url, later, format='json').status_code, status.HTTP_201_CREATED)
+
+        # A series doesn't clash with itself, but does with a session
+        detail = reverse('study-session-series-detail', args=[self.series.id])
+        self.assertEqual(self.client.patch(detail, {'subject': 'Algebra'}, format='json').status_code, status.HTTP_200_OK)
+        StudySession.objects.create(user=self.user, subject='Art', start_time=self.at(self.monday, 8),
+                                    end_time=self.at(self.monday, 9))
+        self.assertEqual(self.client.patch(detail, {'start_time': '08:30'}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+        # Moved occurrences can't land on a session or another occurrence, only on their own slot
+        exceptions = reverse('study-session-exception-list', args=[self.series.id])
+        original = self.at(self.monday, 18)
+        for start, expected in ((8, status.HTTP_400_BAD_REQUEST), (18, status.HTTP_201_CREATED)):
+            moved = {'original_start': original, 'start_time': self.at(self.monday, start, 30),
+                     'end_time': self.at(self.monday, start + 1, 30)}
+            self.assertEqual(self.client.post(exceptions, moved, format='json').status_code, expected)
+        wednesday = {'original_start': original, 'start_time': self.at(self.monday + timedelta(days=2), 18),
+                     'end_time': self.at(self.monday + timedelta(days=2), 19)}
+        self.assertEqual(self.client.post(exceptions, wednesday, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
@@ -1,15 +1,28 @@
 from django.urls import path
 from .views import (
-    StudySessionListCreateView, StudySessionDetailView,
+    StudySessionListCreateView, StudySessionDetailView, StudySessionOccurrencesView,
+    StudySessionSeriesListCreateView, StudySessionSeriesDetailView,
+    StudySessionExceptionListCreateView, StudySessionExceptionDetailView,
     ExamListCreateView, ExamDetailView,
-    GenerateTimetableView
+    GenerateTimetableView, FreeSlotsView,
+    CalendarFeedLinkView, calendar_feed
 )
 
 urlpatterns = [
     # Study Sessions
     path('study-sessions/', StudySessionListCreateView.as_view(), name='study-session-list'),
     path('study-sessions/<int:pk>/', StudySessionDetailView.as_view(), name='study-session-detail'),
+    path('study-sessions/occurrences/', StudySessionOccurrencesView.as_view(), name='study-session-occurrences'),
+    path('study-session-series/', StudySessionSeriesListCreateView.as_view(), name='study-session-series-list'),
+    path('study-session-series/<int:pk>/', StudySessionSeriesDetailView.as_view(), name='study-session-series-detail'),
+    path('study-session-series/<int:pk>/exceptions/', StudySessionExceptionListCreateView.as_view(),
+         name='study-session-exception-list'),
+    path('study-session-series/<int:pk>/exceptions/<int:exception_pk>/', StudySessionExceptionDetailView.as_view(),
+         name='study-session-exception-detail'),
     path('exams/', ExamListCreateView.as_view(), name='exam-list'),
     path('exams/<int:pk>/', ExamDetailView.as_view(), name='exam-detail'),
     path('generate-timetable/', GenerateTimetableView.as_view(), name='generate-timetable'),
+    path('free-slots/', FreeSlotsView.as_view(), name='free-slots'),
+    path('calendar/', CalendarFeedLinkView.as_view(), name='calendar-feed-link'),
+    path('calendar/<str:token>.ics', calendar_feed, name='calendar-feed'),
 ]
@@ -1,12 +1,25 @@
 import os
+import math
 import hashlib
+from datetime import date, datetime, timedelta
 from django.utils import timezone
 from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition, require_GET
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import StudySession, Exam
-from .serializers import StudySessionSerializer, ExamSerializer
+from .models import CalendarFeed, StudySession, StudySessionException, StudySessionSeries, Exam
+from .ical import buffered, calendar_lines
+from .serializers import (
+    StudySessionSerializer, StudySessionSeriesSerializer, StudySessionExceptionSerializer, ExamSerializer
+)
+from .intervals import free_slots_between
+from .recurrence import busy_intervals, occurrences_between
+from .scheduler import DAY_END, DAY_START, PLAN_DAYS, SLOT_MINUTES, build_week_plan
 from study_assistant.ai_service import TaeAI
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
@@ -262,17 +275,23 @@ class ExamDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ✅ Generate Study Timetable
 class GenerateTimetableView(APIView):
-    """Generates an AI-powered study timetable based on user inputs, study sessions, and exams"""
+    """
+    Generates a study timetable for the coming week with a local scheduler,
+    fitting study blocks around existing sessions and weighting subjects by
+    exam proximity and priority. The AI is only used, on request, to
+    narrate the plan.
+    """
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Generate an AI-powered study timetable",
+        operation_description="Generate a study timetable for the coming week",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
-                'available_hours': openapi.Schema(type=openapi.TYPE_INTEGER, description='Available study hours per day'),
+                'available_hours': openapi.Schema(type=openapi.TYPE_NUMBER, description='Available study hours per day'),
                 'study_goals': openapi.Schema(type=openapi.TYPE_STRING, description='Custom study goals'),
-                'priority_subjects': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='List of priority subjects')
+                'priority_subjects': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='List of priority subjects'),
+                'narrate': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Also ask the AI to explain the plan')
             },
             required=['available_hours']
         ),
@@ -282,7 +301,19 @@ class GenerateTimetableView(APIView):
                 schema=openapi.Schema(
                     type=openapi.TYPE_OBJECT,
                     properties={
-                        'timetable': openapi.Schema(type=openapi.TYPE_STRING)
+                        'timetable': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'subject': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'start': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                                    'end': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                                }
+                            )
+                        ),
+                        'minutes_by_subject': openapi.Schema(type=openapi.TYPE_OBJECT),
+                        'narrative': openapi.Schema(type=openapi.TYPE_STRING)
                     }
                 )
             ),
@@ -292,34 +323,277 @@ class GenerateTimetableView(APIView):
     )
     def post(self, request):
         user = request.user
-        available_hours = request.data.get("available_hours", 4)
+        try:
+            available_hours = float(request.data.get("available_hours", 4))
+        except (TypeError, ValueError):
+            return Response({"error": "available_hours must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < available_hours <= 24:
+            return Response({"error": "available_hours must be between 0 and 24"}, status=status.HTTP_400_BAD_REQUEST)
         custom_study_goals = request.data.get("study_goals", None)
         priority_subjects = request.data.get("priority_subjects", [])
+        if not isinstance(priority_subjects, list) or not all(isinstance(s, str) for s in priority_subjects):
+            return Response({"error": "priority_subjects must be a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+        narrate = request.data.get("narrate") in (True, 'true', '1', 1)
+
+        # Plan from the next slot boundary until the same day next week; the
+        # elapsed part of today counts as busy
+        now = timezone.localtime()
+        start_date = now.date()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        slot = timedelta(minutes=SLOT_MINUTES)
+        plan_from = midnight + math.ceil((now - midnight) / slot) * slot
+        window_end = datetime.combine(start_date + timedelta(days=PLAN_DAYS), datetime.min.time(), now.tzinfo)
+        sessions = list(
+            StudySession.objects.filter(user=user, start_time__lt=window_end, end_time__gt=plan_from)
+            .order_by('id').values_list('id', 'updated_at', 'start_time', 'end_time')
+        )
+        occurrences = occurrences_between(user, plan_from, window_end)
+        exams = list(
+            Exam.objects.filter(user=user, exam_date__gte=start_date)
+            .order_by('id').values_list('id', 'updated_at', 'course_name', 'exam_date')
+        )
+        subjects = sorted(set(priority_subjects) | set(
+            StudySession.objects.filter(user=user).order_by().values_list('subject', flat=True).distinct()
+        ) | {occurrence.subject for occurrence in occurrences})
+
+        # The key covers everything the plan is computed from, so a changed,
+        # added or deleted session, occurrence or exam simply misses the cache
+        fingerprint = hashlib.md5(repr((
+            available_hours, custom_study_goals, sorted(priority_subjects), narrate,
+            plan_from, sessions, occurrences, exams, subjects,
+        )).encode()).hexdigest()
+        cache_key = f"timetable_{user.id}_{fingerprint}"
+        cached_timetable = cache.get(cache_key)
+        if cached_timetable:
+            return Response(cached_timetable)
 
-        study_sessions = StudySession.objects.filter(user=user)
-        exams = Exam.objects.filter(user=user)
+        busy = [(start, end) for _, _, start, end in sessions]
+        busy.extend((occurrence.start, occurrence.end) for occurrence in occurrences)
+        busy.append((midnight, plan_from))
+        exams = [(subject, exam_date) for _, _, subject, exam_date in exams]
 
-        # Generate cache key
-        query_hash = hashlib.md5(f"timetable:{available_hours}:{custom_study_goals}".encode()).hexdigest()
-        cached_timetable = cache.get(query_hash)
+        plan = build_week_plan(
+            start_date, available_hours, subjects,
+            exams=exams, busy=busy, priorities=priority_subjects, tzinfo=now.tzinfo,
+        )
+        minutes = {}
+        for entry in plan:
+            minutes[entry['subject']] = minutes.get(entry['subject'], 0) + round(
+                (entry['end'] - entry['start']).total_seconds() / 60
+            )
 
-        if cached_timetable:
-            return Response({"timetable": cached_timetable})
-
-        # Prepare AI input prompt
-        timetable_input = (
-            f"Generate an optimal study timetable:\n"
-            f"Study Sessions: {[s.subject for s in study_sessions]}\n"
-            f"Upcoming Exams: {[f'{e.subject} on {e.date}' for e in exams]}\n"
-            f"Available Study Hours Per Day: {available_hours}\n"
+        narrative = None
+        if narrate and plan:
+            # The model only explains the plan; it never decides it
+            narrative = ai_assistant.process_text(
+                f"Explain this week's study plan to the student in a few encouraging sentences.\n"
+                f"Minutes per subject: {minutes}\n"
+                f"Upcoming Exams: {[f'{subject} on {exam_date}' for subject, exam_date in exams]}\n"
+                + (f"Custom Study Goal: {custom_study_goals}\n" if custom_study_goals else "")
+            )
+
+        result = {"timetable": plan, "minutes_by_subject": minutes, "narrative": narrative}
+        # plan_from is part of the key, so the entry is dead once the next slot starts
+        cache.set(cache_key, result, timeout=max(math.ceil((plan_from - now).total_seconds()), 1))
+
+        return Response(result)
+
+# ✅ Free Study Slots
+class FreeSlotsView(APIView):
+    """
+    Gaps between the user's study sessions and recurring session occurrences
+    within study hours (DAY_START to DAY_END), from indexed range queries
+    over the window and a merge of the sorted intervals in memory.
+
+    Query Parameters:
+        start (date): First day, default today; today starts from now
+        days (int): Days to cover, default 7, at most 31
+        min_minutes (int): Shortest gap worth returning, default 30
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        now = timezone.localtime()
+        try:
+            start_date = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else now.date()
+            days = min(max(int(request.query_params.get('days', PLAN_DAYS)), 1), 31)
+            min_minutes = max(int(request.query_params.get('min_minutes', SLOT_MINUTES)), 1)
+        except ValueError:
+            return Response(
+                {"error": "start must be a date (YYYY-MM-DD); days and min_minutes must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        window_start = max(datetime.combine(start_date, datetime.min.time(), now.tzinfo), now)
+        window_end = datetime.combine(start_date + timedelta(days=days), datetime.min.time(), now.tzinfo)
+        busy = busy_intervals(request.user, window_start, window_end)
+        slots = [
+            {'start': start, 'end': end, 'minutes': round((end - start).total_seconds() / 60)}
+            for start, end in free_slots_between(
+                busy, window_start, window_end, DAY_START, DAY_END, now.tzinfo, timedelta(minutes=min_minutes)
+            )
+        ]
+        return Response({'start': window_start, 'end': window_end, 'free_slots': slots})
+
+# ✅ Recurring Study Sessions
+class StudySessionSeriesListCreateView(generics.ListCreateAPIView):
+    """List and create weekly recurring study sessions; each series is one row however long it runs."""
+    serializer_class = StudySessionSeriesSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return StudySessionSeries.objects.none()
+        return StudySessionSeries.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class StudySessionSeriesDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update, or delete a recurring study session."""
+    serializer_class = StudySessionSeriesSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return StudySessionSeries.objects.none()
+        return StudySessionSeries.objects.filter(user=self.request.user)
+
+class StudySessionExceptionListCreateView(generics.ListCreateAPIView):
+    """
+    The cancelled and moved occurrences of a series. Posting for an
+    occurrence that already has an exception replaces it.
+    """
+    serializer_class = StudySessionExceptionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_series(self):
+        if not hasattr(self, '_series'):
+            self._series = get_object_or_404(StudySessionSeries, pk=self.kwargs['pk'], user=self.request.user)
+        return self._series
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not getattr(self, 'swagger_fake_view', False):
+            context['series'] = self.get_series()
+        return context
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return StudySessionException.objects.none()
+        return self.get_series().exceptions.all()
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        exception, created = StudySessionException.objects.update_or_create(
+            series=self.get_series(), original_start=data['original_start'],
+            defaults={field: data.get(field) for field in ('start_time', 'end_time')}
+            | {'is_cancelled': data.get('is_cancelled', False)},
+        )
+        return Response(
+            self.get_serializer(exception).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
 
-        if not exams and custom_study_goals:
-            timetable_input += f"Custom Study Goal: {custom_study_goals}\n"
-        if priority_subjects:
-            timetable_input += f"Priority Subjects: {priority_subjects}\n"
+class StudySessionExceptionDetailView(generics.RetrieveDestroyAPIView):
+    """Retrieve an exception, or delete it to restore the occurrence."""
+    serializer_class = StudySessionExceptionSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = 'exception_pk'
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return StudySessionException.objects.none()
+        return StudySessionException.objects.filter(series_id=self.kwargs['pk'], series__user=self.request.user)
+
+class StudySessionOccurrencesView(APIView):
+    """
+    The user's study sessions in a date window, one-off sessions and
+    recurring occurrences together in start order. Occurrences are
+    expanded from their series for the window only.
+
+    Query Parameters:
+        start (date): First day, default today
+        days (int): Days to cover, default 7, at most 31
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        now = timezone.localtime()
+        try:
+            start_date = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else now.date()
+            days = min(max(int(request.query_params.get('days', PLAN_DAYS)), 1), 31)
+        except ValueError:
+            return Response(
+                {"error": "start must be a date (YYYY-MM-DD); days must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        window_start = datetime.combine(start_date, datetime.min.time(), now.tzinfo)
+        window_end = datetime.combine(start_date + timedelta(days=days), datetime.min.time(), now.tzinfo)
+        entries = [
+            {'subject': subject, 'start': start, 'end': end, 'session': pk, 'series': None, 'original_start': None}
+            for pk, subject, start, end in StudySession.overlapping(request.user, window_start, window_end)
+            .values_list('id', 'subject', 'start_time', 'end_time')
+        ]
+        entries.extend(
+            {'subject': occurrence.subject, 'start': occurrence.start, 'end': occurrence.end, 'session': None,
+             'series': occurrence.series_id, 'original_start': occurrence.original_start}
+            for occurrence in occurrences_between(request.user, window_start, window_end)
+        )
+        entries.sort(key=lambda entry: entry['start'])
+        return Response({'start': window_start, 'end': window_end, 'sessions': entries})
+
+# ✅ Calendar Feed
+class CalendarFeedLinkView(APIView):
+    """
+    The secret subscription URL of the user's iCalendar feed. POST issues a
+    new URL, revoking the old one.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def feed_url(self, request, feed):
+        return request.build_absolute_uri(reverse('calendar-feed', args=[feed.token]))
 
-        timetable = ai_assistant.process_text(timetable_input)
-        cache.set(query_hash, timetable, timeout=86400)  # Cache for 24 hours
+    def get(self, request):
+        feed, _ = CalendarFeed.objects.get_or_create(user=request.user)
+        return Response({'url': self.feed_url(request, feed)})
 
-        return Response({"timetable": timetable})
+    def post(self, request):
+        feed, created = CalendarFeed.objects.get_or_create(user=request.user)
+        if not created:
+            feed.rotate()
+        return Response({'url': self.feed_url(request, feed)})
+
+
+def _calendar_feed_etag(request, token):
+    """Version of a feed from row counts and newest updated_at, without reading the events."""
+    user_id = CalendarFeed.objects.filter(token=token).values_list('user_id', flat=True).first()
+    if user_id is None:
+        return None
+    request.feed_user_id = user_id
+    sessions = StudySession.objects.filter(user_id=user_id).aggregate(count=Count('id'), latest=Max('updated_at'))
+    series = StudySessionSeries.objects.filter(user_id=user_id).aggregate(count=Count('id'), latest=Max('updated_at'))
+    exceptions = StudySessionException.objects.filter(series__user_id=user_id) \
+        .aggregate(count=Count('id'), latest=Max('updated_at'))
+    exams = Exam.objects.filter(user_id=user_id).aggregate(count=Count('id'), latest=Max('updated_at'))
+    return hashlib.md5(repr((token, sessions, series, exceptions, exams)).encode()).hexdigest()
+
+
+@require_GET
+@condition(etag_func=_calendar_feed_etag)
+def calendar_feed(request, token):
+    """
+    The user's sessions, recurring sessions and exams as a streamed
+    iCalendar document. The token in the URL is the only credential, as
+    calendar clients can't log in; unchanged feeds answer If-None-Match
+    polls with 304.
+    """
+    user_id = getattr(request, 'feed_user_id', None)
+    if user_id is None:
+        raise Http404("Unknown calendar feed")
+    response = StreamingHttpResponse(buffered(calendar_lines(user_id)), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="studypal.ics"'
+    return response